@@ -30,4 +30,8 @@ def create_app():
         from app.models import TransitNode, Business  # Import all models
         db.create_all()         # Create DB tables
 
+        from app.schema import upgrade_schema
+        # Add keys/columns missing on older DBs; geom columns need PostGIS
+        app.config['POSTGIS_ENABLED'] = upgrade_schema(db.engine)
+
     return app
@@ -2,8 +2,16 @@ from app import db
 import uuid
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
+# When PostGIS is available, app.schema also adds a generated
+# `geom geometry(Point, 4326)` column with a GiST index to transit_nodes
+# and businesses. It is not mapped here so the models work without PostGIS;
+# query it through app.services.spatial.
+
 class TransitNode(db.Model):
     __tablename__ = 'transit_nodes'
+    __table_args__ = (
+        db.UniqueConstraint('osm_id', name='uq_transit_nodes_osm_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     osm_id = db.Column(db.String, index=True)
     type = db.Column(db.String)  # bus_stop, subway_entrance, station
@@ -14,10 +22,37 @@ class TransitNode(db.Model):
 
 class Business(db.Model):
     __tablename__ = 'businesses'
+    __table_args__ = (
+        # Ways and nodes can share the same numeric id, so the key includes the type
+        db.UniqueConstraint('osm_type', 'osm_id', name='uq_businesses_osm_type_osm_id'),
+    )
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     osm_id = db.Column(db.BigInteger, index=True, nullable=False)
+    osm_type = db.Column(db.String, nullable=False, default='node', server_default='node')  # node, way, relation
     name = db.Column(db.String, nullable=True)
     category = db.Column(db.String, nullable=False)  # amenity, shop, office, other
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     raw_tags = db.Column(JSONB, nullable=True)  # Store all tags as JSON
+
+
+class DataVersion(db.Model):
+    """Change counter per dataset, bumped by ingestion to invalidate caches."""
+    __tablename__ = 'data_versions'
+    name = db.Column(db.String, primary_key=True)  # businesses, transit_nodes
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+
+
+class ZoneAggregate(db.Model):
+    """
+    Business and transit counts per grid cell, for every pyramid level.
+    A cell at `scale` spans scale x scale base cells (0.002 degrees each);
+    cell_lat/cell_lon are indices in units of that level's cell size.
+    """
+    __tablename__ = 'zone_aggregates'
+    scale = db.Column(db.SmallInteger, primary_key=True)  # 1, 5, 25, 100
+    cell_lat = db.Column(db.Integer, primary_key=True)
+    cell_lon = db.Column(db.Integer, primary_key=True)
+    business_count = db.Column(db.Integer, nullable=False, default=0)
+    transport_count = db.Column(db.Integer, nullable=False, default=0)
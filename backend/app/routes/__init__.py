@@ -1,9 +1,21 @@
 from .transit import transit_bp
 from .business import business_bp
 from .zones import zones_bp
+from .jobs import jobs_bp
+from .tiles import tiles_bp
+from .export import export_bp
+from .centres import centres_bp
+from .nearby import nearby_bp
+from .sites import sites_bp
 
 def register_blueprints(app):
     """Register all route blueprints"""
     app.register_blueprint(transit_bp, url_prefix="/transit")
     app.register_blueprint(business_bp, url_prefix="/business")
     app.register_blueprint(zones_bp, url_prefix="/zones")
+    app.register_blueprint(jobs_bp, url_prefix="/jobs")
+    app.register_blueprint(tiles_bp, url_prefix="/tiles")
+    app.register_blueprint(export_bp, url_prefix="/export")
+    app.register_blueprint(centres_bp, url_prefix="/centres")
+    app.register_blueprint(nearby_bp)
+    app.register_blueprint(sites_bp, url_prefix="/sites")
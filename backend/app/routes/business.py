@@ -1,7 +1,15 @@
 from flask import Blueprint, jsonify, request
-from utils.overpass_client import fetch_overpass_data
-from utils.overpass_parser import insert_business_nodes
+from sqlalchemy import text
+from utils.overpass_client import fetch_overpass_data, stream_overpass_elements, fetch_overpass_tiled
+from utils.overpass_parser import insert_business_nodes, ingest_business_elements
+from app import db
 from app.models import Business
+from app.services.job_service import job_manager
+from app.services.spatial import bbox_filter, parse_bbox
+from app.services.serialization import STREAM_BATCH_SIZE, iter_json_array, dumps
+from app.services.http_cache import cached_response, streamed_response
+from app.services.pagination import parse_limit, parse_page_size
+from app.services.business_service import list_businesses
 
 business_bp = Blueprint("business", __name__)
 
@@ -19,20 +27,72 @@ area["name"="Karnataka"]["boundary"="administrative"]["admin_level"="4"]->.searc
 out center;
 """
 
+# Same query split into bounding-box tiles ({bbox} is filled per tile)
+QUERY_TILED = """
+[out:json][timeout:90];
+area["name"="Karnataka"]["boundary"="administrative"]["admin_level"="4"]->.searchArea;
+(
+  nwr["office"~"company|it|software|research"](area.searchArea)({bbox});
+  nwr["shop"~"supermarket|mall|convenience"](area.searchArea)({bbox});
+  nwr["amenity"~"restaurant|cafe|fast_food"](area.searchArea)({bbox});
+  nwr["amenity"~"clinic|hospital"](area.searchArea)({bbox});
+  nwr["amenity"~"school|college"](area.searchArea)({bbox});
+);
+out center;
+"""
+
+def _run_business_load(job, stream=False, tiled=False, refresh=False):
+    """Fetch and insert business data, reporting progress on the job."""
+    if tiled:
+        job.update(stage="fetching")
+        data = fetch_overpass_tiled(QUERY_TILED, refresh=refresh)
+        job.update(stage="inserting", element_count=len(data.get("elements", [])))
+        inserted, skipped, updated = insert_business_nodes(data, progress=job.progress)
+    elif stream:
+        # Fetching and inserting overlap when streaming
+        job.update(stage="streaming")
+        inserted, skipped, updated = ingest_business_elements(
+            stream_overpass_elements(QUERY, refresh=refresh), progress=job.progress
+        )
+    else:
+        job.update(stage="fetching")
+        data = fetch_overpass_data(QUERY, refresh=refresh)
+        job.update(stage="inserting", element_count=len(data.get("elements", [])))
+        inserted, skipped, updated = insert_business_nodes(data, progress=job.progress)
+
+    job.progress(inserted, skipped, updated)
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": skipped,
+        "total_businesses": Business.query.count()
+    }
+
+
 @business_bp.route("/load", methods=["POST"])
 def load_business_data():
     """
-    Load business data from Overpass API into the database.
+    Load business data from Overpass API into the database as a background job.
     Only calls API if database is empty (unless ?force=true is passed).
+    A forced reload uses the cached Overpass response while it is fresh;
+    pass ?refresh=true to download again (implies force).
+    Pass ?stream=true to decode and insert elements in bounded-memory chunks.
+    Pass ?tiled=true to fetch all of Karnataka as concurrent tiles.
+
+    Returns 202 with a job id immediately; poll /jobs/<job_id> for progress.
+    A load already queued or running is returned instead of starting another.
     """
     try:
         # Check if force parameter is provided
         force = request.args.get('force', 'false').lower() == 'true'
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        stream = request.args.get('stream', 'false').lower() == 'true'
+        tiled = request.args.get('tiled', 'false').lower() == 'true'
         
         # Check if data already exists
         existing_count = Business.query.count()
         
-        if existing_count > 0 and not force:
+        if existing_count > 0 and not (force or refresh):
             return jsonify({
                 "status": "skipped",
                 "message": "Business data already exists in database. API call skipped.",
@@ -40,39 +100,89 @@ def load_business_data():
                 "hint": "Add ?force=true to force reload"
             }), 200
         
-        # Fetch data from Overpass API
-        data = fetch_overpass_data(QUERY)
-        inserted, skipped, updated = insert_business_nodes(data)
-        total = Business.query.count()
+        job, coalesced = job_manager.submit(
+            "business", lambda job: _run_business_load(job, stream=stream, tiled=tiled,
+                                                       refresh=refresh)
+        )
         
         return jsonify({
-            "status": "success", 
-            "message": "Business data loaded into Postgres",
-            "inserted": inserted,
-            "updated": updated,
-            "skipped": skipped,
-            "total_businesses": total
-        })
+            "status": "queued",
+            "message": "Business load already in progress" if coalesced else "Business load started",
+            "job_id": job.id,
+            "coalesced": coalesced,
+            "status_url": f"/jobs/{job.id}"
+        }), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @business_bp.route("/all", methods=["GET"])
 def get_all_businesses():
-    """Get all businesses from the database"""
+    """
+    Get all businesses from the database.
+    Optional: ?bbox=minLon,minLat,maxLon,maxLat to restrict to a viewport
+    (index-backed) and ?limit=N to cap the number of rows.
+    The rows are streamed as a JSON array; responses carry an ETag for
+    conditional requests.
+    """
     try:
-        businesses = Business.query.all()
-        result = [
-            {
-                "id": str(business.id),
-                "osm_id": business.osm_id,
-                "name": business.name,
-                "category": business.category,
-                "latitude": business.latitude,
-                "longitude": business.longitude,
-                "raw_tags": business.raw_tags
-            } for business in businesses
-        ]
-        return jsonify(result)
+        # Project only the served columns and stream them from a server-side
+        # cursor instead of hydrating and buffering every ORM object
+        stmt = db.select(
+            Business.id,
+            Business.osm_id,
+            Business.name,
+            Business.category,
+            Business.latitude,
+            Business.longitude,
+            Business.raw_tags
+        )
+        if request.args.get("bbox"):
+            sql, params = bbox_filter(*parse_bbox(request.args["bbox"]))
+            stmt = stmt.where(text(sql).bindparams(**params))
+        limit = parse_limit(request.args.get("limit"))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        stmt = stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+        # The listing is unbounded, so it is streamed (compressed on the
+        # fly) rather than built and cached as one body
+        return streamed_response(
+            ("businesses",), lambda: iter_json_array(db.session.execute(stmt))
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+
+
+@business_bp.route("/page", methods=["GET"])
+def get_businesses_page():
+    """
+    Page through businesses ordered by id.
+
+    Query params:
+        limit: Page size (default 100, max 1000)
+        after: "next" cursor from the previous page
+        category: Optional category, or comma-separated categories
+    """
+    try:
+        limit = parse_page_size(request.args.get("limit"))
+        categories = [c for c in request.args.get("category", "").split(",") if c]
+
+        def build():
+            businesses, next_cursor = list_businesses(
+                limit, after=request.args.get("after"), categories=categories
+            )
+            return dumps({
+                "status": "success",
+                "businesses": businesses,
+                "count": len(businesses),
+                "next": next_cursor
+            })
+
+        return cached_response(("businesses",), build)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
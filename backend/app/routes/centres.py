@@ -0,0 +1,40 @@
+from flask import Blueprint, jsonify, request
+from app.services.centre_service import get_centres, parse_centre_params
+from app.services.data_version import DATASETS
+from app.services.http_cache import cached_response
+from app.services.serialization import dumps
+
+centres_bp = Blueprint("centres", __name__)
+
+
+@centres_bp.route("", methods=["GET"])
+def get_urban_centres():
+    """
+    Detected urban centres: dense clusters of businesses and transit,
+    heaviest first.
+
+    Query params:
+        eps: Neighbourhood radius in meters (default 300)
+        min_weight: Summed point weight within eps that makes a core point
+                    (default 40)
+    """
+    try:
+        eps_m, min_weight = parse_centre_params(
+            request.args.get("eps") or None, request.args.get("min_weight") or None
+        )
+
+        def build():
+            centres = get_centres(eps_m, min_weight)
+            return dumps({
+                "status": "success",
+                "eps_m": eps_m,
+                "min_weight": min_weight,
+                "centres": centres,
+                "count": len(centres)
+            })
+
+        return cached_response(DATASETS, build)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -0,0 +1,33 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.services.export_service import EXPORT_FORMATS, iter_export
+from app.routes.zones import requested_resolution
+
+export_bp = Blueprint("export", __name__)
+
+
+@export_bp.route("/<dataset>.<fmt>", methods=["GET"])
+def export_dataset(dataset, fmt):
+    """
+    Download zones, businesses or transit_nodes as Parquet (.parquet) or an
+    Arrow IPC stream (.arrow), streamed one record batch at a time.
+
+    Query params:
+        resolution / zoom: Zone grid for the zones dataset (as for /zones/all)
+        tags: Comma-separated raw_tags keys to export as tag_* columns for
+              businesses (defaults to the common ones)
+    """
+    try:
+        options = {}
+        if dataset == "zones":
+            options["resolution"] = requested_resolution()
+        elif dataset == "businesses" and request.args.get("tags") is not None:
+            options["tags"] = [t for t in request.args["tags"].split(",") if t]
+
+        chunks = iter_export(dataset, fmt, **options)
+        response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[fmt])
+        response.headers["Content-Disposition"] = f"attachment; filename={dataset}.{fmt}"
+        return response
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
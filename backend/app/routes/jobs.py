@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify
+from app.services.job_service import job_manager
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+@jobs_bp.route("/", methods=["GET"])
+def list_jobs():
+    """List known background jobs, newest first"""
+    jobs = sorted(job_manager.list(), key=lambda j: j.created_at, reverse=True)
+    return jsonify({
+        "status": "success",
+        "jobs": [job.to_dict() for job in jobs]
+    })
+
+
+@jobs_bp.route("/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Get stage, counts, throughput and errors of a background job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Unknown job: {job_id}"}), 404
+    return jsonify({"status": "success", "job": job.to_dict()})
@@ -0,0 +1,75 @@
+from flask import Blueprint, Response, jsonify, request
+from app.services.point_index_service import (
+    DEFAULT_K, DEFAULT_LIMIT, DEFAULT_RADIUS_M, find_nearby, find_nearest
+)
+from app.services.serialization import dumps
+
+nearby_bp = Blueprint("nearby", __name__)
+
+
+def _coordinates():
+    """
+    Raises:
+        ValueError: If lat or lon is missing or not a number
+    """
+    if not request.args.get("lat") or not request.args.get("lon"):
+        raise ValueError("lat and lon are required")
+    return float(request.args["lat"]), float(request.args["lon"])
+
+
+@nearby_bp.route("/nearby", methods=["GET"])
+def get_nearby():
+    """
+    Businesses and transit nodes within a radius of a location, nearest first.
+
+    Query params:
+        lat, lon: Location (required)
+        radius: Radius in meters (default 1000, max 10000)
+        category: Optional business category or transit type
+        dataset: businesses, transit_nodes or both (default)
+        limit: Maximum results (default 100, max 1000)
+    """
+    try:
+        lat, lon = _coordinates()
+        found = find_nearby(
+            lat, lon,
+            radius_m=float(request.args.get("radius") or DEFAULT_RADIUS_M),
+            category=request.args.get("category") or None,
+            dataset=request.args.get("dataset"),
+            limit=int(request.args.get("limit") or DEFAULT_LIMIT)
+        )
+        return Response(dumps({"status": "success", **found}), mimetype="application/json")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@nearby_bp.route("/knn", methods=["GET"])
+def get_knn():
+    """
+    The k nearest businesses and transit nodes to a location.
+
+    Query params:
+        lat, lon: Location (required)
+        k: Number of neighbours (default 10, max 100)
+        category: Optional business category or transit type
+        dataset: businesses, transit_nodes or both (default)
+    """
+    try:
+        lat, lon = _coordinates()
+        results = find_nearest(
+            lat, lon,
+            k=int(request.args.get("k") or DEFAULT_K),
+            category=request.args.get("category") or None,
+            dataset=request.args.get("dataset")
+        )
+        return Response(dumps({
+            "status": "success",
+            "results": results,
+            "count": len(results)
+        }), mimetype="application/json")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
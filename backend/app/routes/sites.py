@@ -0,0 +1,60 @@
+from flask import Blueprint, Response, jsonify, request
+from flask_cors import cross_origin
+from app.routes.zones import requested_resolution
+from app.services.serialization import json_envelope
+from app.services.site_scoring_service import DEFAULT_COMPETITOR_RADIUS_M, get_site_scores_json
+
+sites_bp = Blueprint("sites", __name__)
+
+
+@sites_bp.route("/score", methods=["POST", "OPTIONS"])
+@cross_origin(origins="*", methods=["POST", "OPTIONS"], allow_headers=["Content-Type"])
+def score_candidate_sites():
+    """
+    Score candidate sites for a business type in one batch.
+
+    Query params: ?resolution= or ?zoom= selects the zone grid, as for
+    /zones/all; ?format=columns returns one array per field.
+
+    JSON body:
+        sites: List of {"lat": .., "lon": ..} or [lat, lon] (max 20000)
+        business_type: Business category (e.g. shop, amenity, office)
+        radius: Competitor search radius in meters (default 500)
+
+    Each scored site has its zone and zone scores, the distance to the
+    nearest transit stop of each type, and the number of same-category
+    businesses within the radius, in the order the sites were given.
+    """
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise ValueError("Expected a JSON object body")
+        business_type = body.get("business_type")
+        if not isinstance(business_type, str) or not business_type:
+            raise ValueError("business_type is required")
+        radius = body.get("radius", DEFAULT_COMPETITOR_RADIUS_M)
+        if isinstance(radius, bool) or not isinstance(radius, (int, float)):
+            raise ValueError("radius must be a number")
+
+        resolution = requested_resolution()
+        sites, count = get_site_scores_json(
+            body.get("sites"), business_type, radius_m=float(radius),
+            resolution=resolution, layout=request.args.get("format", "records")
+        )
+        return Response(json_envelope({
+            "status": "success",
+            "resolution": resolution,
+            "business_type": business_type,
+            "radius_m": float(radius),
+            "count": count
+        }, "sites", sites), mimetype="application/json")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
@@ -0,0 +1,18 @@
+from flask import Blueprint, Response, jsonify
+from app.services.tile_service import render_tile
+
+tiles_bp = Blueprint("tiles", __name__)
+
+
+@tiles_bp.route("/<layer>/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+def get_tile(layer, z, x, y):
+    """Mapbox Vector Tile for the businesses, transit_nodes or zones layer"""
+    try:
+        tile = render_tile(layer, z, x, y)
+        response = Response(tile, mimetype="application/vnd.mapbox-vector-tile")
+        response.headers["Cache-Control"] = "public, max-age=60"
+        return response
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -1,7 +1,16 @@
-from flask import Blueprint, jsonify, request
-from utils.overpass_client import fetch_overpass_data
-from utils.overpass_parser import insert_transit_nodes
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import text
+from utils.overpass_client import fetch_overpass_data, stream_overpass_elements, fetch_overpass_tiled
+from utils.overpass_parser import insert_transit_nodes, ingest_transit_elements
+from app import db
 from app.models import TransitNode
+from app.services.job_service import job_manager
+from app.services.spatial import bbox_filter, parse_bbox
+from app.services.serialization import STREAM_BATCH_SIZE, iter_json_array, dumps
+from app.services.http_cache import cached_response, streamed_response
+from app.services.pagination import parse_limit, parse_page_size
+from app.services.transit_service import list_transit_nodes
+from app.services.transit_cluster_service import get_transit_clusters, warm_transit_clusters
 
 transit_bp = Blueprint("transit", __name__)
 
@@ -35,20 +44,72 @@ limit 5000;
 # Use smaller query by default to avoid timeouts
 QUERY = QUERY_BANGALORE
 
+# Karnataka split into bounding-box tiles ({bbox} is filled per tile)
+QUERY_TILED = """
+[out:json][timeout:90];
+area["name"="Karnataka"]["boundary"="administrative"]["admin_level"="4"]->.searchArea;
+(
+  node["highway"="bus_stop"](area.searchArea)({bbox});
+  node["railway"="subway_entrance"](area.searchArea)({bbox});
+  node["railway"="station"](area.searchArea)({bbox});
+);
+out body;
+"""
+
+def _run_transit_load(job, stream=False, tiled=False, refresh=False):
+    """Fetch and insert transit data, reporting progress on the job."""
+    if tiled:
+        job.update(stage="fetching")
+        data = fetch_overpass_tiled(QUERY_TILED, refresh=refresh)
+        job.update(stage="inserting", element_count=len(data.get("elements", [])))
+        inserted, skipped, updated = insert_transit_nodes(data, progress=job.progress)
+    elif stream:
+        # Fetching and inserting overlap when streaming
+        job.update(stage="streaming")
+        inserted, skipped, updated = ingest_transit_elements(
+            stream_overpass_elements(QUERY, refresh=refresh), progress=job.progress
+        )
+    else:
+        job.update(stage="fetching")
+        data = fetch_overpass_data(QUERY, refresh=refresh)
+        job.update(stage="inserting", element_count=len(data.get("elements", [])))
+        inserted, skipped, updated = insert_transit_nodes(data, progress=job.progress)
+
+    job.progress(inserted, skipped, updated)
+    # Recompute the default clustering for the new data off the request path
+    warm_transit_clusters(current_app._get_current_object())
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": skipped,
+        "total_nodes": TransitNode.query.count()
+    }
+
+
 @transit_bp.route("/load_transit", methods=["POST"])
 def load_transit_data():
     """
-    Load transit data from Overpass API into the database.
+    Load transit data from Overpass API into the database as a background job.
     Only calls API if database is empty (unless ?force=true is passed).
+    A forced reload uses the cached Overpass response while it is fresh;
+    pass ?refresh=true to download again (implies force).
+    Pass ?stream=true to decode and insert elements in bounded-memory chunks.
+    Pass ?tiled=true to fetch all of Karnataka as concurrent tiles.
+
+    Returns 202 with a job id immediately; poll /jobs/<job_id> for progress.
+    A load already queued or running is returned instead of starting another.
     """
     try:
         # Check if force parameter is provided
         force = request.args.get('force', 'false').lower() == 'true'
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        stream = request.args.get('stream', 'false').lower() == 'true'
+        tiled = request.args.get('tiled', 'false').lower() == 'true'
         
         # Check if data already exists
         existing_count = TransitNode.query.count()
         
-        if existing_count > 0 and not force:
+        if existing_count > 0 and not (force or refresh):
             return jsonify({
                 "status": "skipped",
                 "message": "Data already exists in database. API call skipped.",
@@ -56,38 +117,120 @@ def load_transit_data():
                 "hint": "Add ?force=true to force reload"
             }), 200
         
-        # Fetch data from Overpass API
-        data = fetch_overpass_data(QUERY)
-        inserted, skipped, updated = insert_transit_nodes(data)
-        total = TransitNode.query.count()
+        job, coalesced = job_manager.submit(
+            "transit", lambda job: _run_transit_load(job, stream=stream, tiled=tiled,
+                                                     refresh=refresh)
+        )
         
         return jsonify({
-            "status": "success", 
-            "message": "Transit data loaded into Postgres",
-            "inserted": inserted,
-            "updated": updated,
-            "skipped": skipped,
-            "total_nodes": total
-        })
+            "status": "queued",
+            "message": "Transit load already in progress" if coalesced else "Transit load started",
+            "job_id": job.id,
+            "coalesced": coalesced,
+            "status_url": f"/jobs/{job.id}"
+        }), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @transit_bp.route("/all", methods=["GET"])
 def get_transit_nodes():
-    """Get all transit nodes from the database"""
-    from app.models import TransitNode
+    """
+    Get all transit nodes from the database.
+    Optional: ?bbox=minLon,minLat,maxLon,maxLat to restrict to a viewport
+    (index-backed) and ?limit=N to cap the number of rows.
+    The rows are streamed as a JSON array; responses carry an ETag for
+    conditional requests.
+    """
     try:
-        nodes = TransitNode.query.all()
-        result = [
-            {
-                "id": node.id,
-                "osm_id": node.osm_id,
-                "type": node.type,
-                "name": node.name,
-                "latitude": node.latitude,
-                "longitude": node.longitude
-            } for node in nodes
-        ]
-        return jsonify(result)
+        # Project only the served columns and stream them from a server-side
+        # cursor instead of hydrating and buffering every ORM object
+        stmt = db.select(
+            TransitNode.id,
+            TransitNode.osm_id,
+            TransitNode.type,
+            TransitNode.name,
+            TransitNode.latitude,
+            TransitNode.longitude
+        )
+        if request.args.get("bbox"):
+            sql, params = bbox_filter(*parse_bbox(request.args["bbox"]))
+            stmt = stmt.where(text(sql).bindparams(**params))
+        limit = parse_limit(request.args.get("limit"))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        stmt = stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+        # The listing is unbounded, so it is streamed (compressed on the
+        # fly) rather than built and cached as one body
+        return streamed_response(
+            ("transit_nodes",), lambda: iter_json_array(db.session.execute(stmt))
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@transit_bp.route("/page", methods=["GET"])
+def get_transit_nodes_page():
+    """
+    Page through transit nodes ordered by id.
+
+    Query params:
+        limit: Page size (default 100, max 1000)
+        after: "next" cursor from the previous page
+        type: Optional transit type, or comma-separated types
+    """
+    try:
+        limit = parse_page_size(request.args.get("limit"))
+        types = [t for t in request.args.get("type", "").split(",") if t]
+
+        def build():
+            nodes, next_cursor = list_transit_nodes(
+                limit, after=request.args.get("after"), types=types
+            )
+            return dumps({
+                "status": "success",
+                "nodes": nodes,
+                "count": len(nodes),
+                "next": next_cursor
+            })
+
+        return cached_response(("transit_nodes",), build)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@transit_bp.route("/clusters", methods=["GET"])
+def get_transit_node_clusters():
+    """
+    K-means clusters of transit nodes.
+
+    Query params:
+        k: Number of clusters (default: chosen by silhouette score)
+        assignments: "true" to include the cluster of every node as
+                     parallel "ids" and "labels" arrays
+    """
+    try:
+        k = int(request.args["k"]) if request.args.get("k") else None
+        assignments = request.args.get("assignments", "false").lower() == "true"
+
+        def build():
+            clusters = get_transit_clusters(k)
+            body = {
+                "status": "success",
+                "k": clusters["k"],
+                "scores": {str(key): score for key, score in clusters["scores"].items()},
+                "centroids": clusters["centroids"],
+            }
+            if assignments:
+                body["assignments"] = {"ids": clusters["ids"], "labels": clusters["labels"]}
+            return dumps(body)
+
+        return cached_response(("transit_nodes",), build)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
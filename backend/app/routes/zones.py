@@ -1,24 +1,67 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from flask_cors import cross_origin
-from app.services.zone_service import get_zones_json
+from app.services.zone_service import get_zones_json, get_zones_summary, get_zone_businesses
+from app.services.serialization import dumps, json_envelope, frame_records_json
+from app.services.http_cache import cached_response
+from app.services.data_version import DATASETS
+from app.services.zone_scoring_service import score_configurations
+from app.services.transit_access_service import get_zone_accessibility
+from app.services.pagination import parse_limit, parse_page_size
+from app.services.spatial import parse_bbox
+from app.services.zone_aggregate_service import (
+    DEFAULT_RESOLUTION, parse_resolution, resolution_for_zoom
+)
 
 zones_bp = Blueprint("zones", __name__)
 
 
+def requested_resolution():
+    """
+    Zone pyramid level from ?resolution= (degrees) or ?zoom= (web-map zoom).
+
+    Raises:
+        ValueError: If the value is not a supported resolution or zoom
+    """
+    if request.args.get("resolution"):
+        return parse_resolution(request.args["resolution"])
+    if request.args.get("zoom"):
+        return resolution_for_zoom(int(request.args["zoom"]))
+    return DEFAULT_RESOLUTION
+
+
 @zones_bp.route("/all", methods=["GET", "OPTIONS"])
 @cross_origin(origins="*", methods=["GET", "OPTIONS"], allow_headers=["Content-Type"])
 def get_all_zones():
-    """Get all classified zones from the database"""
+    """
+    Get all classified zones from the database.
+    Select the grid with ?resolution=0.2|0.05|0.01|0.002 or ?zoom=<map zoom>.
+    Optional: ?bbox=minLon,minLat,maxLon,maxLat and ?limit=N for a viewport.
+    Pass ?format=columns to get "zones" as one array per field instead of
+    a list of objects. Responses carry an ETag for conditional requests.
+    """
     if request.method == "OPTIONS":
         return jsonify({}), 200
     
     try:
-        zones = get_zones_json()
-        return jsonify({
-            "status": "success",
-            "zones": zones,
-            "count": len(zones)
-        })
+        resolution = requested_resolution()
+        bbox = parse_bbox(request.args["bbox"]) if request.args.get("bbox") else None
+        limit = parse_limit(request.args.get("limit"))
+        layout = request.args.get("format", "records")
+
+        def build():
+            zones, count, truncated = get_zones_json(
+                resolution, bbox=bbox, limit=limit, layout=layout
+            )
+            return json_envelope({
+                "status": "success",
+                "resolution": resolution,
+                "count": count,
+                "truncated": truncated
+            }, "zones", zones)
+
+        return cached_response(DATASETS, build)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -28,48 +71,144 @@ def get_all_zones():
 
 @zones_bp.route("/summary", methods=["GET", "OPTIONS"])
 @cross_origin(origins="*", methods=["GET", "OPTIONS"], allow_headers=["Content-Type"])
-def get_zones_summary():
-    """Get summary statistics of zones"""
+def get_zones_summary_route():
+    """Get summary statistics of zones (accepts ?resolution= or ?zoom=)"""
     if request.method == "OPTIONS":
         return jsonify({}), 200
     
     try:
-        from app.services.zone_service import get_zones_classified
-        
-        zones_df = get_zones_classified()
-        
-        if len(zones_df) == 0:
-            return jsonify({
-                "status": "success",
-                "summary": {
-                    "total_zones": 0,
-                    "by_type": {},
-                    "avg_scores": {}
-                }
-            })
-        
-        # Count by zone type
-        type_counts = zones_df["zone_type"].value_counts().to_dict()
-        
-        # Average scores
-        avg_scores = {
-            "zone_score": float(zones_df["zone_score"].mean()),
-            "pop_score": float(zones_df["pop_score"].mean()),
-            "biz_score": float(zones_df["biz_score"].mean()),
-            "trans_score": float(zones_df["trans_score"].mean())
-        }
-        
+        resolution = requested_resolution()
+        return cached_response(DATASETS, lambda: dumps({
+            "status": "success",
+            "summary": get_zones_summary(resolution)
+        }))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
         return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+
+
+@zones_bp.route("/score", methods=["POST", "OPTIONS"])
+@cross_origin(origins="*", methods=["POST", "OPTIONS"], allow_headers=["Content-Type"])
+def score_zones_what_if():
+    """
+    Score zones under one or more alternative weightings (what-if analysis).
+
+    Query params: ?resolution= or ?zoom= as for /zones/all.
+
+    JSON body:
+        configs: List of configs, or config: a single config. Each config
+                 may set pop_weight, trans_weight, biz_weight,
+                 saturation_penalty, opportunity_boost, access_weight,
+                 high_quantile and mid_quantile; missing keys use the
+                 /zones/all defaults.
+        top: Highest-scoring zones to return per config (default 10)
+    """
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise ValueError("Expected a JSON object body")
+        configs = body["configs"] if "configs" in body else [body.get("config", {})]
+        if not isinstance(configs, list):
+            raise ValueError("configs must be a list")
+        top = body.get("top", 10)
+        if isinstance(top, bool) or not isinstance(top, int):
+            raise ValueError("top must be an integer")
+
+        resolution = requested_resolution()
+        results = score_configurations(configs, resolution=resolution, top=top)
+        return Response(dumps({
             "status": "success",
-            "summary": {
-                "total_zones": int(len(zones_df)),
-                "by_type": type_counts,
-                "avg_scores": avg_scores
-            }
-        })
+            "resolution": resolution,
+            "results": results,
+            "count": len(results)
+        }), mimetype="application/json")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 500
 
+
+@zones_bp.route("/accessibility", methods=["GET", "OPTIONS"])
+@cross_origin(origins="*", methods=["GET", "OPTIONS"], allow_headers=["Content-Type"])
+def get_zones_accessibility():
+    """
+    Transit accessibility per zone: median and mean distance from the
+    zone's businesses to the nearest transit stop, and the share within
+    500 m. Accepts ?resolution= or ?zoom= as for /zones/all.
+    """
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+
+    try:
+        resolution = requested_resolution()
+
+        def build():
+            stats = get_zone_accessibility(resolution)
+            return json_envelope({
+                "status": "success",
+                "resolution": resolution,
+                "count": len(stats)
+            }, "zones", frame_records_json(stats))
+
+        return cached_response(("businesses", "transit_nodes"), build)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+
+@zones_bp.route("/<cell>/businesses", methods=["GET", "OPTIONS"])
+@cross_origin(origins="*", methods=["GET", "OPTIONS"], allow_headers=["Content-Type"])
+def get_zone_businesses_page(cell):
+    """
+    Page through the businesses of one zone.
+
+    Query params:
+        limit: Page size (default 100, max 1000)
+        after: "next" cursor from the previous page
+        tags: "all" for full raw tags, or comma-separated tag keys to project
+    """
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+
+    try:
+        limit = parse_page_size(request.args.get("limit"))
+        tags = request.args.get("tags")
+        if tags and tags != "all":
+            tags = [t for t in tags.split(",") if t]
+
+
+        def build():
+            businesses, next_cursor = get_zone_businesses(
+                cell, limit, after=request.args.get("after"), tags=tags
+            )
+            return dumps({
+                "status": "success",
+                "cell": cell,
+                "businesses": businesses,
+                "count": len(businesses),
+                "next": next_cursor
+            })
+
+        return cached_response(("businesses",), build)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
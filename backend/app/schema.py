@@ -0,0 +1,169 @@
+"""
+Idempotent schema upgrades for databases created before a model change.
+
+db.create_all() only creates missing tables, it never alters existing ones,
+so columns and unique keys added to the models later are applied here.
+"""
+from sqlalchemy import text
+from app.services.zone_aggregate_service import (
+    BASE_CELL_LAT_SQL, BASE_CELL_LON_SQL, build_zone_pyramid
+)
+
+
+UPGRADE_STATEMENTS = [
+    # businesses: rows loaded before osm_type existed are assumed to be
+    # nodes; a forced reload corrects ways/relations
+    """
+    ALTER TABLE businesses
+    ADD COLUMN IF NOT EXISTS osm_type VARCHAR NOT NULL DEFAULT 'node'
+    """,
+    # businesses: per-cell lookups with keyset pagination on (base cell, id)
+    # (/zones/<cell>/businesses). Cells of every resolution are ranges of
+    # base cells, so this one index serves them all; the expressions are
+    # the ones the queries use. It replaces the earlier index on fixed
+    # 0.05 degree cells.
+    """
+    DROP INDEX IF EXISTS ix_businesses_zone_cell
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_businesses_base_cell ON businesses (
+        ({BASE_CELL_LAT_SQL}), ({BASE_CELL_LON_SQL}), id
+    )
+    """,
+    # Fallback index for bounding-box lookups without PostGIS
+    """
+    CREATE INDEX IF NOT EXISTS ix_businesses_lat_lon ON businesses (latitude, longitude)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_transit_nodes_lat_lon ON transit_nodes (latitude, longitude)
+    """,
+    # Keyset-paginated listings (/business/page, /transit/page), filtered
+    # by category/type and ordered by primary key
+    """
+    CREATE INDEX IF NOT EXISTS ix_businesses_category_id ON businesses (category, id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_transit_nodes_type_id ON transit_nodes (type, id)
+    """,
+    # zone_aggregates: the single-resolution table (no scale column) is
+    # derived data, so it is dropped and rebuilt as a pyramid
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'zone_aggregates' AND column_name = 'scale'
+        ) THEN
+            DROP TABLE zone_aggregates;
+            CREATE TABLE zone_aggregates (
+                scale SMALLINT NOT NULL,
+                cell_lat INTEGER NOT NULL,
+                cell_lon INTEGER NOT NULL,
+                business_count INTEGER NOT NULL,
+                transport_count INTEGER NOT NULL,
+                PRIMARY KEY (scale, cell_lat, cell_lon)
+            );
+        END IF;
+    END $$
+    """,
+]
+
+# One-off migrations, keyed by the unique index they create: they run only
+# while that index is missing, so the full-table dedupes are not repeated
+# on every startup
+UNIQUE_KEY_MIGRATIONS = [
+    # transit_nodes: osm_id becomes a real unique key (needed for ON CONFLICT)
+    ("uq_transit_nodes_osm_id", [
+        """
+        DELETE FROM transit_nodes a
+        USING transit_nodes b
+        WHERE a.osm_id = b.osm_id AND a.id < b.id
+        """,
+        """
+        CREATE UNIQUE INDEX uq_transit_nodes_osm_id ON transit_nodes (osm_id)
+        """,
+    ]),
+    # businesses: (osm_type, osm_id) unique key so ways and nodes don't collide
+    ("uq_businesses_osm_type_osm_id", [
+        """
+        DELETE FROM businesses a
+        USING businesses b
+        WHERE a.osm_type = b.osm_type AND a.osm_id = b.osm_id AND a.ctid < b.ctid
+        """,
+        """
+        CREATE UNIQUE INDEX uq_businesses_osm_type_osm_id ON businesses (osm_type, osm_id)
+        """,
+    ]),
+]
+
+# Point geometry generated from latitude/longitude, so every insert or
+# update (including bulk upserts) keeps it current without ingest changes
+POSTGIS_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+]
+for _table in ("businesses", "transit_nodes"):
+    POSTGIS_STATEMENTS += [
+        f"""
+        ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS geom geometry(Point, 4326)
+        GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)) STORED
+        """,
+        f"CREATE INDEX IF NOT EXISTS ix_{_table}_geom ON {_table} USING GIST (geom)",
+        # Only a SQL radius filter used the geography index; radius
+        # lookups go through the in-memory point index instead
+        f"DROP INDEX IF EXISTS ix_{_table}_geog",
+    ]
+
+
+def enable_postgis(engine) -> bool:
+    """
+    Add the PostGIS geometry columns and GiST indexes if the extension can
+    be installed. Returns False (leaving the schema unchanged) otherwise,
+    in which case spatial lookups fall back to latitude/longitude ranges.
+    """
+    with engine.connect() as conn:
+        available = conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'postgis')"
+        )).scalar()
+    if not available:
+        print("[WARNING] PostGIS not available, using latitude/longitude fallback")
+        return False
+
+    try:
+        with engine.begin() as conn:
+            for statement in POSTGIS_STATEMENTS:
+                conn.execute(text(statement))
+        return True
+    except Exception as e:
+        print(f"[WARNING] Could not enable PostGIS ({e}), using latitude/longitude fallback")
+        return False
+
+
+def upgrade_schema(engine):
+    """
+    Apply all upgrade statements and any pending one-off migrations.
+    Safe to run on every startup.
+    Only Postgres is supported (the models use UUID/JSONB columns).
+
+    Returns:
+        True if PostGIS geometry columns are available
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+
+    with engine.begin() as conn:
+        for statement in UPGRADE_STATEMENTS:
+            conn.execute(text(statement))
+
+        for index_name, statements in UNIQUE_KEY_MIGRATIONS:
+            missing = conn.execute(
+                text("SELECT to_regclass(:name) IS NULL"), {"name": index_name}
+            ).scalar()
+            if missing:
+                for statement in statements:
+                    conn.execute(text(statement))
+
+        # zone_aggregates: fill once from data loaded before the table existed
+        if conn.execute(text("SELECT NOT EXISTS (SELECT 1 FROM zone_aggregates)")).scalar():
+            build_zone_pyramid(conn)
+
+    return enable_postgis(engine)
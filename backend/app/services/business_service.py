@@ -1,6 +1,10 @@
 """
 Business service for fetching and storing business data from Overpass API.
 """
+
+from app import db
+from app.models import Business
+from app.services.pagination import decode_uuid_cursor, encode_cursor
 from utils.overpass_client import fetch_overpass_data
 from utils.overpass_parser import insert_business_nodes
 
@@ -28,3 +32,37 @@ def store_business_data(overpass_json):
     """
     return insert_business_nodes(overpass_json)
 
+
+def list_businesses(limit: int, after: str = None, categories=None):
+    """
+    One page of businesses ordered by id, using keyset pagination so every
+    page costs the same index range scan regardless of depth.
+
+    Args:
+        limit: Page size
+        after: Cursor from the previous page's "next"
+        categories: Optional list of categories to include
+
+    Returns:
+        (list of business dicts, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    stmt = db.select(
+        Business.id, Business.osm_id, Business.osm_type, Business.name,
+        Business.category, Business.latitude, Business.longitude
+    )
+    if categories:
+        # Served by ix_businesses_category_id
+        stmt = stmt.where(Business.category.in_(categories))
+    if after:
+        stmt = stmt.where(Business.id > decode_uuid_cursor(after))
+    rows = db.session.execute(stmt.order_by(Business.id).limit(limit + 1)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(str(rows[-1]["id"]))
+
+    return [dict(row, id=str(row["id"])) for row in rows], next_cursor
@@ -0,0 +1,292 @@
+"""
+Detection of urban (sub)centres: dense clusters of businesses and transit.
+
+Businesses and transit nodes are clustered together with weighted DBSCAN
+under the haversine metric (BallTree neighbour search). Every point has a
+weight by business category or transit type, and a point is a core point
+when the weights within eps of it add up to min_weight.
+
+To scale to the whole state, points are partitioned into grid tiles. Each
+tile is clustered together with an eps-wide buffer around it, in a
+process pool, and the tiles are merged afterwards. A point's core status
+is exact in the tile that owns it, because its whole neighbourhood lies
+inside that tile's buffer. Tile clusters that share a core point belong to
+the same centre, so the merged result is the same as clustering all
+points at once.
+
+Centres are cached per data version and parameter set.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import DBSCAN
+
+from app.services.data_version import VersionedCache
+from app.services.point_store import get_points
+from app.services.spatial import EARTH_RADIUS_M, METERS_PER_DEGREE
+
+# Weight of each point by business category / transit type (others: 1)
+CATEGORY_WEIGHTS = {"office": 1.5, "shop": 1.0, "amenity": 1.0, "other": 0.5}
+TRANSIT_WEIGHTS = {"railway_station": 5.0, "subway_entrance": 3.0, "bus_stop": 1.0}
+
+DEFAULT_EPS_M = 300
+DEFAULT_MIN_WEIGHT = 40
+EPS_RANGE_M = (50, 2000)
+MIN_WEIGHT_RANGE = (2, 10000)
+
+# Partition grid (degrees) and the point count below which no pool is used
+TILE_DEG = 0.5
+PARALLEL_MIN_POINTS = 50_000
+MAX_WORKERS = int(os.getenv("CENTRE_WORKERS", os.cpu_count() or 1))
+
+TOP_CATEGORIES = 3
+
+_centre_cache = VersionedCache()
+
+
+def _weighted_points() -> pd.DataFrame:
+    """Businesses and transit nodes as one frame with kind, category and weight."""
+    frames = []
+    for kind, dataset, weights in (("business", "businesses", CATEGORY_WEIGHTS),
+                                   ("transit", "transit_nodes", TRANSIT_WEIGHTS)):
+        points = get_points(dataset)
+        categories = np.asarray(points.categories + [None], dtype=object)
+        code_weights = np.array([weights.get(c, 1.0) for c in points.categories] + [1.0])
+        frames.append(pd.DataFrame({
+            "latitude": points.lat,
+            "longitude": points.lon,
+            "kind": kind,
+            # Code -1 (missing category) maps to the trailing entry
+            "category": categories[points.category_codes],
+            "weight": code_weights[points.category_codes],
+        }))
+    points = pd.concat(frames, ignore_index=True)
+    return points.sort_values("longitude", ignore_index=True)
+
+
+def cluster_partition(lat, lon, weight, eps_m, min_weight):
+    """
+    Weighted haversine DBSCAN of one partition. Module-level so it can run
+    in a worker process.
+
+    Returns:
+        (labels, core mask), labels -1 for noise
+    """
+    model = DBSCAN(
+        eps=eps_m / EARTH_RADIUS_M, min_samples=min_weight,
+        metric="haversine", algorithm="ball_tree"
+    ).fit(np.radians(np.column_stack((lat, lon))), sample_weight=weight)
+    core = np.zeros(len(lat), dtype=bool)
+    core[model.core_sample_indices_] = True
+    return model.labels_.astype(np.int64), core
+
+
+def partition_points(lat, lon, eps_m, tile_deg=TILE_DEG):
+    """
+    Split lon-sorted points into grid tiles with a buffer of at least eps.
+
+    Returns:
+        List of (indices of the tile's points including its buffer,
+        mask of those owned by the tile)
+    """
+    if len(lat) == 0:
+        return []
+    lat_buffer = eps_m / METERS_PER_DEGREE
+    # Degrees of longitude shrink towards the poles; size for the worst latitude
+    max_abs_lat = min(float(np.abs(lat).max()) + lat_buffer, 89.0)
+    lon_buffer = lat_buffer / np.cos(np.radians(max_abs_lat))
+
+    tile_lat = np.floor(lat / tile_deg).astype(np.int64)
+    tile_lon = np.floor(lon / tile_deg).astype(np.int64)
+
+    partitions = []
+    for tx in np.unique(tile_lon):
+        west, east = tx * tile_deg, (tx + 1) * tile_deg
+        start = np.searchsorted(lon, west - lon_buffer, side="left")
+        end = np.searchsorted(lon, east + lon_buffer, side="right")
+        column = np.arange(start, end)
+        for ty in np.unique(tile_lat[column][tile_lon[column] == tx]):
+            south, north = ty * tile_deg, (ty + 1) * tile_deg
+            lat_col = lat[column]
+            indices = column[(lat_col >= south - lat_buffer) & (lat_col <= north + lat_buffer)]
+            owned = (tile_lat[indices] == ty) & (tile_lon[indices] == tx)
+            partitions.append((indices, owned))
+    return partitions
+
+
+def detect_clusters(lat, lon, weight, eps_m=DEFAULT_EPS_M, min_weight=DEFAULT_MIN_WEIGHT,
+                    tile_deg=TILE_DEG, max_workers=MAX_WORKERS):
+    """
+    Weighted haversine DBSCAN over lon-sorted points, partitioned into tiles
+    and merged.
+
+    Returns:
+        int array of cluster labels (0..n_clusters-1, -1 for noise)
+    """
+    n = len(lat)
+    partitions = partition_points(lat, lon, eps_m, tile_deg)
+    jobs = [(lat[idx], lon[idx], weight[idx], eps_m, min_weight) for idx, _ in partitions]
+
+    if len(jobs) > 1 and n >= PARALLEL_MIN_POINTS and max_workers > 1:
+        # spawn: the server process has threads and open connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs)),
+                                 mp_context=context) as executor:
+            results = list(executor.map(cluster_partition, *zip(*jobs)))
+    else:
+        results = [cluster_partition(*job) for job in jobs]
+
+    # -------------------------------------------------
+    # Merge: tile labels -> global ids, then union clusters sharing a core point
+    # -------------------------------------------------
+    true_core = np.zeros(n, dtype=bool)
+    owner_label = np.full(n, -1, dtype=np.int64)
+    fallback_label = np.full(n, -1, dtype=np.int64)
+    offset = 0
+    shifted = []
+    for (indices, owned), (labels, core) in zip(partitions, results):
+        count = int(labels.max()) + 1
+        labels = np.where(labels >= 0, labels + offset, -1)
+        offset += count
+        true_core[indices[owned]] = core[owned]
+        owner_label[indices[owned]] = labels[owned]
+        shifted.append((indices, labels))
+
+    edges_a, edges_b = [], []
+    for indices, labels in shifted:
+        clustered = labels >= 0
+        # Border points that are noise in their own tile join a neighbour's cluster
+        fallback_label[indices[clustered]] = labels[clustered]
+        linked = clustered & true_core[indices]
+        edges_a.append(labels[linked])
+        edges_b.append(owner_label[indices[linked]])
+
+    if offset == 0:
+        return np.full(n, -1, dtype=np.int64)
+    a, b = np.concatenate(edges_a), np.concatenate(edges_b)
+    graph = coo_matrix((np.ones(len(a)), (a, b)), shape=(offset, offset))
+    _, component = connected_components(graph, directed=False)
+
+    point_label = np.where(owner_label >= 0, owner_label, fallback_label)
+    merged = np.where(point_label >= 0, component[np.maximum(point_label, 0)], -1)
+    # Renumber merged clusters 0..n_clusters-1
+    _, compact = np.unique(merged[merged >= 0], return_inverse=True)
+    labels = np.full(n, -1, dtype=np.int64)
+    labels[merged >= 0] = compact
+    return labels
+
+
+def summarize_centres(points: pd.DataFrame, labels: np.ndarray) -> list:
+    """
+    One record per cluster, heaviest first.
+
+    Returns:
+        List of dicts with centre (rank), latitude/longitude (weighted
+        centroid), weight, business_count, transit_count, extent
+        (bounding box), radius_m (farthest member from the centroid),
+        dominant_categories and transit_types
+    """
+    members = points.assign(cluster=labels)
+    members = members[members["cluster"] >= 0]
+    if members.empty:
+        return []
+
+    members = members.assign(
+        w_lat=members["latitude"] * members["weight"],
+        w_lon=members["longitude"] * members["weight"],
+    )
+    stats = members.groupby("cluster").agg(
+        weight=("weight", "sum"), w_lat=("w_lat", "sum"), w_lon=("w_lon", "sum"),
+        min_lat=("latitude", "min"), max_lat=("latitude", "max"),
+        min_lon=("longitude", "min"), max_lon=("longitude", "max"),
+    )
+    stats["latitude"] = stats.pop("w_lat") / stats["weight"]
+    stats["longitude"] = stats.pop("w_lon") / stats["weight"]
+
+    # Farthest member from its centroid (haversine)
+    centre_lat = np.radians(stats["latitude"].reindex(members["cluster"]).to_numpy())
+    centre_lon = np.radians(stats["longitude"].reindex(members["cluster"]).to_numpy())
+    lat = np.radians(members["latitude"].to_numpy())
+    lon = np.radians(members["longitude"].to_numpy())
+    h = (np.sin((lat - centre_lat) / 2) ** 2
+         + np.cos(lat) * np.cos(centre_lat) * np.sin((lon - centre_lon) / 2) ** 2)
+    distance = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+    stats["radius_m"] = pd.Series(distance).groupby(members["cluster"].to_numpy()).max()
+
+    kinds = members.groupby(["cluster", "kind"]).size()
+    counts = members.groupby(["cluster", "kind", "category"]).size()
+    stats = stats.sort_values("weight", ascending=False)
+
+    centres = []
+    for rank, (cluster, row) in enumerate(stats.iterrows(), start=1):
+        kind_counts = kinds.loc[cluster]
+        by_kind = counts.loc[cluster] if cluster in counts.index else pd.Series(dtype=np.int64)
+        business = by_kind.get("business", pd.Series(dtype=np.int64)).sort_values(ascending=False)
+        transit = by_kind.get("transit", pd.Series(dtype=np.int64)).sort_values(ascending=False)
+        centres.append({
+            "centre": rank,
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+            "weight": float(row["weight"]),
+            "business_count": int(kind_counts.get("business", 0)),
+            "transit_count": int(kind_counts.get("transit", 0)),
+            "extent": {
+                "min_lat": float(row["min_lat"]), "min_lon": float(row["min_lon"]),
+                "max_lat": float(row["max_lat"]), "max_lon": float(row["max_lon"]),
+            },
+            "radius_m": float(row["radius_m"]),
+            "dominant_categories": [
+                {"category": category, "count": int(count)}
+                for category, count in business.head(TOP_CATEGORIES).items()
+            ],
+            "transit_types": {t: int(count) for t, count in transit.items()},
+        })
+    return centres
+
+
+def parse_centre_params(eps_m=None, min_weight=None) -> tuple:
+    """
+    Raises:
+        ValueError: If eps_m or min_weight is out of range
+    """
+    eps_m = DEFAULT_EPS_M if eps_m is None else float(eps_m)
+    min_weight = DEFAULT_MIN_WEIGHT if min_weight is None else int(min_weight)
+    if not EPS_RANGE_M[0] <= eps_m <= EPS_RANGE_M[1]:
+        raise ValueError(f"eps must be between {EPS_RANGE_M[0]} and {EPS_RANGE_M[1]} meters")
+    if not MIN_WEIGHT_RANGE[0] <= min_weight <= MIN_WEIGHT_RANGE[1]:
+        raise ValueError(
+            f"min_weight must be between {MIN_WEIGHT_RANGE[0]} and {MIN_WEIGHT_RANGE[1]}"
+        )
+    return eps_m, min_weight
+
+
+def get_centres(eps_m=None, min_weight=None) -> list:
+    """
+    Detected centres for the current data, cached per data version.
+
+    Args:
+        eps_m: Neighbourhood radius in meters (default DEFAULT_EPS_M)
+        min_weight: Weight within eps_m that makes a core point
+
+    Returns:
+        List of centre dicts (see summarize_centres)
+
+    Raises:
+        ValueError: For out-of-range parameters
+    """
+    eps_m, min_weight = parse_centre_params(eps_m, min_weight)
+
+    def compute():
+        points = _weighted_points()
+        labels = detect_clusters(
+            points["latitude"].to_numpy(), points["longitude"].to_numpy(),
+            points["weight"].to_numpy(), eps_m=eps_m, min_weight=min_weight
+        )
+        return summarize_centres(points, labels)
+
+    return _centre_cache.get_or_compute(compute, key=(eps_m, min_weight))
@@ -0,0 +1,96 @@
+"""
+Data versions for cache invalidation.
+
+Ingestion bumps a per-dataset counter in the data_versions table in the
+same transaction as the rows it writes, so every process (the API server,
+the load scripts) sees the change. Caches store the version they were
+computed at and recompute when it moves.
+"""
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app import db
+from app.models import DataVersion
+
+DATASETS = ("businesses", "transit_nodes")
+
+
+def bump_data_version(dataset: str):
+    """Increment a dataset's version. Does not commit."""
+    stmt = pg_insert(DataVersion).values(name=dataset, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": DataVersion.version + 1, "updated_at": db.func.now()}
+    )
+    db.session.execute(stmt)
+
+
+def get_data_version(datasets=DATASETS) -> tuple:
+    """Current versions of the given datasets (0 if never loaded)."""
+    rows = db.session.execute(select(DataVersion.name, DataVersion.version)).all()
+    versions = dict(rows)
+    return tuple(versions.get(name, 0) for name in datasets)
+
+
+class VersionedCache:
+    """
+    In-memory cache whose entries are only valid for the data version they
+    were computed at.
+
+    Concurrent misses for the same key are single-flighted: one caller
+    computes while the others wait and then reuse its result. With
+    max_entries set, the least recently used keys are evicted.
+    """
+
+    def __init__(self, datasets=DATASETS, max_entries=None):
+        self.datasets = datasets
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, value)
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return True, entry[1]
+        return False, None
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get_or_compute(self, compute, key=None, version=None):
+        """
+        Return the cached value for key at the current data version,
+        calling compute() to build it on a miss.
+        """
+        if version is None:
+            version = get_data_version(self.datasets)
+
+        hit, value = self._lookup(key, version)
+        if hit:
+            return value
+
+        with self._key_lock(key):
+            hit, value = self._lookup(key, version)
+            if hit:
+                return value
+
+            value = compute()
+            with self._lock:
+                self._entries[key] = (version, value)
+                self._entries.move_to_end(key)
+                if self.max_entries is not None:
+                    while len(self._entries) > self.max_entries:
+                        old_key, _ = self._entries.popitem(last=False)
+                        self._key_locks.pop(old_key, None)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,269 @@
+"""
+Columnar exports of zones, businesses and transit nodes as Apache Parquet
+or Arrow IPC.
+
+Point tables are read from a server-side cursor in batches and each batch
+becomes one Arrow record batch (a Parquet row group), so memory stays
+bounded by the batch size and output starts with the first batch. Rows
+come in table order (no sort, so nothing is read ahead of the first
+batch). Business tags are flattened into one typed column per exported tag key instead of
+a JSON blob.
+"""
+import re
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+from sqlalchemy import text
+
+from app import db
+from app.services.zone_aggregate_service import DEFAULT_RESOLUTION
+from app.services.zone_service import get_zones_classified
+
+EXPORT_DATASETS = ("zones", "businesses", "transit_nodes")
+
+# Format -> HTTP content type
+EXPORT_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Rows per record batch (and Parquet row group)
+EXPORT_BATCH_SIZE = 50_000
+
+# raw_tags keys exported as columns by default
+EXPORT_TAGS = (
+    "amenity", "shop", "office", "cuisine", "brand",
+    "opening_hours", "addr:city", "addr:postcode",
+)
+
+PARQUET_COMPRESSION = "zstd"
+
+
+def require_pyarrow():
+    """
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is required for exports (pip install pyarrow)")
+
+
+def validate_export(dataset: str, fmt: str = None):
+    """
+    Raises:
+        ValueError: For an unknown dataset or format
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset} (use one of {', '.join(EXPORT_DATASETS)})")
+    if fmt is not None and fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (use one of {', '.join(EXPORT_FORMATS)})")
+
+
+def tag_column(key: str) -> str:
+    """Column name for a tag key, e.g. "addr:city" -> "tag_addr_city"."""
+    return "tag_" + re.sub(r"[^0-9a-zA-Z]+", "_", key).strip("_").lower()
+
+
+def tag_columns(tags) -> dict:
+    """
+    Column names for the exported tag keys, with repeated keys dropped.
+
+    Returns:
+        Dict mapping tag key -> column name, in first-seen order
+
+    Raises:
+        ValueError: If a key has no usable column name or two keys map to
+                    the same column (e.g. "addr:city" and "addr_city")
+    """
+    columns = {}
+    owners = {}
+    for key in tags:
+        if key in columns:
+            continue
+        column = tag_column(key)
+        if column == "tag_":
+            raise ValueError(f"Tag key {key!r} has no usable column name")
+        if column in owners:
+            raise ValueError(
+                f"Tag keys {owners[column]!r} and {key!r} both map to column {column}"
+            )
+        columns[key] = owners[column] = column
+    return columns
+
+
+def _business_source(tags):
+    columns = [
+        ("id", pa.string()), ("osm_id", pa.int64()), ("osm_type", pa.string()),
+        ("name", pa.string()), ("category", pa.string()),
+        ("latitude", pa.float64()), ("longitude", pa.float64()),
+    ]
+    tag_sql = ""
+    params = {}
+    for i, (key, column) in enumerate(tag_columns(tags).items()):
+        # ->> extracts the tag as text in SQL; the JSON is never parsed in Python
+        tag_sql += f", raw_tags ->> :tag_{i}"
+        params[f"tag_{i}"] = key
+        columns.append((column, pa.string()))
+
+    sql = f"""
+        SELECT id::text, osm_id, osm_type, name, category, latitude, longitude{tag_sql}
+        FROM businesses
+    """
+    return sql, params, pa.schema(columns)
+
+
+def _transit_source():
+    sql = """
+        SELECT id, osm_id, type, name, latitude, longitude
+        FROM transit_nodes
+    """
+    schema = pa.schema([
+        ("id", pa.int64()), ("osm_id", pa.string()), ("type", pa.string()),
+        ("name", pa.string()), ("latitude", pa.float64()), ("longitude", pa.float64()),
+    ])
+    return sql, {}, schema
+
+
+def _cursor_batches(sql, params, schema, batch_size):
+    result = db.session.execute(
+        text(sql).execution_options(yield_per=batch_size), params
+    )
+    for rows in result.partitions(batch_size):
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema
+        )
+
+
+def export_batches(dataset: str, resolution=DEFAULT_RESOLUTION, tags=EXPORT_TAGS,
+                   batch_size=EXPORT_BATCH_SIZE):
+    """
+    Schema and record batches of a dataset. For point tables the query is
+    executed here, so database errors surface before any output is written.
+
+    Args:
+        resolution: Zone pyramid level (zones only)
+        tags: raw_tags keys to flatten into columns (businesses only)
+
+    Returns:
+        (pyarrow.Schema, iterator of pyarrow.RecordBatch)
+
+    Raises:
+        ValueError: For an unknown dataset or tag keys that collide
+    """
+    require_pyarrow()
+    validate_export(dataset)
+
+    if dataset == "zones":
+        table = pa.Table.from_pandas(get_zones_classified(resolution), preserve_index=False)
+        return table.schema, iter(table.to_batches(max_chunksize=batch_size))
+
+    if dataset == "businesses":
+        sql, params, schema = _business_source(tags)
+    else:
+        sql, params, schema = _transit_source()
+
+    batches = _cursor_batches(sql, params, schema, batch_size)
+    # Run the query now; batches are converted lazily as they are consumed
+    first = next(batches, None)
+    if first is None:
+        return schema, iter(())
+
+    def chained():
+        yield first
+        yield from batches
+
+    return schema, chained()
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes for a streaming response."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _open_writer(fmt, sink, schema, ipc_file=False):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION)
+    if ipc_file:
+        return pa.ipc.new_file(sink, schema)
+    return pa.ipc.new_stream(sink, schema)
+
+
+def iter_export(dataset: str, fmt: str, **options):
+    """
+    Encode a dataset as Parquet or an Arrow IPC stream, yielding bytes
+    after every record batch.
+
+    Args:
+        options: Passed to export_batches
+
+    Raises:
+        ValueError: For an unknown dataset or format
+        RuntimeError: If pyarrow is not installed
+    """
+    validate_export(dataset, fmt)
+    schema, batches = export_batches(dataset, **options)
+
+    def generate():
+        sink = _ChunkSink()
+        writer = _open_writer(fmt, pa.PythonFile(sink, mode="w"), schema)
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
+
+
+def export_to_file(dataset: str, fmt: str, path: str, **options) -> int:
+    """
+    Write a dataset to a local file. Arrow output uses the IPC file format,
+    which readers can memory-map (pyarrow.ipc.open_file(pyarrow.memory_map(path))).
+
+    Returns:
+        Number of rows written
+    """
+    validate_export(dataset, fmt)
+    schema, batches = export_batches(dataset, **options)
+
+    rows = 0
+    with pa.OSFile(path, "wb") as sink:
+        writer = _open_writer(fmt, sink, schema, ipc_file=True)
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+        writer.close()
+    return rows
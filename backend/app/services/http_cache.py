@@ -0,0 +1,244 @@
+"""
+Conditional GET and precompressed bodies for the read endpoints.
+
+Responses get a strong ETag derived from the request (path and query),
+the data version of the datasets they are built from and the content
+encoding, so a client that already has the current body gets a 304 after
+a single version lookup.
+
+Bounded bodies (pages, zone listings) are encoded once per data version
+and kept in an LRU cache bounded by total bytes. Each encoding is
+compressed the first time a client asks for it, from the cached identity
+body. Requests keyed by a viewport (?bbox=) or a page cursor (?after=)
+are rarely repeated, and bodies above MAX_CACHED_BODY_BYTES would crowd
+out everything else, so those are compressed for the one request with
+cheaper settings and not cached. Unbounded row listings are streamed
+instead (see streamed_response): they are compressed chunk by chunk as
+they are sent and never held in memory or cached.
+"""
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+
+from flask import Response, request, stream_with_context
+
+from app.services.data_version import get_data_version
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+# Cheaper settings for bodies compressed for a single response
+STREAM_GZIP_LEVEL = 5
+STREAM_BROTLI_QUALITY = 4
+
+# Bodies are immutable for a data version, but clients must revalidate
+CACHE_CONTROL = "no-cache"
+
+# Total bytes of cached bodies (all encodings), and the largest body cached
+BODY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+MAX_CACHED_BODY_BYTES = 4 * 1024 * 1024
+
+# Query parameters whose values make a request a one-off
+UNCACHED_ARGS = ("bbox", "after")
+
+
+class BodyCache:
+    """
+    LRU cache of encoded bodies per request key and data version, bounded
+    by the total size of the stored bodies. Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = BODY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (version, {encoding: bytes})
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version, encoding):
+        """The body in encoding (None for identity), or None if not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1].get(encoding)
+
+    def put(self, key, version, encoding, body: bytes):
+        """Store a body; other encodings of the same version are kept."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self.size -= sum(map(len, entry[1].values()))
+                entry = self._entries[key] = (version, {})
+            bodies = entry[1]
+            self.size += len(body) - len(bodies.get(encoding, b""))
+            bodies[encoding] = body
+            self._entries.move_to_end(key)
+            while self.size > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= sum(map(len, evicted.values()))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_body_cache = BodyCache()
+
+
+def supported_encodings() -> tuple:
+    """Content encodings bodies are compressed with, preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(body: bytes, encoding, cached: bool = True) -> bytes:
+    """
+    Compress a body in one encoding ("gzip", "br" or None for identity).
+
+    Args:
+        cached: Use the stronger settings, worth it for reused bodies
+    """
+    if encoding is None:
+        return body
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY if cached else STREAM_BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL if cached else STREAM_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    """
+    Compress an iterable of byte chunks as it is consumed.
+
+    Args:
+        encoding: "gzip", "br" or None (chunks are passed through)
+
+    Yields:
+        Compressed byte chunks
+    """
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=STREAM_BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(STREAM_GZIP_LEVEL, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        out = process(chunk)
+        if out:
+            yield out
+    yield finish()
+
+
+def _request_key() -> tuple:
+    return request.path, tuple(sorted(request.args.items(multi=True)))
+
+
+def make_etag(datasets, version, encoding=None) -> str:
+    """
+    Strong ETag for the current request at a data version. Each content
+    encoding is a different representation, so it gets its own ETag.
+    """
+    digest = hashlib.sha1(repr((_request_key(), tuple(datasets), version)).encode("utf-8"))
+    return digest.hexdigest() if encoding is None else f"{digest.hexdigest()}-{encoding}"
+
+
+def _preferred_encoding():
+    for encoding in supported_encodings():
+        if encoding in request.accept_encodings:
+            return encoding
+    return None
+
+
+def _finish(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _cacheable() -> bool:
+    return not any(request.args.get(arg) for arg in UNCACHED_ARGS)
+
+
+def cached_response(datasets, build, mimetype="application/json") -> Response:
+    """
+    Serve the current request with ETag/If-None-Match support, from the
+    body cache when the request is cacheable (see module docstring). Only
+    for bodies of bounded size.
+
+    Args:
+        datasets: Datasets the body depends on (see data_version.DATASETS)
+        build: Callable returning the body as bytes or an iterable of byte
+               chunks; called at most once per request key and data version
+               while the body stays cached
+
+    Returns:
+        304 if the client's ETag is current, else the (compressed) body
+    """
+    version = get_data_version(datasets)
+    encoding = _preferred_encoding()
+    etag = make_etag(datasets, version, encoding)
+    if etag in request.if_none_match:
+        return _finish(Response(status=304), etag)
+
+    key = _request_key()
+    cacheable = _cacheable()
+    body = _body_cache.get(key, version, encoding) if cacheable else None
+    if body is None:
+        plain = _body_cache.get(key, version, None) if cacheable else None
+        if plain is None:
+            plain = build()
+            if not isinstance(plain, bytes):
+                plain = b"".join(plain)
+            cacheable = cacheable and len(plain) <= MAX_CACHED_BODY_BYTES
+            if cacheable:
+                _body_cache.put(key, version, None, plain)
+        body = compress(plain, encoding, cached=cacheable)
+        if cacheable and encoding is not None:
+            _body_cache.put(key, version, encoding, body)
+
+    response = Response(body, mimetype=mimetype)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    return _finish(response, etag)
+
+
+def streamed_response(datasets, stream, mimetype="application/json") -> Response:
+    """
+    Serve an unbounded body with ETag/If-None-Match support, streaming it
+    (compressed on the fly when the client accepts it). Nothing is
+    buffered or cached, so the first bytes go out as soon as the first
+    chunk is ready.
+
+    Args:
+        datasets: Datasets the body depends on (see data_version.DATASETS)
+        stream: Callable returning an iterable of byte chunks
+
+    Returns:
+        304 if the client's ETag is current, else the streamed body
+    """
+    version = get_data_version(datasets)
+    encoding = _preferred_encoding()
+    etag = make_etag(datasets, version, encoding)
+    if etag in request.if_none_match:
+        return _finish(Response(status=304), etag)
+
+    response = Response(stream_with_context(compress_stream(stream(), encoding)),
+                        mimetype=mimetype)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    return _finish(response, etag)
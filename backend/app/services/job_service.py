@@ -0,0 +1,138 @@
+"""
+Background job service for long-running ingestion work.
+
+Jobs run on a small in-process thread pool inside a Flask app context.
+Only one job per dataset runs at a time; a duplicate request while a job
+is queued or running gets the existing job back instead of a new one.
+"""
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+MAX_WORKERS = 2
+# Finished jobs kept for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 100
+
+
+class Job:
+    """State of one background job, updated by the worker and read by /jobs."""
+
+    def __init__(self, dataset: str):
+        self.id = uuid.uuid4().hex
+        self.dataset = dataset
+        self.status = "queued"  # queued, running, succeeded, failed
+        self.stage = "queued"
+        self.element_count = None
+        self.inserted = 0
+        self.skipped = 0
+        self.updated = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+
+    def progress(self, inserted: int, skipped: int, updated: int):
+        """Progress callback for the ingest functions."""
+        self.update(inserted=inserted, skipped=skipped, updated=updated)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            processed = self.inserted + self.skipped + self.updated
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            return {
+                "job_id": self.id,
+                "dataset": self.dataset,
+                "status": self.status,
+                "stage": self.stage,
+                "element_count": self.element_count,
+                "processed": processed,
+                "inserted": self.inserted,
+                "skipped": self.skipped,
+                "updated": self.updated,
+                "elapsed_seconds": round(elapsed, 2),
+                "elements_per_second": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    """Runs jobs on a thread pool and coalesces duplicates per dataset."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="ingest-job")
+        self._jobs = {}
+        self._active = {}  # dataset -> job id
+        self._lock = threading.Lock()
+
+    def submit(self, dataset: str, fn):
+        """
+        Queue fn(job) to run in the background.
+
+        Returns:
+            (job, coalesced) where coalesced is True if an already queued
+            or running job for the same dataset was returned instead
+        """
+        app = current_app._get_current_object()
+
+        with self._lock:
+            active_id = self._active.get(dataset)
+            if active_id is not None:
+                return self._jobs[active_id], True
+
+            job = Job(dataset)
+            self._jobs[job.id] = job
+            self._active[dataset] = job.id
+            self._prune()
+
+        self._executor.submit(self._run, app, job, fn)
+        return job, False
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(self, app, job: Job, fn):
+        job.update(status="running", stage="starting", started_at=time.time())
+        try:
+            with app.app_context():
+                result = fn(job)
+            job.update(status="succeeded", stage="done", result=result)
+        except Exception as e:
+            traceback.print_exc()
+            job.update(status="failed", error=str(e))
+        finally:
+            job.update(finished_at=time.time())
+            with self._lock:
+                if self._active.get(job.dataset) == job.id:
+                    del self._active[job.dataset]
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.finished]
+        excess = len(finished) - MAX_FINISHED_JOBS
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(excess, 0)]:
+            del self._jobs[job.id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,137 @@
+"""
+Minimal Mapbox Vector Tile (v2.1) encoder for point and polygon layers.
+
+Only what the tile service needs is implemented: layers of features with
+point or polygon geometry (already in integer tile coordinates) and
+string/number/bool properties. See
+https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+import struct
+
+EXTENT = 4096
+
+GEOM_POINT = 1
+GEOM_POLYGON = 3
+
+_CMD_MOVE_TO = 1
+_CMD_LINE_TO = 2
+_CMD_CLOSE_PATH = 7
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values) -> bytes:
+    return _length_delimited(field, b"".join(_varint(v) for v in values))
+
+
+def _command(command: int, count: int) -> int:
+    return (command & 0x7) | (count << 3)
+
+
+def point_geometry(x: int, y: int) -> list:
+    return [_command(_CMD_MOVE_TO, 1), _zigzag(x), _zigzag(y)]
+
+
+def polygon_geometry(ring) -> list:
+    """
+    Encode one exterior ring given as [(x, y), ...] without the closing
+    point. Exterior rings must be clockwise in tile coordinates (y down).
+    """
+    (x0, y0), rest = ring[0], ring[1:]
+    geometry = [_command(_CMD_MOVE_TO, 1), _zigzag(x0), _zigzag(y0),
+                _command(_CMD_LINE_TO, len(rest))]
+    px, py = x0, y0
+    for x, y in rest:
+        geometry += [_zigzag(x - px), _zigzag(y - py)]
+        px, py = x, y
+    geometry.append(_command(_CMD_CLOSE_PATH, 1))
+    return geometry
+
+
+def _encode_value(value) -> bytes:
+    if isinstance(value, bool):
+        payload = _key(7, 0) + _varint(int(value))
+    elif isinstance(value, int):
+        payload = _key(6, 0) + _varint(_zigzag(value))
+    elif isinstance(value, float):
+        payload = _key(3, 1) + struct.pack("<d", value)
+    else:
+        payload = _length_delimited(1, str(value).encode("utf-8"))
+    return payload
+
+
+class LayerBuilder:
+    """Accumulates features for one layer, interning property keys and values."""
+
+    def __init__(self, name: str, extent: int = EXTENT):
+        self.name = name
+        self.extent = extent
+        self._features = []
+        self._keys = {}
+        self._values = {}
+
+    def _index(self, table: dict, item) -> int:
+        index = table.get(item)
+        if index is None:
+            index = table[item] = len(table)
+        return index
+
+    def add_feature(self, geom_type: int, geometry: list, properties: dict, feature_id=None):
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(self._index(self._keys, key))
+            # Keep 1 and 1.0 (and True) apart when interning
+            tags.append(self._index(self._values, (type(value), value)))
+
+        feature = b""
+        if feature_id is not None:
+            feature += _key(1, 0) + _varint(int(feature_id))
+        if tags:
+            feature += _packed(2, tags)
+        feature += _key(3, 0) + _varint(geom_type)
+        feature += _packed(4, geometry)
+        self._features.append(feature)
+
+    def __len__(self):
+        return len(self._features)
+
+    def encode(self) -> bytes:
+        layer = _key(15, 0) + _varint(2)
+        layer += _length_delimited(1, self.name.encode("utf-8"))
+        for feature in self._features:
+            layer += _length_delimited(2, feature)
+        for key in self._keys:
+            layer += _length_delimited(3, key.encode("utf-8"))
+        for _, value in self._values:
+            layer += _length_delimited(4, _encode_value(value))
+        layer += _key(5, 0) + _varint(self.extent)
+        return layer
+
+
+def encode_tile(layers) -> bytes:
+    """Encode LayerBuilders into a tile; empty layers are omitted."""
+    return b"".join(_length_delimited(3, layer.encode()) for layer in layers if len(layer))
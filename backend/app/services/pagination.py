@@ -0,0 +1,74 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor is the sort key of the last row on a page, JSON-encoded and
+base64url-wrapped so clients treat it as an opaque token.
+"""
+import base64
+import json
+import uuid
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(value) -> str:
+    raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def decode_uuid_cursor(cursor: str) -> uuid.UUID:
+    """
+    Decode a cursor holding a UUID (business ids).
+
+    Raises:
+        ValueError: If the cursor is malformed or does not hold a UUID
+    """
+    try:
+        return uuid.UUID(decode_cursor(cursor))
+    except (TypeError, AttributeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE) -> int:
+    """
+    Parse a ?limit= page size, capped at MAX_PAGE_SIZE.
+
+    Raises:
+        ValueError: If value is not a positive integer
+    """
+    limit = parse_limit(value)
+    return default if limit is None else min(limit, MAX_PAGE_SIZE)
+
+
+def parse_limit(value):
+    """
+    Parse an optional ?limit= row cap (no upper bound).
+
+    Returns:
+        The limit, or None if value is empty
+
+    Raises:
+        ValueError: If value is not a positive integer
+    """
+    if value is None or value == "":
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"limit must be a positive integer, got {value!r}")
+    if limit < 1:
+        raise ValueError(f"limit must be a positive integer, got {value!r}")
+    return limit
@@ -0,0 +1,295 @@
+"""
+In-process spatial index over businesses and transit nodes for radius
+("what is within 1 km of this site") and k-nearest-neighbour lookups.
+
+Each dataset is indexed by a KD-tree over 3-D unit vectors built from the
+point store's NumPy arrays, plus one tree per category, so filtered
+queries never scan other categories. Chord distance between unit vectors
+is monotonic in great-circle distance, so results are exact and
+distances are reported in haversine meters.
+
+The index is built once (see warm_point_index) and served from memory.
+The data version is re-checked at most every VERSION_CHECK_SECONDS; when
+it has moved, a background thread builds a new index and swaps it in,
+while requests keep being served from the previous one.
+"""
+import threading
+import time
+import traceback
+
+import numpy as np
+from flask import current_app
+from scipy.spatial import cKDTree
+
+from app.services.data_version import get_data_version
+from app.services.point_store import get_points
+from app.services.transit_access_service import chord_to_meters, meters_to_chord, unit_vectors
+
+INDEX_DATASETS = ("businesses", "transit_nodes")
+
+DEFAULT_RADIUS_M = 1000
+MAX_RADIUS_M = 10_000
+DEFAULT_K = 10
+MAX_K = 100
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+VERSION_CHECK_SECONDS = 2.0
+
+
+class PointIndex:
+    """KD-trees over one dataset's PointSet: all points and per category."""
+
+    def __init__(self, dataset: str, points):
+        self.dataset = dataset
+        self.points = points
+        # Transit ids are integers in the API; businesses use UUID strings
+        self.ids = (points.ids.astype(np.int64).astype(object)
+                    if dataset == "transit_nodes" else points.ids)
+        self.vectors = unit_vectors(points.lat, points.lon)
+        self.tree = cKDTree(self.vectors)
+        self.category_trees = {}
+        for code in range(len(points.categories)):
+            members = np.flatnonzero(points.category_codes == code)
+            self.category_trees[code] = (members, cKDTree(self.vectors[members]))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _tree(self, category):
+        """(point indices or None for all, tree), or None if no point has the category."""
+        if category is None:
+            return None, self.tree
+        code = self.points.category_code(category)
+        return self.category_trees.get(code)
+
+    def within(self, lat: float, lon: float, meters: float, category: str = None):
+        """
+        Points within a great-circle distance, nearest first.
+
+        Returns:
+            (point indices, distances in meters)
+        """
+        selected = self._tree(category)
+        if selected is None or len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        members, tree = selected
+        target = unit_vectors([lat], [lon])[0]
+        found = np.asarray(tree.query_ball_point(target, meters_to_chord(meters)), dtype=np.int64)
+        if members is not None:
+            found = members[found]
+        distances = chord_to_meters(np.linalg.norm(self.vectors[found] - target, axis=1))
+        order = np.argsort(distances, kind="stable")
+        return found[order], distances[order]
+
+    def count_within(self, lat, lon, meters: float, category: str = None) -> np.ndarray:
+        """Number of points within meters of each of many locations (one batched query)."""
+        selected = self._tree(category)
+        if selected is None or len(self) == 0:
+            return np.zeros(len(lat), dtype=np.int64)
+        _, tree = selected
+        return np.asarray(tree.query_ball_point(
+            unit_vectors(lat, lon), meters_to_chord(meters), return_length=True, workers=-1
+        ), dtype=np.int64)
+
+    def nearest(self, lat: float, lon: float, k: int, category: str = None):
+        """
+        The k nearest points (fewer if the dataset is smaller), nearest first.
+
+        Returns:
+            (point indices, distances in meters)
+        """
+        selected = self._tree(category)
+        if selected is None or len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        members, tree = selected
+        k = min(k, tree.n)
+        chord, found = tree.query(unit_vectors([lat], [lon])[0], k=[*range(1, k + 1)])
+        found = np.asarray(found, dtype=np.int64)
+        if members is not None:
+            found = members[found]
+        return found, chord_to_meters(chord)
+
+    def records(self, indices, distances) -> list:
+        """API dicts for query results."""
+        points = self.points
+        return [
+            {
+                "dataset": self.dataset,
+                "id": self.ids[i],
+                "osm_id": points.osm_ids[i],
+                "name": points.names[i],
+                "category": points.categories[points.category_codes[i]]
+                if points.category_codes[i] >= 0 else None,
+                "latitude": float(points.lat[i]),
+                "longitude": float(points.lon[i]),
+                "distance_m": round(float(d), 2),
+            }
+            for i, d in zip(indices.tolist(), distances.tolist())
+        ]
+
+
+def build_indexes(datasets=INDEX_DATASETS) -> dict:
+    """PointIndex per dataset at the current data version."""
+    return {dataset: PointIndex(dataset, get_points(dataset)) for dataset in datasets}
+
+
+class PointIndexManager:
+    """
+    Holds the current indexes and replaces them in the background when
+    the data version changes.
+    """
+
+    def __init__(self, datasets=INDEX_DATASETS):
+        self.datasets = datasets
+        self._indexes = None
+        self._version = None
+        self._checked_at = 0.0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _build(self, version):
+        with self._build_lock:
+            if self._version == version:
+                return
+            indexes = build_indexes(self.datasets)
+            with self._lock:
+                self._indexes, self._version = indexes, version
+                self._checked_at = time.monotonic()
+            print(f"[OK] Point index built ({', '.join(f'{d}: {len(i)}' for d, i in indexes.items())})")
+
+    def _rebuild_in_background(self, app, version):
+        def rebuild():
+            try:
+                with app.app_context():
+                    self._build(version)
+            except Exception as e:
+                print(f"[WARNING] Point index rebuild failed: {e}")
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._rebuilding = False
+
+        thread = threading.Thread(target=rebuild, name="point-index-rebuild", daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self, app=None):
+        """
+        Start a background rebuild if the data version has moved. Must be
+        called inside an app context.
+
+        Returns:
+            The rebuild thread, or None if the index is current or a
+            rebuild is already running
+        """
+        version = get_data_version(self.datasets)
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if version == self._version or self._rebuilding:
+                return None
+            self._rebuilding = True
+        return self._rebuild_in_background(app or current_app._get_current_object(), version)
+
+    def get(self) -> dict:
+        """
+        Current indexes. Builds them in the request if none exist yet;
+        afterwards a changed data version only triggers a background rebuild.
+        """
+        if self._indexes is None:
+            self._build(get_data_version(self.datasets))
+        elif time.monotonic() - self._checked_at >= VERSION_CHECK_SECONDS:
+            self.refresh()
+        return self._indexes
+
+
+point_index = PointIndexManager()
+
+
+def warm_point_index(app):
+    """Build the point index in a background thread after startup."""
+    def warm():
+        try:
+            with app.app_context():
+                point_index.get()
+        except Exception as e:
+            print(f"[WARNING] Point index warm-up failed: {e}")
+            traceback.print_exc()
+
+    thread = threading.Thread(target=warm, name="point-index-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _parse_datasets(dataset):
+    datasets = [d for d in (dataset or "").split(",") if d] or list(INDEX_DATASETS)
+    unknown = set(datasets) - set(INDEX_DATASETS)
+    if unknown:
+        raise ValueError(f"Unknown dataset: {', '.join(sorted(unknown))} "
+                         f"(use {', '.join(INDEX_DATASETS)})")
+    return datasets
+
+
+def _check_coordinates(lat, lon):
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+
+
+def find_nearby(lat, lon, radius_m=DEFAULT_RADIUS_M, category=None, dataset=None,
+                limit=DEFAULT_LIMIT) -> dict:
+    """
+    Points within radius_m of a location, nearest first.
+
+    Args:
+        category: Optional category (business category or transit type)
+        dataset: Optional dataset name, or comma-separated names
+        limit: Maximum number of results returned
+
+    Returns:
+        Dict with results, count (all matches) and truncated
+
+    Raises:
+        ValueError: For out-of-range arguments or unknown datasets
+    """
+    _check_coordinates(lat, lon)
+    if not 0 < radius_m <= MAX_RADIUS_M:
+        raise ValueError(f"radius must be between 0 and {MAX_RADIUS_M} meters")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    datasets = _parse_datasets(dataset)
+
+    indexes = point_index.get()
+    matches = []
+    for name in datasets:
+        index = indexes[name]
+        found, distances = index.within(lat, lon, radius_m, category)
+        matches.append((index, found, distances))
+
+    count = sum(len(found) for _, found, _ in matches)
+    results = []
+    for index, found, distances in matches:
+        results.extend(index.records(found[:limit], distances[:limit]))
+    results.sort(key=lambda r: r["distance_m"])
+    return {"results": results[:limit], "count": count, "truncated": count > limit}
+
+
+def find_nearest(lat, lon, k=DEFAULT_K, category=None, dataset=None) -> list:
+    """
+    The k nearest points to a location across the selected datasets.
+
+    Raises:
+        ValueError: For out-of-range arguments or unknown datasets
+    """
+    _check_coordinates(lat, lon)
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}")
+    datasets = _parse_datasets(dataset)
+
+    indexes = point_index.get()
+    results = []
+    for name in datasets:
+        found, distances = indexes[name].nearest(lat, lon, k, category)
+        results.extend(indexes[name].records(found, distances))
+    results.sort(key=lambda r: r["distance_m"])
+    return results[:k]
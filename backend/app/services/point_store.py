@@ -0,0 +1,76 @@
+"""
+Compact in-memory copies of the business and transit point tables.
+
+Each dataset is loaded once per data version as NumPy arrays sorted by
+longitude (so longitude ranges are a binary search), with categories
+stored as small integer codes.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from app import db
+from app.services.data_version import VersionedCache
+
+POINT_QUERIES = {
+    "businesses": """
+        SELECT id::text AS id, osm_id, name, category, latitude, longitude
+        FROM businesses
+    """,
+    "transit_nodes": """
+        SELECT id::text AS id, osm_id, name, type AS category, latitude, longitude
+        FROM transit_nodes
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """,
+}
+
+_point_caches = {name: VersionedCache(datasets=(name,)) for name in POINT_QUERIES}
+
+
+class PointSet:
+    """
+    Points of one dataset as parallel arrays, sorted by longitude.
+
+    Attributes:
+        lat, lon: float64 coordinates
+        ids: object array of primary keys (as strings)
+        osm_ids: object array of OSM ids
+        names: object array of names (None if unnamed)
+        category_codes: int16 index into categories
+        categories: list of category labels
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.sort_values("longitude", ignore_index=True)
+        self.lat = df["latitude"].to_numpy(dtype=np.float64)
+        self.lon = df["longitude"].to_numpy(dtype=np.float64)
+        self.ids = df["id"].to_numpy(dtype=object)
+        self.osm_ids = df["osm_id"].to_numpy(dtype=object)
+        self.names = df["name"].astype(object).where(df["name"].notna(), None).to_numpy()
+        codes, categories = pd.factorize(df["category"])
+        self.category_codes = codes.astype(np.int16)
+        self.categories = list(categories)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def category_code(self, category: str) -> int:
+        """Code of a category label, or -1 if no point has it."""
+        try:
+            return self.categories.index(category)
+        except ValueError:
+            return -1
+
+    def bbox_indices(self, min_lon, min_lat, max_lon, max_lat) -> np.ndarray:
+        """Indices of points inside a bounding box (edges inclusive)."""
+        start = np.searchsorted(self.lon, min_lon, side="left")
+        end = np.searchsorted(self.lon, max_lon, side="right")
+        lat = self.lat[start:end]
+        return start + np.nonzero((lat >= min_lat) & (lat <= max_lat))[0]
+
+
+def get_points(dataset: str) -> PointSet:
+    """PointSet for "businesses" or "transit_nodes" at the current data version."""
+    return _point_caches[dataset].get_or_compute(
+        lambda: PointSet(pd.read_sql(text(POINT_QUERIES[dataset]), db.engine))
+    )
@@ -0,0 +1,89 @@
+"""
+JSON encoding for large API responses.
+
+Uses orjson when it is installed (native UUID, datetime and numpy
+support, several times faster than the standard library) and falls back
+to json otherwise.
+"""
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Rows fetched from the server-side cursor and encoded per chunk
+STREAM_BATCH_SIZE = 2000
+
+
+def _default(obj):
+    """json fallback for what orjson encodes natively: NumPy arrays and scalars."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Encode obj as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def iter_json_array(result, batch_size=STREAM_BATCH_SIZE):
+    """
+    Encode the rows of a SQLAlchemy result as one JSON array of objects,
+    yielding a chunk of bytes per batch of rows. Only one batch is held in
+    memory at a time.
+    """
+    keys = list(result.keys())
+    yield b"["
+    first = True
+    for rows in result.partitions(batch_size):
+        chunk = dumps([dict(zip(keys, row)) for row in rows])
+        # Drop the brackets of the per-batch array and join batches with commas
+        yield chunk[1:-1] if first else b"," + chunk[1:-1]
+        first = False
+    yield b"]"
+
+
+def frame_records_json(df) -> bytes:
+    """
+    Encode a DataFrame as a JSON array of row objects. pandas encodes
+    column by column in C, so no per-row dicts or casts are built. NaN
+    becomes null.
+    """
+    return df.to_json(orient="records", double_precision=15).encode("utf-8")
+
+
+def frame_columns_json(df) -> bytes:
+    """
+    Encode a DataFrame as a JSON object of column arrays ("struct of
+    arrays"): {"col": [v0, v1, ...], ...}. Numeric columns are written
+    straight from their NumPy buffers.
+    """
+    if orjson is None:
+        return ("{" + ",".join(
+            json.dumps(str(name)) + ":" + df[name].to_json(orient="values", double_precision=15)
+            for name in df.columns
+        ) + "}").encode("utf-8")
+
+    columns = {}
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if values.dtype.kind in "iufb":
+            columns[str(name)] = np.ascontiguousarray(values)
+        else:
+            columns[str(name)] = values.tolist()
+    return orjson.dumps(columns, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def json_envelope(fields: dict, key: str, encoded: bytes) -> bytes:
+    """Add an already encoded JSON value under key to the object fields."""
+    head = dumps(fields)
+    separator = b"," if len(head) > 2 else b""
+    return head[:-1] + separator + dumps(key) + b":" + encoded + b"}"
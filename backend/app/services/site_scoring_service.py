@@ -0,0 +1,147 @@
+"""
+Batch scoring of candidate business sites.
+
+All sites of a request are handled as arrays: zones are looked up by cell
+id against the cached classified zones, nearest-transit distances come
+from one batched KD-tree query per transit type, and same-category
+competitors are counted with one batched radius query on the point index.
+No per-site database queries are made.
+"""
+import numpy as np
+import pandas as pd
+
+from app.services.point_index_service import point_index
+from app.services.transit_access_service import TRANSIT_TYPES, nearest_transit_distances
+from app.services.zone_aggregate_service import BASE_RESOLUTION, DEFAULT_RESOLUTION, RESOLUTIONS
+from app.services.zone_service import ZONE_LAYOUTS, get_zones_classified
+
+MAX_SITES = 20_000
+DEFAULT_COMPETITOR_RADIUS_M = 500
+MAX_COMPETITOR_RADIUS_M = 5000
+
+# Zone columns reported for each site
+SITE_ZONE_COLUMNS = [
+    "cell_id", "zone_type", "adjusted_zone_score", "base_zone_score",
+    "biz_score", "trans_score", "pop_score", "business_count", "transport_count",
+]
+
+
+def parse_sites(sites) -> tuple:
+    """
+    Coordinates of candidate sites given as {"lat": .., "lon": ..} objects
+    or [lat, lon] pairs.
+
+    Returns:
+        (lat array, lon array)
+
+    Raises:
+        ValueError: If sites is empty, too long or has invalid coordinates
+    """
+    if not isinstance(sites, list) or not sites:
+        raise ValueError("sites must be a non-empty list")
+    if len(sites) > MAX_SITES:
+        raise ValueError(f"At most {MAX_SITES} sites per request")
+
+    try:
+        pairs = [(s["lat"], s["lon"]) if isinstance(s, dict) else tuple(s) for s in sites]
+        coords = np.array(pairs, dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Each site must be {"lat": .., "lon": ..} or [lat, lon]')
+    if coords.shape != (len(sites), 2):
+        raise ValueError('Each site must be {"lat": .., "lon": ..} or [lat, lon]')
+
+    lat, lon = coords[:, 0], coords[:, 1]
+    invalid = ~((np.abs(lat) <= 90) & (np.abs(lon) <= 180))
+    if invalid.any():
+        raise ValueError(f"Invalid coordinates for site {int(np.argmax(invalid))}")
+    return lat, lon
+
+
+def site_cell_ids(lat, lon, resolution=DEFAULT_RESOLUTION) -> np.ndarray:
+    """Zone cell id of every site (same cell arithmetic as zone_aggregates)."""
+    scale = RESOLUTIONS[resolution]
+    cell_lat = np.floor(lat / BASE_RESOLUTION).astype(np.int64) // scale
+    cell_lon = np.floor(lon / BASE_RESOLUTION).astype(np.int64) // scale
+    return (f"{resolution}:" + pd.Series(cell_lat).astype(str)
+            + "_" + pd.Series(cell_lon).astype(str)).to_numpy()
+
+
+def score_sites(lat, lon, business_type: str, radius_m=DEFAULT_COMPETITOR_RADIUS_M,
+                resolution=DEFAULT_RESOLUTION) -> pd.DataFrame:
+    """
+    Zone, transit access and competition for each candidate site.
+
+    Args:
+        lat, lon: Site coordinate arrays
+        business_type: Business category the sites are scored for
+        radius_m: Radius for counting same-category competitors
+
+    Returns:
+        DataFrame with one row per site, in input order: latitude,
+        longitude, the zone columns (SITE_ZONE_COLUMNS; all but cell_id
+        are null outside any zone), nearest_<type>_m per transit type,
+        nearest_transit_m and competitors_within_radius
+
+    Raises:
+        ValueError: For an unknown business type or radius out of range
+    """
+    if not 0 < radius_m <= MAX_COMPETITOR_RADIUS_M:
+        raise ValueError(f"radius must be between 0 and {MAX_COMPETITOR_RADIUS_M} meters")
+    businesses = point_index.get()["businesses"]
+    if businesses.points.category_code(business_type) < 0:
+        raise ValueError(
+            f"Unknown business type: {business_type} "
+            f"(use one of {', '.join(map(str, businesses.points.categories))})"
+        )
+
+    sites = pd.DataFrame({"latitude": lat, "longitude": lon})
+
+    # -------------------------------------------------
+    # STEP 1: ZONE LOOKUP (cached classified zones, by cell id)
+    # -------------------------------------------------
+    zones = get_zones_classified(resolution).reindex(columns=SITE_ZONE_COLUMNS)
+    cell_ids = site_cell_ids(lat, lon, resolution)
+    # Sites outside any zone keep their cell id; the zone fields are null
+    zone_fields = zones.set_index("cell_id").reindex(cell_ids).reset_index(drop=True)
+    for column in ("business_count", "transport_count"):
+        counts = zone_fields[column].astype("Int64").astype(object)
+        zone_fields[column] = counts.where(counts.notna(), None)
+    sites = pd.concat([sites, pd.Series(cell_ids, name="cell_id"), zone_fields], axis=1)
+
+    # -------------------------------------------------
+    # STEP 2: NEAREST TRANSIT (one KD-tree query per type)
+    # -------------------------------------------------
+    distances = nearest_transit_distances(lat, lon)
+    for transit_type in TRANSIT_TYPES:
+        sites[f"nearest_{transit_type}_m"] = distances[transit_type]
+    sites["nearest_transit_m"] = np.min(np.vstack(list(distances.values())), axis=0)
+
+    # -------------------------------------------------
+    # STEP 3: SAME-CATEGORY COMPETITORS (one batched radius query)
+    # -------------------------------------------------
+    sites["competitors_within_radius"] = businesses.count_within(
+        lat, lon, radius_m, category=business_type
+    )
+
+    return sites.replace([np.inf, -np.inf], np.nan)
+
+
+def get_site_scores_json(sites, business_type: str, radius_m=DEFAULT_COMPETITOR_RADIUS_M,
+                         resolution=DEFAULT_RESOLUTION, layout="records") -> tuple:
+    """
+    Scored sites encoded as JSON bytes (see score_sites).
+
+    Args:
+        layout: "records" or "columns", as for /zones/all
+
+    Returns:
+        (encoded sites, site count)
+
+    Raises:
+        ValueError: For invalid sites, arguments or layout
+    """
+    if layout not in ZONE_LAYOUTS:
+        raise ValueError(f"Unknown format: {layout} (use one of {', '.join(ZONE_LAYOUTS)})")
+    lat, lon = parse_sites(sites)
+    scored = score_sites(lat, lon, business_type, radius_m=radius_m, resolution=resolution)
+    return ZONE_LAYOUTS[layout](scored), len(scored)
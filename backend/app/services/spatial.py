@@ -0,0 +1,54 @@
+"""
+Spatial predicates that use PostGIS when it is available.
+
+With PostGIS, businesses and transit_nodes carry a generated
+`geom geometry(Point, 4326)` column (filled by Postgres from
+latitude/longitude on every insert/update) with a GiST index. Without it,
+the same predicates fall back to plain latitude/longitude ranges on a
+B-tree index. Radius lookups are served by the in-memory point index
+(see point_index_service), not by SQL.
+
+Each helper returns (sql_fragment, params) for use in a WHERE clause.
+"""
+import math
+
+from flask import current_app, has_app_context
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def parse_bbox(value: str) -> tuple:
+    """
+    Parse a "minLon,minLat,maxLon,maxLat" query parameter.
+
+    Raises:
+        ValueError: If the value is malformed or the box is empty
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(","))
+    except ValueError:
+        raise ValueError(f"Invalid bbox: {value} (expected minLon,minLat,maxLon,maxLat)")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError(f"Invalid bbox: {value} (min must not exceed max)")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def has_postgis() -> bool:
+    """True if the geom columns were set up at startup (see app.schema)."""
+    return has_app_context() and current_app.config.get("POSTGIS_ENABLED", False)
+
+
+def bbox_filter(min_lon, min_lat, max_lon, max_lat, prefix="bbox"):
+    """Points inside a lon/lat bounding box."""
+    params = {
+        f"{prefix}_min_lon": min_lon, f"{prefix}_min_lat": min_lat,
+        f"{prefix}_max_lon": max_lon, f"{prefix}_max_lat": max_lat,
+    }
+    if has_postgis():
+        sql = (f"geom && ST_MakeEnvelope(:{prefix}_min_lon, :{prefix}_min_lat, "
+               f":{prefix}_max_lon, :{prefix}_max_lat, 4326)")
+    else:
+        sql = (f"latitude BETWEEN :{prefix}_min_lat AND :{prefix}_max_lat "
+               f"AND longitude BETWEEN :{prefix}_min_lon AND :{prefix}_max_lon")
+    return sql, params
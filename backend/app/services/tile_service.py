@@ -0,0 +1,143 @@
+"""
+Mapbox Vector Tiles for the businesses, transit_nodes and zones layers.
+
+Tiles are cut from in-memory data (point_store for points, the cached
+zone pyramid for zones), so rendering cost depends on what is inside a
+tile, not on table size. Below DETAIL_ZOOM, points are thinned to one
+feature per THIN_CELL x THIN_CELL tile-unit bucket with a point_count.
+Encoded tiles are kept in an LRU cache invalidated by the data version.
+"""
+import math
+
+import numpy as np
+
+from app.services.data_version import VersionedCache
+from app.services.mvt import EXTENT, GEOM_POINT, GEOM_POLYGON, LayerBuilder, encode_tile, \
+    point_geometry, polygon_geometry
+from app.services.point_store import get_points
+from app.services.zone_aggregate_service import resolution_for_zoom
+from app.services.zone_service import get_zones_classified, filter_zones
+
+LAYERS = ("businesses", "transit_nodes", "zones")
+MAX_ZOOM = 22
+
+# From this zoom on every point is its own feature
+DETAIL_ZOOM = 14
+# Bucket edge (tile units) for thinning; 16 units = 1 px on a 256 px tile
+THIN_CELL = 16
+# Polygon coordinates are clamped to the tile plus this buffer
+CLIP_BUFFER = 64
+
+_tile_cache = VersionedCache(max_entries=4096)
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple:
+    """(min_lon, min_lat, max_lon, max_lat) of an XYZ tile."""
+    n = 2 ** z
+
+    def lat_of(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return x / n * 360 - 180, lat_of(y + 1), (x + 1) / n * 360 - 180, lat_of(y)
+
+
+def to_tile_coords(lon, lat, z: int, x: int, y: int):
+    """Project lon/lat arrays to integer coordinates inside tile (z, x, y)."""
+    n = 2 ** z
+    lat_rad = np.radians(np.clip(lat, -85.0511, 85.0511))
+    world_x = (np.asarray(lon) + 180) / 360 * n
+    world_y = (1 - np.log(np.tan(lat_rad) + 1 / np.cos(lat_rad)) / math.pi) / 2 * n
+    tx = np.floor((world_x - x) * EXTENT).astype(np.int64)
+    ty = np.floor((world_y - y) * EXTENT).astype(np.int64)
+    return tx, ty
+
+
+def validate_tile(layer: str, z: int, x: int, y: int):
+    """
+    Raises:
+        ValueError: For an unknown layer or out-of-range tile
+    """
+    if layer not in LAYERS:
+        raise ValueError(f"Unknown layer: {layer} (use one of {', '.join(LAYERS)})")
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError(f"Invalid tile: {z}/{x}/{y}")
+
+
+def _point_layer(dataset: str, z: int, x: int, y: int) -> LayerBuilder:
+    points = get_points(dataset)
+    layer = LayerBuilder(dataset)
+
+    idx = points.bbox_indices(*tile_bounds(z, x, y))
+    if len(idx) == 0:
+        return layer
+
+    tx, ty = to_tile_coords(points.lon[idx], points.lat[idx], z, x, y)
+    inside = (tx >= 0) & (tx < EXTENT) & (ty >= 0) & (ty < EXTENT)
+    idx, tx, ty = idx[inside], tx[inside], ty[inside]
+
+    counts = np.ones(len(idx), dtype=np.int64)
+    if z < DETAIL_ZOOM and len(idx):
+        # Keep the first point of every bucket and count the rest
+        buckets = (ty // THIN_CELL) * (EXTENT // THIN_CELL) + tx // THIN_CELL
+        _, first, counts = np.unique(buckets, return_index=True, return_counts=True)
+        idx, tx, ty = idx[first], tx[first], ty[first]
+
+    for i, px, py, count in zip(idx.tolist(), tx.tolist(), ty.tolist(), counts.tolist()):
+        properties = {"category": points.categories[points.category_codes[i]]}
+        if count > 1:
+            properties["point_count"] = count
+        else:
+            properties["id"] = points.ids[i]
+            properties["name"] = points.names[i]
+        layer.add_feature(GEOM_POINT, point_geometry(px, py), properties)
+    return layer
+
+
+def _zone_layer(z: int, x: int, y: int) -> LayerBuilder:
+    layer = LayerBuilder("zones")
+    resolution = resolution_for_zoom(z)
+    zones, _ = filter_zones(get_zones_classified(resolution), resolution,
+                            bbox=tile_bounds(z, x, y))
+    if zones.empty:
+        return layer
+
+    lat = zones["zone_lat"].to_numpy()
+    lon = zones["zone_lon"].to_numpy()
+    x0, y1 = to_tile_coords(lon, lat, z, x, y)
+    x1, y0 = to_tile_coords(lon + resolution, lat + resolution, z, x, y)
+    low, high = -CLIP_BUFFER, EXTENT + CLIP_BUFFER
+    x0, x1, y0, y1 = (np.clip(a, low, high) for a in (x0, x1, y0, y1))
+
+    columns = zip(
+        x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist(),
+        zones["cell_id"].tolist(), zones["zone_type"].tolist(),
+        zones["adjusted_zone_score"].tolist(),
+        zones["business_count"].tolist(), zones["transport_count"].tolist(),
+    )
+    for left, top, right, bottom, cell, zone_type, score, businesses, transit in columns:
+        if right <= left or bottom <= top:
+            continue
+        # Clockwise in tile coordinates (y grows downward)
+        ring = [(left, top), (right, top), (right, bottom), (left, bottom)]
+        layer.add_feature(GEOM_POLYGON, polygon_geometry(ring), {
+            "cell_id": cell,
+            "zone_type": zone_type,
+            "adjusted_zone_score": float(score),
+            "business_count": int(businesses),
+            "transport_count": int(transit),
+        })
+    return layer
+
+
+def render_tile(layer: str, z: int, x: int, y: int) -> bytes:
+    """Encoded MVT bytes for one layer tile (served from the tile cache)."""
+    validate_tile(layer, z, x, y)
+
+    def build():
+        if layer == "zones":
+            builder = _zone_layer(z, x, y)
+        else:
+            builder = _point_layer(layer, z, x, y)
+        return encode_tile([builder])
+
+    return _tile_cache.get_or_compute(build, key=(layer, z, x, y))
@@ -0,0 +1,156 @@
+"""
+Distance from businesses (and zones) to the nearest transit stop.
+
+Transit nodes of each type are indexed in a KD-tree over 3-D unit vectors
+on the sphere. The straight-line (chord) distance between unit vectors is
+monotonic in the great-circle distance, so the nearest neighbour is exact,
+and chords convert back to haversine meters. All businesses are queried
+in one batched call per transit type, spread over all cores.
+
+Results are cached per data version: the trees when transit changes, the
+per-business distances and per-zone statistics when either dataset does.
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from app.services.data_version import VersionedCache
+from app.services.point_store import get_points
+from app.services.spatial import EARTH_RADIUS_M
+from app.services.zone_aggregate_service import (
+    BASE_RESOLUTION, DEFAULT_RESOLUTION, RESOLUTIONS
+)
+
+TRANSIT_TYPES = ("bus_stop", "subway_entrance", "railway_station")
+
+# A business within this distance of any stop counts as transit-accessible
+ACCESS_RADIUS_M = 500
+
+_index_cache = VersionedCache(datasets=("transit_nodes",))
+_access_cache = VersionedCache()
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """(n, 3) points on the unit sphere for latitude/longitude arrays in degrees."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_meters(chord) -> np.ndarray:
+    """Great-circle distance in meters for unit-sphere chord lengths."""
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+def meters_to_chord(meters: float) -> float:
+    """Unit-sphere chord length for a great-circle distance in meters."""
+    return 2 * np.sin(min(meters / EARTH_RADIUS_M, np.pi) / 2)
+
+
+def get_transit_index() -> dict:
+    """KD-tree per transit type (types with no nodes are omitted)."""
+    def build():
+        nodes = get_points("transit_nodes")
+        trees = {}
+        for transit_type in TRANSIT_TYPES:
+            mask = nodes.category_codes == nodes.category_code(transit_type)
+            if mask.any():
+                trees[transit_type] = cKDTree(unit_vectors(nodes.lat[mask], nodes.lon[mask]))
+        return trees
+
+    return _index_cache.get_or_compute(build)
+
+
+def nearest_transit_distances(lat, lon) -> dict:
+    """
+    Distance in meters from each point to the nearest node of every
+    transit type, in one batched query per type.
+
+    Returns:
+        Dict mapping transit type -> float array (inf if the type has no nodes)
+    """
+    points = unit_vectors(lat, lon)
+    trees = get_transit_index()
+    distances = {}
+    for transit_type in TRANSIT_TYPES:
+        tree = trees.get(transit_type)
+        if tree is None or len(points) == 0:
+            distances[transit_type] = np.full(len(points), np.inf)
+            continue
+        chord, _ = tree.query(points, k=1, workers=-1)
+        distances[transit_type] = chord_to_meters(chord)
+    return distances
+
+
+def get_business_access() -> pd.DataFrame:
+    """
+    Nearest-transit distances for every business, cached per data version.
+
+    Returns:
+        DataFrame with id, latitude, longitude, nearest_<type>_m for each
+        transit type and nearest_transit_m (closest of any type)
+    """
+    def compute():
+        businesses = get_points("businesses")
+        distances = nearest_transit_distances(businesses.lat, businesses.lon)
+
+        access = pd.DataFrame({
+            "id": businesses.ids,
+            "latitude": businesses.lat,
+            "longitude": businesses.lon,
+        })
+        for transit_type, meters in distances.items():
+            access[f"nearest_{transit_type}_m"] = meters
+        access["nearest_transit_m"] = np.min(np.vstack(list(distances.values())), axis=0) \
+            if len(businesses) else np.empty(0)
+        return access.replace(np.inf, np.nan)
+
+    return _access_cache.get_or_compute(compute, key="businesses")
+
+
+def get_zone_accessibility(resolution=DEFAULT_RESOLUTION) -> pd.DataFrame:
+    """
+    Transit accessibility of the businesses in each zone of a pyramid level.
+
+    Returns:
+        DataFrame with cell_id, median_nearest_transit_m,
+        mean_nearest_transit_m and share_within_500m (share of the zone's
+        businesses within ACCESS_RADIUS_M of any transit stop)
+    """
+    def compute():
+        access = get_business_access()
+        scale = RESOLUTIONS[resolution]
+        # Same cell arithmetic as zone_aggregates (base cells, then integer division)
+        cell_lat = np.floor(access["latitude"].to_numpy() / BASE_RESOLUTION).astype(np.int64) // scale
+        cell_lon = np.floor(access["longitude"].to_numpy() / BASE_RESOLUTION).astype(np.int64) // scale
+        nearest = access["nearest_transit_m"].to_numpy()
+
+        stats = pd.DataFrame({
+            "cell_lat": cell_lat,
+            "cell_lon": cell_lon,
+            "nearest": nearest,
+            "within": nearest <= ACCESS_RADIUS_M,
+        }).groupby(["cell_lat", "cell_lon"], sort=False).agg(
+            median_nearest_transit_m=("nearest", "median"),
+            mean_nearest_transit_m=("nearest", "mean"),
+            share_within_500m=("within", "mean"),
+        ).reset_index()
+
+        stats.insert(0, "cell_id", f"{resolution}:" + stats.pop("cell_lat").astype(str)
+                     + "_" + stats.pop("cell_lon").astype(str))
+        return stats
+
+    return _access_cache.get_or_compute(compute, key=("zones", resolution))
+
+
+def add_zone_accessibility(zones: pd.DataFrame, resolution=DEFAULT_RESOLUTION) -> pd.DataFrame:
+    """
+    Join per-zone accessibility onto zones (by cell_id) and derive
+    access_score, the share of the zone's businesses within
+    ACCESS_RADIUS_M of a stop (0 for zones without businesses).
+    """
+    stats = get_zone_accessibility(resolution)
+    zones = zones.merge(stats, on="cell_id", how="left")
+    zones["access_score"] = zones["share_within_500m"].fillna(0.0).astype(np.float64)
+    return zones
@@ -0,0 +1,170 @@
+"""
+K-means clustering of transit nodes.
+
+Coordinates come from the in-memory point store as NumPy arrays and are
+projected to a local equirectangular plane (kilometers), so clusters are
+not stretched east-west the way raw degrees would make them. Models are
+MiniBatchKMeans with a fixed seed, so the same data always gives the same
+clusters. When k is not given it is chosen by fitting the candidate k
+values a few at a time and keeping the best silhouette score on a fixed
+sample.
+
+The fitted model, labels and centroids are cached per transit data version
+and computed in the background after startup (see warm_transit_clusters).
+"""
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn import config_context
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from threadpoolctl import threadpool_limits
+
+from app.services.data_version import VersionedCache
+from app.services.point_store import get_points
+from app.services.spatial import EARTH_RADIUS_M
+
+CLUSTER_SEED = 42
+K_CANDIDATES = tuple(range(2, 13))
+MAX_K = 100
+
+# MiniBatchKMeans settings
+BATCH_SIZE = 4096
+N_INIT = 3
+
+# Points the silhouette score of each candidate k is computed on
+SILHOUETTE_SAMPLE = 5000
+
+# Candidate k values fitted at once, and the memory (MB) each silhouette
+# score may use for a block of its pairwise distance matrix
+SELECT_K_WORKERS = 2
+SILHOUETTE_WORKING_MEMORY_MB = 64
+
+_cluster_cache = VersionedCache(datasets=("transit_nodes",))
+
+KM_PER_DEGREE = np.radians(1) * EARTH_RADIUS_M / 1000
+
+
+def project(lat, lon, ref_lat: float) -> np.ndarray:
+    """(n, 2) local plane coordinates in km (x east, y north)."""
+    scale = np.cos(np.radians(ref_lat))
+    return np.column_stack((np.asarray(lon) * scale, np.asarray(lat))) * KM_PER_DEGREE
+
+
+def unproject(xy: np.ndarray, ref_lat: float) -> tuple:
+    """Inverse of project: (lat, lon) arrays."""
+    scale = np.cos(np.radians(ref_lat))
+    return xy[:, 1] / KM_PER_DEGREE, xy[:, 0] / KM_PER_DEGREE / scale
+
+
+def fit_kmeans(xy: np.ndarray, k: int) -> MiniBatchKMeans:
+    """Deterministic MiniBatchKMeans fit."""
+    return MiniBatchKMeans(
+        n_clusters=k, random_state=CLUSTER_SEED, batch_size=BATCH_SIZE, n_init=N_INIT
+    ).fit(xy)
+
+
+def _score_k(xy, k, sample):
+    model = fit_kmeans(xy, k)
+    with config_context(working_memory=SILHOUETTE_WORKING_MEMORY_MB):
+        score = silhouette_score(xy[sample], model.labels_[sample])
+    return model, float(score)
+
+
+def select_k(xy: np.ndarray, candidates=K_CANDIDATES, max_workers=SELECT_K_WORKERS):
+    """
+    Fit the candidate k values, max_workers at a time, and pick the best
+    silhouette score.
+
+    Returns:
+        (best MiniBatchKMeans model, {k: silhouette score})
+    """
+    candidates = [k for k in candidates if 2 <= k < len(xy)]
+    if not candidates:
+        raise ValueError("Not enough transit nodes to cluster")
+
+    rng = np.random.default_rng(CLUSTER_SEED)
+    sample = np.sort(rng.choice(len(xy), min(SILHOUETTE_SAMPLE, len(xy)), replace=False))
+
+    # The k-means and distance kernels release the GIL, so threads run in
+    # parallel without copying the coordinates into worker processes. Each
+    # kernel would otherwise start one OpenMP/BLAS thread per core, so the
+    # cores are shared out between the concurrent fits.
+    threads = max(1, (os.cpu_count() or 1) // max_workers)
+    with threadpool_limits(limits=threads), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fits = list(executor.map(lambda k: _score_k(xy, k, sample), candidates))
+
+    scores = {k: score for k, (_, score) in zip(candidates, fits)}
+    best = max(range(len(candidates)), key=lambda i: fits[i][1])
+    return fits[best][0], scores
+
+
+def get_transit_clusters(k: int = None) -> dict:
+    """
+    Cluster transit nodes, cached per transit data version.
+
+    Args:
+        k: Number of clusters, or None to choose it from K_CANDIDATES
+
+    Returns:
+        Dict with k, scores ({k: silhouette}, empty when k was given),
+        model, ids, lat, lon and labels (parallel arrays, one per node) and
+        centroids (list of dicts with cluster, latitude, longitude, size)
+
+    Raises:
+        ValueError: If k is out of range or there are too few nodes
+    """
+    if k is not None and not 2 <= k <= MAX_K:
+        raise ValueError(f"k must be between 2 and {MAX_K}")
+
+    def compute():
+        nodes = get_points("transit_nodes")
+        if k is not None and len(nodes) <= k:
+            raise ValueError(f"Not enough transit nodes for k={k}")
+
+        ref_lat = float(nodes.lat.mean()) if len(nodes) else 0.0
+        xy = project(nodes.lat, nodes.lon, ref_lat)
+        if k is None:
+            model, scores = select_k(xy)
+        else:
+            model, scores = fit_kmeans(xy, k), {}
+
+        labels = model.labels_.astype(np.int32)
+        sizes = np.bincount(labels, minlength=model.n_clusters)
+        lat, lon = unproject(model.cluster_centers_, ref_lat)
+        centroids = [
+            {"cluster": i, "latitude": float(lat[i]), "longitude": float(lon[i]),
+             "size": int(sizes[i])}
+            for i in range(model.n_clusters)
+        ]
+        return {
+            "k": int(model.n_clusters),
+            "scores": scores,
+            "model": model,
+            "ids": nodes.ids.astype(np.int64),
+            "lat": nodes.lat,
+            "lon": nodes.lon,
+            "labels": labels,
+            "centroids": centroids,
+        }
+
+    return _cluster_cache.get_or_compute(compute, key=k)
+
+
+def warm_transit_clusters(app):
+    """Compute the default (k chosen by silhouette) clustering in a background thread."""
+    def warm():
+        try:
+            with app.app_context():
+                clusters = get_transit_clusters()
+                print(f"[OK] Transit clusters warmed (k={clusters['k']})")
+        except Exception as e:
+            print(f"[WARNING] Transit cluster warm-up failed: {e}")
+            traceback.print_exc()
+
+    thread = threading.Thread(target=warm, name="transit-cluster-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -1,14 +1,59 @@
-from sklearn.cluster import KMeans
 import pandas as pd
 from app.models import TransitNode
 from app import db
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.transit_cluster_service import get_transit_clusters
 
-def cluster_transit_nodes():
-    nodes = TransitNode.query.all()
-    data = pd.DataFrame([{
-        'id': n.id, 'lat': n.latitude, 'lon': n.longitude
-    } for n in nodes])
+def cluster_transit_nodes(k: int = None):
+    """
+    Cluster assignment of every transit node (see transit_cluster_service).
 
-    kmeans = KMeans(n_clusters=3)
-    data['cluster'] = kmeans.fit_predict(data[['lat', 'lon']])
-    return data
+    Args:
+        k: Number of clusters, or None to choose it automatically
+
+    Returns:
+        DataFrame with id, lat, lon and cluster
+    """
+    clusters = get_transit_clusters(k)
+    return pd.DataFrame({
+        'id': clusters["ids"], 'lat': clusters["lat"], 'lon': clusters["lon"],
+        'cluster': clusters["labels"]
+    })
+
+
+def list_transit_nodes(limit: int, after: str = None, types=None):
+    """
+    One page of transit nodes ordered by id, using keyset pagination so
+    every page costs the same index range scan regardless of depth.
+
+    Args:
+        limit: Page size
+        after: Cursor from the previous page's "next"
+        types: Optional list of transit types to include
+
+    Returns:
+        (list of transit node dicts, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    stmt = db.select(
+        TransitNode.id, TransitNode.osm_id, TransitNode.type, TransitNode.name,
+        TransitNode.latitude, TransitNode.longitude
+    )
+    if types:
+        # Served by ix_transit_nodes_type_id
+        stmt = stmt.where(TransitNode.type.in_(types))
+    if after:
+        last_id = decode_cursor(after)
+        if not isinstance(last_id, int):
+            raise ValueError(f"Invalid cursor: {after}")
+        stmt = stmt.where(TransitNode.id > last_id)
+    rows = db.session.execute(stmt.order_by(TransitNode.id).limit(limit + 1)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["id"])
+
+    return [dict(row) for row in rows], next_cursor
@@ -0,0 +1,265 @@
+"""
+Incrementally maintained per-cell counts in the zone_aggregates table.
+
+Counts are kept as a pyramid of grid resolutions. The finest level uses
+BASE_RESOLUTION cells; every coarser level groups `ratio` x `ratio` cells
+of the next finer level, so the levels nest exactly (integer division of
+cell indices, no floating-point edge cases).
+
+Ingestion applies +1/-1 deltas at every level, only to the cells whose
+rows were inserted or moved, in the same transaction as the rows
+themselves. A full rebuild is available for repair: it scans the base
+tables once for the finest level and builds each coarser level by
+rolling up the finer one.
+"""
+import math
+from collections import defaultdict
+
+import pandas as pd
+from sqlalchemy import delete, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app import db
+from app.models import ZoneAggregate
+
+# Finest grid cell edge in degrees
+BASE_RESOLUTION = 0.002
+
+# Resolution (degrees) -> scale (number of base cells per edge), finest first
+RESOLUTIONS = {
+    0.002: 1,
+    0.01: 5,
+    0.05: 25,
+    0.2: 100,
+}
+DEFAULT_RESOLUTION = 0.05
+
+SCALE_TO_RESOLUTION = {scale: res for res, scale in RESOLUTIONS.items()}
+
+# Base cell of a point, as a SQL expression (must match base_cell_of)
+BASE_CELL_LAT_SQL = f"FLOOR(latitude / {BASE_RESOLUTION})::int"
+BASE_CELL_LON_SQL = f"FLOOR(longitude / {BASE_RESOLUTION})::int"
+
+BASE_LEVEL_SQL = f"""
+    INSERT INTO zone_aggregates (scale, cell_lat, cell_lon, business_count, transport_count)
+    SELECT 1, cell_lat, cell_lon, SUM(b), SUM(t)
+    FROM (
+        SELECT {BASE_CELL_LAT_SQL} AS cell_lat, {BASE_CELL_LON_SQL} AS cell_lon,
+               1 AS b, 0 AS t
+        FROM businesses
+        UNION ALL
+        SELECT {BASE_CELL_LAT_SQL}, {BASE_CELL_LON_SQL}, 0, 1
+        FROM transit_nodes
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    ) cells
+    GROUP BY cell_lat, cell_lon
+"""
+
+ROLLUP_SQL = """
+    INSERT INTO zone_aggregates (scale, cell_lat, cell_lon, business_count, transport_count)
+    SELECT :scale,
+           FLOOR(cell_lat::float8 / :ratio)::int AS lat,
+           FLOOR(cell_lon::float8 / :ratio)::int AS lon,
+           SUM(business_count), SUM(transport_count)
+    FROM zone_aggregates
+    WHERE scale = :finer_scale
+    GROUP BY lat, lon
+"""
+
+
+def resolution_for_zoom(zoom: int) -> float:
+    """Pick the pyramid level for a web-map zoom level."""
+    if zoom <= 8:
+        return 0.2
+    if zoom <= 10:
+        return 0.05
+    if zoom <= 13:
+        return 0.01
+    return 0.002
+
+
+def parse_resolution(value) -> float:
+    """
+    Raises:
+        ValueError: If value is not one of RESOLUTIONS
+    """
+    resolution = float(value)
+    for known in RESOLUTIONS:
+        if math.isclose(resolution, known):
+            return known
+    raise ValueError(
+        f"Unsupported resolution: {value} (use one of {', '.join(map(str, RESOLUTIONS))})"
+    )
+
+
+def cell_id(cell_lat: int, cell_lon: int, resolution: float = DEFAULT_RESOLUTION) -> str:
+    """Public identifier of a cell, e.g. "0.05:259_1551"."""
+    return f"{resolution}:{cell_lat}_{cell_lon}"
+
+
+def parse_cell_id(value: str) -> tuple:
+    """
+    Parse "<resolution>:<cell_lat>_<cell_lon>". Ids without a resolution
+    refer to DEFAULT_RESOLUTION.
+
+    Returns:
+        (resolution, cell_lat, cell_lon)
+
+    Raises:
+        ValueError: If value is malformed
+    """
+    try:
+        if ":" in value:
+            resolution, cell = value.split(":")
+            resolution = parse_resolution(resolution)
+        else:
+            resolution, cell = DEFAULT_RESOLUTION, value
+        lat, lon = cell.split("_")
+        return resolution, int(lat), int(lon)
+    except ValueError:
+        raise ValueError(f"Invalid cell id: {value}")
+
+
+def base_cell_of(lat: float, lon: float) -> tuple:
+    """Finest-level cell of a point (same arithmetic as BASE_CELL_*_SQL)."""
+    return math.floor(lat / BASE_RESOLUTION), math.floor(lon / BASE_RESOLUTION)
+
+
+def base_cell_range(cell_lat: int, cell_lon: int, resolution: float) -> tuple:
+    """
+    Inclusive range of base cells covered by a cell at a resolution.
+
+    Returns:
+        (lat_min, lat_max, lon_min, lon_max)
+    """
+    scale = RESOLUTIONS[resolution]
+    return (cell_lat * scale, cell_lat * scale + scale - 1,
+            cell_lon * scale, cell_lon * scale + scale - 1)
+
+
+def fetch_existing_cells(model, key_columns, rows) -> dict:
+    """
+    Current base cells of the rows that already exist, in one query.
+
+    Returns:
+        Dict mapping key tuple -> (cell_lat, cell_lon)
+    """
+    if not rows:
+        return {}
+    columns = [getattr(model, c) for c in key_columns]
+    keys = [tuple(row[c] for c in key_columns) for row in rows]
+    key_expr = columns[0] if len(columns) == 1 else tuple_(*columns)
+    values = keys if len(columns) > 1 else [k[0] for k in keys]
+
+    result = db.session.execute(
+        db.select(*columns, model.latitude, model.longitude).where(key_expr.in_(values))
+    )
+    existing = {}
+    for row in result:
+        *key, lat, lon = row
+        if lat is not None and lon is not None:
+            existing[tuple(key)] = base_cell_of(lat, lon)
+    return existing
+
+
+def cell_deltas(existing_cells: dict, rows, key_columns) -> dict:
+    """
+    Net count change per (scale, cell_lat, cell_lon) after upserting rows:
+    +1 for the new cell, -1 for the old cell of a row that existed, at
+    every level. Rows that stay in the same cell cancel out.
+    """
+    deltas = defaultdict(int)
+    for row in rows:
+        key = tuple(row[c] for c in key_columns)
+        old_cell = existing_cells.get(key)
+        new_cell = base_cell_of(row["latitude"], row["longitude"])
+        if old_cell == new_cell:
+            continue
+        for scale in RESOLUTIONS.values():
+            deltas[(scale, new_cell[0] // scale, new_cell[1] // scale)] += 1
+            if old_cell is not None:
+                deltas[(scale, old_cell[0] // scale, old_cell[1] // scale)] -= 1
+    return {cell: d for cell, d in deltas.items() if d != 0}
+
+
+def apply_zone_deltas(count_column: str, deltas: dict):
+    """
+    Add per-cell deltas to business_count or transport_count. Does not commit.
+
+    Returns:
+        Number of round trips used
+    """
+    if not deltas:
+        return 0
+
+    other = "transport_count" if count_column == "business_count" else "business_count"
+    stmt = pg_insert(ZoneAggregate).values([
+        {"scale": scale, "cell_lat": lat, "cell_lon": lon, count_column: delta, other: 0}
+        for (scale, lat, lon), delta in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["scale", "cell_lat", "cell_lon"],
+        set_={count_column: getattr(ZoneAggregate, count_column) + stmt.excluded[count_column]}
+    )
+    db.session.execute(stmt)
+    round_trips = 1
+
+    # Only cells that lost points can have dropped to zero
+    decreased = [cell for cell, delta in deltas.items() if delta < 0]
+    if decreased:
+        db.session.execute(delete(ZoneAggregate).where(
+            tuple_(ZoneAggregate.scale, ZoneAggregate.cell_lat, ZoneAggregate.cell_lon).in_(decreased),
+            ZoneAggregate.business_count == 0,
+            ZoneAggregate.transport_count == 0,
+        ))
+        round_trips += 1
+    return round_trips
+
+
+def build_zone_pyramid(conn):
+    """
+    Fill an empty zone_aggregates table: the base level from the base
+    tables, then each coarser level rolled up from the next finer one.
+    """
+    conn.execute(text(BASE_LEVEL_SQL))
+    scales = sorted(RESOLUTIONS.values())
+    for finer_scale, scale in zip(scales, scales[1:]):
+        conn.execute(text(ROLLUP_SQL), {
+            "scale": scale, "finer_scale": finer_scale, "ratio": scale // finer_scale
+        })
+
+
+def rebuild_zone_aggregates():
+    """Recompute zone_aggregates from the base tables and commit."""
+    try:
+        db.session.execute(text("DELETE FROM zone_aggregates"))
+        build_zone_pyramid(db.session)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+    return db.session.query(ZoneAggregate).count()
+
+
+def load_zone_counts(resolution: float = DEFAULT_RESOLUTION) -> pd.DataFrame:
+    """
+    Per-zone business and transit counts of one pyramid level.
+
+    Returns:
+        DataFrame with cell_id, zone_lat, zone_lon, business_count, transport_count
+    """
+    counts = pd.read_sql(
+        text("""
+            SELECT cell_lat, cell_lon, business_count, transport_count
+            FROM zone_aggregates
+            WHERE scale = :scale
+        """),
+        db.engine,
+        params={"scale": RESOLUTIONS[resolution]}
+    )
+    cell_lat = counts.pop("cell_lat")
+    cell_lon = counts.pop("cell_lon")
+    counts.insert(0, "cell_id", f"{resolution}:" + cell_lat.astype(str) + "_" + cell_lon.astype(str))
+    counts.insert(1, "zone_lat", cell_lat * resolution)
+    counts.insert(2, "zone_lon", cell_lon * resolution)
+    return counts
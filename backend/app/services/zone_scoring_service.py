@@ -0,0 +1,178 @@
+"""
+What-if scoring of zones under alternative weights and cutoffs.
+
+The per-zone component scores (biz/trans/pop score, saturation penalty,
+opportunity boost, transit access) do not depend on the weights, so they
+are cached once per resolution as an (n_zones, 6) matrix. A batch of configurations is then
+a weight matrix: every configuration is scored by one matrix product,
+and cutoffs, class counts and top zones come from one sort per
+configuration, without touching the database.
+"""
+import numpy as np
+
+from app.services.data_version import VersionedCache
+from app.services.zone_aggregate_service import DEFAULT_RESOLUTION
+from app.services.zone_service import DEFAULT_SCORING, get_zones_classified
+from app.services.transit_access_service import add_zone_accessibility
+
+# Component columns and the config weight applied to each (sign included)
+COMPONENTS = (
+    ("pop_score", "pop_weight", 1.0),
+    ("trans_score", "trans_weight", 1.0),
+    ("biz_score", "biz_weight", 1.0),
+    ("saturation_penalty", "saturation_penalty", -1.0),
+    ("opportunity_boost", "opportunity_boost", 1.0),
+    ("access_score", "access_weight", 1.0),
+)
+
+ZONE_TYPES = ("Opportunity Zone", "Balanced Zone", "Commercial Zone")
+
+MAX_CONFIGS = 1000
+MAX_TOP = 100
+
+# Upper bound on zones x configurations scored per block (float64 cells)
+BLOCK_CELLS = 20_000_000
+
+_components_cache = VersionedCache()
+
+
+def parse_scoring_config(config) -> dict:
+    """
+    Validate one configuration; missing keys take DEFAULT_SCORING values.
+
+    Raises:
+        ValueError: For unknown keys, non-numeric values or bad quantiles
+    """
+    if not isinstance(config, dict):
+        raise ValueError("Each config must be an object")
+    unknown = set(config) - set(DEFAULT_SCORING)
+    if unknown:
+        raise ValueError(
+            f"Unknown config keys: {', '.join(sorted(unknown))} "
+            f"(use {', '.join(DEFAULT_SCORING)})"
+        )
+
+    parsed = dict(DEFAULT_SCORING)
+    for key, value in config.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{key} must be a number")
+        parsed[key] = float(value)
+
+    if not 0 <= parsed["mid_quantile"] <= parsed["high_quantile"] <= 1:
+        raise ValueError("Quantiles must satisfy 0 <= mid_quantile <= high_quantile <= 1")
+    return parsed
+
+
+def _zone_components(resolution):
+    """(cell_ids, component matrix) for a resolution, cached per data version."""
+    def compute():
+        zones = get_zones_classified(resolution)
+        if zones.empty:
+            return np.array([], dtype=object), np.empty((0, len(COMPONENTS)))
+        if "access_score" not in zones:
+            zones = add_zone_accessibility(zones, resolution)
+        matrix = np.column_stack([zones[column].to_numpy(dtype=np.float64)
+                                  for column, _, _ in COMPONENTS])
+        return zones["cell_id"].to_numpy(), matrix
+
+    return _components_cache.get_or_compute(compute, key=resolution)
+
+
+def _sorted_quantiles(sorted_scores, n_valid, quantiles):
+    """
+    Linear-interpolated quantiles (numpy's default method) of each row of
+    a row-sorted matrix whose NaNs sort last, with a different quantile
+    per row.
+    """
+    if n_valid == 0:
+        return np.full(len(quantiles), np.nan)
+    position = quantiles * (n_valid - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, n_valid - 1)
+    rows = np.arange(len(quantiles))
+    low_values = sorted_scores[rows, lower]
+    high_values = sorted_scores[rows, upper]
+    return low_values + (high_values - low_values) * (position - lower)
+
+
+def score_configurations(configs, resolution=DEFAULT_RESOLUTION, top=10):
+    """
+    Score every zone of a resolution under each configuration.
+
+    Args:
+        configs: List of configs (see parse_scoring_config)
+        top: Number of highest-scoring zones to return per config
+
+    Returns:
+        List of result dicts (config, cutoffs, by_type, mean_score,
+        top_zones), in the order of configs
+
+    Raises:
+        ValueError: For invalid configs or arguments
+    """
+    if not configs:
+        raise ValueError("At least one config is required")
+    if len(configs) > MAX_CONFIGS:
+        raise ValueError(f"At most {MAX_CONFIGS} configs per request")
+    if not 0 <= top <= MAX_TOP:
+        raise ValueError(f"top must be between 0 and {MAX_TOP}")
+    configs = [parse_scoring_config(c) for c in configs]
+
+    cell_ids, components = _zone_components(resolution)
+    n = len(cell_ids)
+
+    # (K, 6) weights and per-config quantiles
+    weights = np.array([[sign * c[key] for _, key, sign in COMPONENTS] for c in configs])
+    high_q = np.array([c["high_quantile"] for c in configs])
+    mid_q = np.array([c["mid_quantile"] for c in configs])
+
+    valid = ~np.isnan(components).any(axis=1)
+    n_valid = int(valid.sum())
+    k = min(top, n_valid)
+
+    results = []
+    block = max(1, BLOCK_CELLS // max(n, 1))
+    for start in range(0, len(configs), block):
+        sl = slice(start, start + block)
+        # One row per config, so every per-config reduction is contiguous
+        scores = np.clip(weights[sl] @ components.T, 0, 1)
+
+        # NaN (zones with undefined components) sorts last
+        sorted_scores = np.sort(scores, axis=1)
+        high_cut = _sorted_quantiles(sorted_scores, n_valid, high_q[sl])
+        mid_cut = _sorted_quantiles(sorted_scores, n_valid, mid_q[sl])
+
+        # Class counts from the sorted rows: zones at or above each cutoff
+        counts = np.zeros((scores.shape[0], len(ZONE_TYPES)), dtype=np.int64)
+        for j in range(scores.shape[0]):
+            valid_sorted = sorted_scores[j, :n_valid]
+            at_high, at_mid = n_valid - np.searchsorted(valid_sorted, [high_cut[j], mid_cut[j]])
+            counts[j] = (n - at_mid, at_mid - at_high, at_high)
+        totals = sorted_scores[:, :n_valid].sum(axis=1)
+        means = totals / n_valid if n_valid else np.full(len(totals), np.nan)
+
+        if k:
+            ranked = np.where(valid, scores, -np.inf)
+            best = np.argpartition(ranked, n - k, axis=1)[:, n - k:]
+            order = np.argsort(-np.take_along_axis(ranked, best, axis=1), axis=1, kind="stable")
+            best = np.take_along_axis(best, order, axis=1)
+        else:
+            best = np.empty((scores.shape[0], 0), dtype=np.int64)
+
+        for j, config in enumerate(configs[sl]):
+            results.append({
+                "config": config,
+                "cutoffs": {"high": _number(high_cut[j]), "mid": _number(mid_cut[j])},
+                "by_type": dict(zip(ZONE_TYPES, counts[j].tolist())),
+                "mean_score": _number(means[j]),
+                "top_zones": [
+                    {"cell_id": cell_ids[i], "adjusted_zone_score": float(scores[j, i])}
+                    for i in best[j].tolist()
+                ],
+            })
+    return results
+
+
+def _number(value):
+    value = float(value)
+    return None if np.isnan(value) else value
@@ -3,74 +3,103 @@ Zone classification service for aggregating businesses and transit into zones
 and identifying opportunity-focused zones for expansion analysis.
 """
 
-import pandas as pd
+import os
+import threading
+import traceback
+import uuid
 import numpy as np
 from sqlalchemy import text
 from app import db
-
-
-# -------------------------------------------------
-# Classification helper
-# -------------------------------------------------
-def classify_zone(score: float, high_cutoff: float, mid_cutoff: float) -> str:
-    if score >= high_cutoff:
-        return "Commercial Zone"
-    elif score >= mid_cutoff:
-        return "Balanced Zone"
-    else:
-        return "Opportunity Zone"
+from app.services.data_version import VersionedCache
+from app.services.zone_aggregate_service import (
+    DEFAULT_RESOLUTION, BASE_CELL_LAT_SQL, BASE_CELL_LON_SQL,
+    load_zone_counts, parse_cell_id, base_cell_range
+)
+from app.services.pagination import encode_cursor, decode_cursor
+from app.services.serialization import frame_records_json, frame_columns_json
+from app.services.transit_access_service import add_zone_accessibility
+
+# Classified zones per resolution, recomputed only when business/transit data changes
+_zones_cache = VersionedCache()
+
+# Response layouts of get_zones_json
+ZONE_LAYOUTS = {
+    "records": frame_records_json,
+    "columns": frame_columns_json,
+}
+
+# Scoring weights and classification cutoffs used for /zones/all; see
+# zone_scoring_service for evaluating alternatives
+DEFAULT_SCORING = {
+    "pop_weight": 0.35,
+    "trans_weight": 0.35,
+    "biz_weight": 0.30,
+    "saturation_penalty": 0.20,
+    "opportunity_boost": 0.25,
+    "high_quantile": 0.90,
+    "mid_quantile": 0.60,
+    # Weight of the transit accessibility term (share of a zone's businesses
+    # within 500 m of a stop); off unless ZONE_ACCESS_WEIGHT is set
+    "access_weight": float(os.getenv("ZONE_ACCESS_WEIGHT", "0")),
+}
+
+# Rows scored per vectorized pass in score_zones
+SCORING_CHUNK_SIZE = 500_000
 
 
 # -------------------------------------------------
 # Core logic
 # -------------------------------------------------
-def get_zones_classified():
+def get_zones_classified(resolution=DEFAULT_RESOLUTION):
     """
-    Aggregate businesses and transit nodes into zones and classify them
-    with an opportunity-aware bias.
+    Classified zones for the current data version, served from memory.
+    Concurrent cache misses trigger a single computation.
+
+    The returned DataFrame is shared between callers; do not modify it.
+
+    Args:
+        resolution: Grid resolution in degrees (a zone pyramid level)
 
     Returns:
         pandas.DataFrame
     """
+    return _zones_cache.get_or_compute(
+        lambda: compute_zones_classified(resolution), key=resolution
+    )
 
-    engine = db.engine
 
-    # -------------------------------------------------
-    # STEP 1: AGGREGATE BUSINESSES
-    # -------------------------------------------------
-    business_query = text("""
-        SELECT
-    FLOOR(latitude / 0.05) * 0.05  AS zone_lat,
-    FLOOR(longitude / 0.05) * 0.05 AS zone_lon,
-    COUNT(*) AS business_count,
-    json_agg(raw_tags) AS business_raw_tags
-        FROM businesses
-        GROUP BY zone_lat, zone_lon
-    """)
-    business_df = pd.read_sql(business_query, engine)
+def warm_zone_cache(app):
+    """Compute the zones cache in a background thread after startup."""
+    def warm():
+        try:
+            with app.app_context():
+                zones = get_zones_classified()
+                print(f"[OK] Zone cache warmed ({len(zones)} zones)")
+        except Exception as e:
+            print(f"[WARNING] Zone cache warm-up failed: {e}")
+            traceback.print_exc()
 
-    # -------------------------------------------------
-    # STEP 2: AGGREGATE TRANSIT
-    # -------------------------------------------------
-    transit_query = text("""
-            SELECT
-        FLOOR(latitude / 0.05) * 0.05  AS zone_lat,
-        FLOOR(longitude / 0.05) * 0.05 AS zone_lon,
-            COUNT(*) AS transport_count
-            FROM transit_nodes
-            GROUP BY zone_lat, zone_lon
-    """)
-    transit_df = pd.read_sql(transit_query, engine)
+    thread = threading.Thread(target=warm, name="zone-cache-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def compute_zones_classified(resolution=DEFAULT_RESOLUTION):
+    """
+    Aggregate businesses and transit nodes into zones and classify them
+    with an opportunity-aware bias.
+
+    Args:
+        resolution: Grid resolution in degrees (a zone pyramid level)
+
+    Returns:
+        pandas.DataFrame
+    """
 
     # -------------------------------------------------
-    # STEP 3: MERGE INTO ZONES
+    # STEPS 1-3: PRE-AGGREGATED ZONE COUNTS (zone_aggregates)
     # -------------------------------------------------
-    zones = pd.merge(
-        business_df,
-        transit_df,
-        on=["zone_lat", "zone_lon"],
-        how="outer"
-    ).fillna(0)
+    zones = load_zone_counts(resolution)
 
     # -------------------------------------------------
     # STEP 4: DROP ULTRA-SPARSE ZONES
@@ -80,99 +109,319 @@ def get_zones_classified():
     if zones.empty:
         return zones
 
+    # Sorted by latitude so viewport filters can binary-search (filter_zones)
+    zones = zones.sort_values(["zone_lat", "zone_lon"], ignore_index=True)
+
+    if DEFAULT_SCORING["access_weight"]:
+        zones = add_zone_accessibility(zones, resolution)
+    return score_zones(zones)
+
+
+def score_zones(zones, chunk_size=SCORING_CHUNK_SIZE):
+    """
+    Score and classify zone counts (steps 5-10), vectorized with NumPy.
+
+    Fine resolutions can have millions of cells, so the element-wise work
+    runs in chunks of chunk_size rows to bound temporary arrays. Global
+    statistics (maxima, quantiles) are taken over the full arrays.
+
+    Args:
+        zones: DataFrame with business_count and transport_count, and
+               optionally access_score (see add_zone_accessibility)
+
+    Returns:
+        pandas.DataFrame with the score columns and zone_type added
+    """
+    w = DEFAULT_SCORING
+    business_count = zones["business_count"].to_numpy()
+    transport_count = zones["transport_count"].to_numpy()
+    n = len(zones)
+    access_score = zones["access_score"].to_numpy() if "access_score" in zones else None
+
     # -------------------------------------------------
     # STEP 5: POPULATION PROXY
     # -------------------------------------------------
-    zones["population"] = (
-        zones["business_count"] * 300 +
-        zones["transport_count"] * 500
-    )
+    population = business_count * 300 + transport_count * 500
 
     # -------------------------------------------------
-    # STEP 6: LOG SCALING (SKEW FIX)
+    # STEP 7 (normalizers): log1p is monotonic, so max(log1p(x)) = log1p(max(x))
     # -------------------------------------------------
-    zones["biz_log"] = np.log1p(zones["business_count"])
-    zones["trans_log"] = np.log1p(zones["transport_count"])
-    zones["pop_log"] = np.log1p(zones["population"])
+    biz_max = np.log1p(business_count.max())
+    trans_max = np.log1p(transport_count.max())
+    pop_max = np.log1p(population.max())
+
+    out = {name: np.empty(n) for name in (
+        "biz_log", "trans_log", "pop_log",
+        "biz_score", "trans_score", "pop_score",
+        "base_zone_score", "saturation_penalty", "opportunity_boost",
+        "adjusted_zone_score",
+    )}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, n, chunk_size):
+            sl = slice(start, start + chunk_size)
+
+            # STEP 6: LOG SCALING (SKEW FIX)
+            biz_log = np.log1p(business_count[sl])
+            trans_log = np.log1p(transport_count[sl])
+            pop_log = np.log1p(population[sl])
+
+            # STEP 7: NORMALIZATION
+            biz_score = biz_log / biz_max
+            trans_score = trans_log / trans_max
+            pop_score = pop_log / pop_max
+
+            # STEP 8: BASE ACTIVITY SCORE
+            base_zone_score = (w["pop_weight"] * pop_score + w["trans_weight"] * trans_score
+                               + w["biz_weight"] * biz_score)
+
+            # STEP 9: OPPORTUNITY-AWARE ADJUSTMENTS (KEY PART)
+            # Penalize already saturated business hubs (Tier-1 cores)
+            saturation_penalty = biz_score ** 2
+            # Boost zones with population but low saturation (Tier-2 potential)
+            opportunity_boost = (1 - biz_score) * pop_score
+
+            adjusted = (base_zone_score - w["saturation_penalty"] * saturation_penalty
+                        + w["opportunity_boost"] * opportunity_boost)
+            # Optional: reward zones whose businesses are near transit
+            if access_score is not None:
+                adjusted = adjusted + w["access_weight"] * access_score[sl]
+
+            out["biz_log"][sl] = biz_log
+            out["trans_log"][sl] = trans_log
+            out["pop_log"][sl] = pop_log
+            out["biz_score"][sl] = biz_score
+            out["trans_score"][sl] = trans_score
+            out["pop_score"][sl] = pop_score
+            out["base_zone_score"][sl] = base_zone_score
+            out["saturation_penalty"][sl] = saturation_penalty
+            out["opportunity_boost"][sl] = opportunity_boost
+            out["adjusted_zone_score"][sl] = np.clip(adjusted, 0, 1)
 
     # -------------------------------------------------
-    # STEP 7: NORMALIZATION
+    # STEP 10: OPPORTUNITY-FOCUSED CLASSIFICATION
     # -------------------------------------------------
-    zones["biz_score"] = zones["biz_log"] / zones["biz_log"].max()
-    zones["trans_score"] = zones["trans_log"] / zones["trans_log"].max()
-    zones["pop_score"] = zones["pop_log"] / zones["pop_log"].max()
+    adjusted = out["adjusted_zone_score"]
+    if np.isnan(adjusted).all():
+        high_cutoff = mid_cutoff = np.nan
+    else:
+        high_cutoff, mid_cutoff = np.nanquantile(
+            adjusted, [w["high_quantile"], w["mid_quantile"]]
+        )
+
+    zone_type = np.empty(n, dtype=object)
+    for start in range(0, n, chunk_size):
+        sl = slice(start, start + chunk_size)
+        zone_type[sl] = np.select(
+            [adjusted[sl] >= high_cutoff, adjusted[sl] >= mid_cutoff],
+            ["Commercial Zone", "Balanced Zone"],
+            default="Opportunity Zone"
+        )
+
+    zones = zones.copy()
+    zones["population"] = population
+    for name, values in out.items():
+        zones[name] = values
+    zones["zone_type"] = zone_type
 
-    # -------------------------------------------------
-    # STEP 8: BASE ACTIVITY SCORE
-    # -------------------------------------------------
-    zones["base_zone_score"] = (
-        0.35 * zones["pop_score"] +
-        0.35 * zones["trans_score"] +
-        0.30 * zones["biz_score"]
-    )
+    return zones
 
-    # -------------------------------------------------
-    # STEP 9: OPPORTUNITY-AWARE ADJUSTMENTS (KEY PART)
-    # -------------------------------------------------
 
-    # Penalize already saturated business hubs (Tier-1 cores)
-    zones["saturation_penalty"] = zones["biz_score"] ** 2
+def filter_zones(zones, resolution, bbox=None, limit=None):
+    """
+    Restrict classified zones to the cells overlapping a viewport.
 
-    # Boost zones with population but low saturation (Tier-2 potential)
-    zones["opportunity_boost"] = (
-        (1 - zones["biz_score"]) *
-        zones["pop_score"]
-    )
+    zones is sorted by zone_lat, so the latitude range is found by binary
+    search and only that slice is scanned for longitude.
 
-    # Final adjusted score
-    zones["adjusted_zone_score"] = (
-        zones["base_zone_score"]
-        - 0.20 * zones["saturation_penalty"]
-        + 0.25 * zones["opportunity_boost"]
-    )
+    Args:
+        zones: DataFrame from get_zones_classified(resolution)
+        bbox: Optional (min_lon, min_lat, max_lon, max_lat)
+        limit: Optional maximum number of zones
 
-    zones["adjusted_zone_score"] = zones["adjusted_zone_score"].clip(0, 1)
+    Returns:
+        (DataFrame, truncated)
 
-    # -------------------------------------------------
-    # STEP 10: OPPORTUNITY-FOCUSED CLASSIFICATION
-    # -------------------------------------------------
-    high_cutoff = zones["adjusted_zone_score"].quantile(0.90)
-    mid_cutoff  = zones["adjusted_zone_score"].quantile(0.60)
+    Raises:
+        ValueError: If limit is not a positive integer
+    """
+    if limit is not None and (not isinstance(limit, (int, np.integer)) or limit < 1):
+        raise ValueError(f"limit must be a positive integer, got {limit!r}")
+    if bbox is not None and not zones.empty:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        zone_lat = zones["zone_lat"].to_numpy()
+        # A cell spans [zone_lat, zone_lat + resolution)
+        start = np.searchsorted(zone_lat, min_lat - resolution, side="right")
+        end = np.searchsorted(zone_lat, max_lat, side="right")
+        zones = zones.iloc[start:end]
+        zone_lon = zones["zone_lon"].to_numpy()
+        zones = zones[(zone_lon + resolution > min_lon) & (zone_lon <= max_lon)]
+
+    truncated = limit is not None and len(zones) > limit
+    if truncated:
+        zones = zones.iloc[:limit]
+    return zones, truncated
 
-    zones["zone_type"] = zones["adjusted_zone_score"].apply(
-        lambda s: classify_zone(s, high_cutoff, mid_cutoff)
-    )
 
-    return zones
+# -------------------------------------------------
+# Zone drill-down
+# -------------------------------------------------
+def _decode_zone_cursor(after: str) -> tuple:
+    """(base cell lat, base cell lon, business id) of a zone page cursor."""
+    try:
+        base_lat, base_lon, last_id = decode_cursor(after)
+        if not isinstance(base_lat, int) or not isinstance(base_lon, int):
+            raise ValueError(after)
+        return base_lat, base_lon, str(uuid.UUID(last_id))
+    except (TypeError, AttributeError, ValueError):
+        raise ValueError(f"Invalid cursor: {after}")
+
+
+def get_zone_businesses(cell, limit, after=None, tags=None):
+    """
+    One page of the businesses inside a zone cell, ordered by base cell,
+    then id.
+
+    Cells of every resolution map to a range of base cells. Pages are
+    keyset-paginated on (base cell, id), the order of the
+    ix_businesses_base_cell expression index, so rows come back in index
+    order without sorting the cell. The index range is bounded by the base
+    cell latitude only; the longitude range is a filter on the entries it
+    reads. A page therefore stops after limit matching rows, but may read
+    every row of the cell's latitude strip (all longitudes) on the way,
+    which is most of the strip when the cell is sparse and its
+    neighbours are dense.
+
+    Args:
+        cell: Cell id as returned in /zones/all ("<resolution>:<cell_lat>_<cell_lon>")
+        limit: Page size
+        after: Cursor from the previous page's "next"
+        tags: None for no tags, "all" for the full raw_tags, or a list
+              of tag keys to project
+
+    Returns:
+        (list of business dicts, next cursor or None)
+
+    Raises:
+        ValueError: If the cell id or cursor is malformed
+    """
+    resolution, cell_lat, cell_lon = parse_cell_id(cell)
+    lat_min, lat_max, lon_min, lon_max = base_cell_range(cell_lat, cell_lon, resolution)
+    params = {
+        "lat_min": lat_min, "lat_max": lat_max,
+        "lon_min": lon_min, "lon_max": lon_max,
+        "limit": limit + 1
+    }
+
+    tag_columns = ""
+    if tags == "all":
+        tag_columns = ", raw_tags"
+    elif tags:
+        for i, key in enumerate(tags):
+            tag_columns += f", raw_tags -> :tag_{i} AS tag_{i}"
+            params[f"tag_{i}"] = key
+
+    keyset = ""
+    if after:
+        keyset = (f"AND ({BASE_CELL_LAT_SQL}, {BASE_CELL_LON_SQL}, id) "
+                  "> (:after_lat, :after_lon, CAST(:after_id AS uuid))")
+        params["after_lat"], params["after_lon"], params["after_id"] = _decode_zone_cursor(after)
+
+    rows = db.session.execute(text(f"""
+        SELECT id, osm_id, osm_type, name, category, latitude, longitude,
+               {BASE_CELL_LAT_SQL} AS base_lat, {BASE_CELL_LON_SQL} AS base_lon{tag_columns}
+        FROM businesses
+        WHERE {BASE_CELL_LAT_SQL} BETWEEN :lat_min AND :lat_max
+          AND {BASE_CELL_LON_SQL} BETWEEN :lon_min AND :lon_max
+          {keyset}
+        ORDER BY {BASE_CELL_LAT_SQL}, {BASE_CELL_LON_SQL}, id
+        LIMIT :limit
+    """), params).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last["base_lat"], last["base_lon"], str(last["id"])])
+
+    businesses = []
+    for row in rows:
+        business = {
+            "id": str(row["id"]),
+            "osm_id": row["osm_id"],
+            "osm_type": row["osm_type"],
+            "name": row["name"],
+            "category": row["category"],
+            "latitude": row["latitude"],
+            "longitude": row["longitude"],
+        }
+        if tags == "all":
+            business["raw_tags"] = row["raw_tags"]
+        elif tags:
+            business["tags"] = {
+                key: row[f"tag_{i}"] for i, key in enumerate(tags)
+                if row[f"tag_{i}"] is not None
+            }
+        businesses.append(business)
+
+    return businesses, next_cursor
 
 
 # -------------------------------------------------
 # JSON API helper
 # -------------------------------------------------
-def get_zones_json():
+def get_zones_json(resolution=DEFAULT_RESOLUTION, bbox=None, limit=None, layout="records"):
     """
-    Return zones in JSON-serializable format
+    Zones encoded as JSON bytes, optionally restricted to a viewport (see
+    filter_zones). Encoding is column-wise straight from the DataFrame.
+
+    Args:
+        layout: "records" for a list of zone objects, or "columns" for one
+                array per field ({"zone_lat": [...], "zone_lon": [...], ...})
+
+    Returns:
+        (encoded zones, zone count, truncated)
+
+    Raises:
+        ValueError: For an unknown layout
     """
+    if layout not in ZONE_LAYOUTS:
+        raise ValueError(f"Unknown format: {layout} (use one of {', '.join(ZONE_LAYOUTS)})")
+
+    zones_df, truncated = filter_zones(
+        get_zones_classified(resolution), resolution, bbox=bbox, limit=limit
+    )
+    return ZONE_LAYOUTS[layout](zones_df), len(zones_df), truncated
+
+
+def get_zones_summary(resolution=DEFAULT_RESOLUTION):
+    """
+    Zone counts by type and mean scores of one pyramid level, cached with
+    the classified zones.
+
+    Returns:
+        Dict with total_zones, by_type and avg_scores
+    """
+    def compute():
+        zones_df = get_zones_classified(resolution)
+        if zones_df.empty:
+            return {"total_zones": 0, "by_type": {}, "avg_scores": {}}
+
+        types, counts = np.unique(zones_df["zone_type"].to_numpy(dtype=str), return_counts=True)
+        return {
+            "total_zones": len(zones_df),
+            "by_type": dict(zip(types.tolist(), counts.tolist())),
+            "avg_scores": {
+                "zone_score": float(np.nanmean(zones_df["adjusted_zone_score"].to_numpy())),
+                "pop_score": float(np.nanmean(zones_df["pop_score"].to_numpy())),
+                "biz_score": float(np.nanmean(zones_df["biz_score"].to_numpy())),
+                "trans_score": float(np.nanmean(zones_df["trans_score"].to_numpy())),
+            }
+        }
+
+    return _zones_cache.get_or_compute(compute, key=("summary", resolution))
+
 
-    zones_df = get_zones_classified()
-    zones_list = zones_df.to_dict("records")
-
-    for z in zones_list:
-        z["zone_lat"] = float(z["zone_lat"])
-        z["zone_lon"] = float(z["zone_lon"])
-        z["business_count"] = int(z["business_count"])
-        z["transport_count"] = int(z["transport_count"])
-        z["population"] = int(z["population"])
-
-        z["biz_score"] = float(z["biz_score"])
-        z["trans_score"] = float(z["trans_score"])
-        z["pop_score"] = float(z["pop_score"])
-
-        z["base_zone_score"] = float(z["base_zone_score"])
-        z["adjusted_zone_score"] = float(z["adjusted_zone_score"])
-        z["business_raw_tags"] = z.get("business_raw_tags", [])
-    return zones_list
-    
 def save_zones_to_json(file_path="zones_classified.json"):
     zones_df = get_zones_classified()
     zones_json = zones_df.to_dict("records")
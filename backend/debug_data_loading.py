@@ -4,7 +4,7 @@ This will help identify where the issue is in the data loading process.
 """
 import sys
 from app import create_app, db
-from utils.overpass_client import fetch_overpass_data
+from utils.overpass_client import fetch_overpass_data, response_cache
 from utils.overpass_parser import insert_transit_nodes
 from app.models import TransitNode
 
@@ -178,6 +178,9 @@ def debug_data_loading():
         return True
 
 if __name__ == "__main__":
+    if "--offline" in sys.argv:
+        # Replay the cached Overpass response instead of downloading it again
+        response_cache.mode = "replay"
     success = debug_data_loading()
     sys.exit(0 if success else 1)
 
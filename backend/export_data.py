@@ -0,0 +1,64 @@
+"""
+Script to export zones, businesses and transit nodes as Parquet or Arrow.
+
+Arrow files use the IPC file format, so notebooks can memory-map them
+without copying:
+
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map("zones.arrow")).read_all()
+
+Usage:
+    python export_data.py zones --format parquet
+    python export_data.py businesses --format arrow --output exports/businesses.arrow
+    python export_data.py zones --resolution 0.01 --format parquet
+"""
+import argparse
+import sys
+import time
+from app import create_app
+from app.services.export_service import EXPORT_DATASETS, EXPORT_FORMATS, export_to_file
+from app.services.zone_aggregate_service import DEFAULT_RESOLUTION, parse_resolution
+
+
+def export(dataset, fmt, output=None, resolution=DEFAULT_RESOLUTION, tags=None):
+    """Export one dataset to a file"""
+    output = output or f"{dataset}.{fmt}"
+    print("=" * 50)
+    print(f"Exporting {dataset} to {output}")
+    print("=" * 50)
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            options = {}
+            if dataset == "zones":
+                options["resolution"] = resolution
+            elif dataset == "businesses" and tags is not None:
+                options["tags"] = tags
+
+            started = time.perf_counter()
+            rows = export_to_file(dataset, fmt, output, **options)
+            print(f"[OK] Wrote {rows} rows to {output} ({time.perf_counter() - started:.2f}s)")
+            print("=" * 50)
+            return True
+        except Exception as e:
+            print(f"[ERROR] Error exporting {dataset}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export datasets as Parquet or Arrow")
+    parser.add_argument("dataset", choices=EXPORT_DATASETS)
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--output", help="Output path (default: <dataset>.<format>)")
+    parser.add_argument("--resolution", type=parse_resolution, default=DEFAULT_RESOLUTION,
+                        help="Zone grid resolution in degrees (zones only)")
+    parser.add_argument("--tags", help="Comma-separated raw_tags keys to export (businesses only)")
+    args = parser.parse_args()
+
+    tags = [t for t in args.tags.split(",") if t] if args.tags is not None else None
+    success = export(args.dataset, args.format, args.output, args.resolution, tags)
+    sys.exit(0 if success else 1)
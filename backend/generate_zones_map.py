@@ -1,117 +1,260 @@
 """
 Standalone script to generate zones CSV and interactive map.
 This script uses the zone classification logic to create visualizations.
+
+By default all zones are drawn by one canvas layer built column-wise from
+the DataFrame; popups are rendered in the browser from the zone's
+properties. Several maps (per resolution, per zone type) can be rendered
+in parallel worker processes.
+
+Usage:
+    python generate_zones_map.py
+    python generate_zones_map.py --resolutions 0.2,0.05,0.01 --split-by-type
+    python generate_zones_map.py --mode markers   # one folium marker per zone (slow)
 """
+import argparse
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
-import pandas as pd
 import folium
+from branca.element import MacroElement
+from jinja2 import Template
 from app import create_app, db
+from app.services.serialization import dumps
+from app.services.zone_aggregate_service import DEFAULT_RESOLUTION, parse_resolution
 from app.services.zone_service import get_zones_classified
 
 # Load environment variables
 load_dotenv()
 
+ZONE_TYPES = ("Commercial Zone", "Balanced Zone", "Opportunity Zone")
+ZONE_COLORS = {"Commercial Zone": "red", "Balanced Zone": "orange", "Opportunity Zone": "blue"}
+
+# Columns a map needs; workers receive only these
+MAP_COLUMNS = ["zone_lat", "zone_lon", "zone_type", "adjusted_zone_score",
+               "business_count", "transport_count", "population"]
+
+LEGEND_HTML = '''
+<div style="position: fixed;
+            bottom: 50px; left: 50px; width: 200px; height: 120px;
+            background-color: white; border:2px solid grey; z-index:9999;
+            font-size:14px; padding: 10px">
+<h4>Zone Types</h4>
+<p><span style="color:red;">●</span> Commercial Zone</p>
+<p><span style="color:orange;">●</span> Balanced Zone</p>
+<p><span style="color:blue;">●</span> Opportunity Zone</p>
+</div>
+'''
+
+
 def color_zone(zone_type: str) -> str:
     """Get color for zone type"""
-    if zone_type == "Commercial Zone":
-        return "red"
-    elif zone_type == "Balanced Zone":
-        return "orange"
-    return "blue"
+    return ZONE_COLORS.get(zone_type, "blue")
+
+
+class ZoneLayer(MacroElement):
+    """
+    All zones as circle markers on one shared canvas renderer. The zones
+    are embedded once as column arrays; markers and popups are created in
+    the browser.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var zones = {{ this.data }};
+            var types = {{ this.types }};
+            var colors = {{ this.colors }};
+            var renderer = L.canvas({padding: 0.5});
+            var layer = L.featureGroup();
+            function popup(marker) {
+                var i = marker.options.zoneIndex;
+                return "<b>Zone (" + zones.lat[i].toFixed(2) + ", " + zones.lon[i].toFixed(2) + ")</b><br>" +
+                    "Type: " + types[zones.type[i]] + "<br>" +
+                    "Score: " + zones.score[i].toFixed(2) + "<br>" +
+                    "Businesses: " + zones.businesses[i] + "<br>" +
+                    "Transport Nodes: " + zones.transport[i] + "<br>" +
+                    "Estimated Population: " + zones.population[i];
+            }
+            for (var i = 0; i < zones.lat.length; i++) {
+                L.circleMarker([zones.lat[i], zones.lon[i]], {
+                    renderer: renderer,
+                    radius: 5 + zones.score[i] * 12,
+                    color: colors[zones.type[i]],
+                    fill: true,
+                    fillOpacity: 0.75,
+                    zoneIndex: i
+                }).bindPopup(popup, {maxWidth: 300}).addTo(layer);
+            }
+            layer.addTo({{ this._parent.get_name() }});
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, zones):
+        super().__init__()
+        self._name = "ZoneLayer"
+        type_codes = zones["zone_type"].map({t: i for i, t in enumerate(ZONE_TYPES)})
+        self.types = dumps(list(ZONE_TYPES)).decode()
+        self.colors = dumps([ZONE_COLORS[t] for t in ZONE_TYPES]).decode()
+        # Rounded column arrays keep the embedded data small
+        self.data = dumps({
+            "lat": zones["zone_lat"].round(5).tolist(),
+            "lon": zones["zone_lon"].round(5).tolist(),
+            "type": type_codes.fillna(ZONE_TYPES.index("Opportunity Zone")).astype(int).tolist(),
+            "score": zones["adjusted_zone_score"].fillna(0).round(4).tolist(),
+            "businesses": zones["business_count"].astype(int).tolist(),
+            "transport": zones["transport_count"].astype(int).tolist(),
+            "population": zones["population"].astype(int).tolist(),
+        }).decode()
+
+
+def _new_map(zones):
+    m = folium.Map(
+        location=[zones["zone_lat"].mean(), zones["zone_lon"].mean()],
+        zoom_start=11,
+        tiles="CartoDB positron",
+        prefer_canvas=True
+    )
+    m.get_root().html.add_child(folium.Element(LEGEND_HTML))
+    return m
+
+
+def add_zone_markers(m, zones):
+    """Legacy rendering: one folium CircleMarker with an HTML popup per zone."""
+    for _, row in zones.iterrows():
+        folium.CircleMarker(
+            location=[row["zone_lat"], row["zone_lon"]],
+            radius=5 + row["adjusted_zone_score"] * 12,
+            color=color_zone(row["zone_type"]),
+            fill=True,
+            fill_opacity=0.75,
+            popup=folium.Popup(
+                f"""
+                <b>Zone ({row['zone_lat']:.2f}, {row['zone_lon']:.2f})</b><br>
+                Type: {row['zone_type']}<br>
+                Score: {row['adjusted_zone_score']:.2f}<br>
+                Businesses: {int(row['business_count'])}<br>
+                Transport Nodes: {int(row['transport_count'])}<br>
+                Estimated Population: {int(row['population'])}
+                """,
+                max_width=300
+            )
+        ).add_to(m)
+
+
+def render_map(job):
+    """
+    Render one map to HTML. Runs in a worker process, so it only uses the
+    zones DataFrame passed in (no database access).
+
+    Args:
+        job: (zones DataFrame, output path, mode)
+
+    Returns:
+        (path, zone count, size in bytes, seconds)
+    """
+    zones, path, mode = job
+    started = time.perf_counter()
+
+    m = _new_map(zones)
+    if mode == "markers":
+        add_zone_markers(m, zones)
+    else:
+        m.add_child(ZoneLayer(zones))
+    m.save(path)
+
+    return path, len(zones), os.path.getsize(path), time.perf_counter() - started
+
+
+def map_path(resolution, zone_type=None, single=False):
+    """Output file name for a map."""
+    if single:
+        return "polycentric_zones_map_fixed.html"
+    suffix = f"_{zone_type.split()[0].lower()}" if zone_type else ""
+    return f"zones_map_{resolution}{suffix}.html"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate zone maps")
+    parser.add_argument("--mode", choices=["vector", "markers"], default="vector",
+                        help="vector: one canvas layer (fast); markers: one folium marker per zone")
+    parser.add_argument("--resolutions", default=str(DEFAULT_RESOLUTION),
+                        help="Comma-separated grid resolutions in degrees")
+    parser.add_argument("--split-by-type", action="store_true",
+                        help="Also render one map per zone type")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes for rendering")
+    return parser.parse_args()
 
 
 def main():
     """Generate zones CSV and map"""
+    args = parse_args()
+    resolutions = [parse_resolution(r) for r in args.resolutions.split(",") if r]
+
     # Create Flask app context
     app = create_app()
-    
-    with app.app_context():
-        try:
+
+    try:
+        with app.app_context():
             print("🔄 Processing zones...")
-            
-            # Get classified zones
-            zones = get_zones_classified()
-            
-            if len(zones) == 0:
-                print("❌ No zones found. Make sure you have loaded business and transit data.")
-                print("   Run: python load_business_data.py")
-                print("   Run: python load_transit_data.py")
-                sys.exit(1)
-            
-            # STEP 10: SUMMARY PRINT
-            print("\n📊 ZONE SUMMARY")
-            print(f"Total zones: {len(zones)}")
-            print(zones["zone_type"].value_counts())
-            
-            # STEP 11: SAVE CSV
-            csv_path = "zones_classified_fixed.csv"
-            zones.to_csv(csv_path, index=False)
-            print(f"\n✅ CSV saved: {csv_path}")
-            
-            # STEP 12: CREATE MAP
-            # Calculate center point
-            center_lat = zones["zone_lat"].mean()
-            center_lon = zones["zone_lon"].mean()
-            
-            m = folium.Map(
-                location=[center_lat, center_lon],
-                zoom_start=11,
-                tiles="CartoDB positron"
-            )
-            
-            # Add zones to map
-            for _, row in zones.iterrows():
-                folium.CircleMarker(
-                    location=[row["zone_lat"], row["zone_lon"]],
-                    radius=5 + row["zone_score"] * 12,
-                    color=color_zone(row["zone_type"]),
-                    fill=True,
-                    fill_opacity=0.75,
-                    popup=folium.Popup(
-                        f"""
-                        <b>Zone ({row['zone_lat']:.2f}, {row['zone_lon']:.2f})</b><br>
-                        Type: {row['zone_type']}<br>
-                        Score: {row['zone_score']:.2f}<br>
-                        Businesses: {int(row['business_count'])}<br>
-                        Transport Nodes: {int(row['transport_count'])}<br>
-                        Estimated Population: {int(row['population'])}
-                        """,
-                        max_width=300
-                    )
-                ).add_to(m)
-            
-            # Add legend
-            legend_html = '''
-            <div style="position: fixed; 
-                        bottom: 50px; left: 50px; width: 200px; height: 120px; 
-                        background-color: white; border:2px solid grey; z-index:9999; 
-                        font-size:14px; padding: 10px">
-            <h4>Zone Types</h4>
-            <p><span style="color:red;">●</span> Commercial Zone</p>
-            <p><span style="color:orange;">●</span> Balanced Zone</p>
-            <p><span style="color:blue;">●</span> Opportunity Zone</p>
-            </div>
-            '''
-            m.get_root().html.add_child(folium.Element(legend_html))
-            
-            # Save map
-            map_path = "polycentric_zones_map_fixed.html"
-            m.save(map_path)
-            print(f"✅ Map saved: {map_path}")
-            
-            print("\n✅ DONE")
-            print("📄 zones_classified_fixed.csv created")
-            print("🗺️ polycentric_zones_map_fixed.html created")
-            
-        except Exception as e:
-            print(f"❌ ERROR: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            sys.exit(1)
 
+            jobs = []
+            for resolution in resolutions:
+                # Get classified zones
+                zones = get_zones_classified(resolution)
+
+                if len(zones) == 0:
+                    print("❌ No zones found. Make sure you have loaded business and transit data.")
+                    print("   Run: python load_business_data.py")
+                    print("   Run: python load_transit_data.py")
+                    sys.exit(1)
+
+                # STEP 10: SUMMARY PRINT
+                print(f"\n📊 ZONE SUMMARY ({resolution}°)")
+                print(f"Total zones: {len(zones)}")
+                print(zones["zone_type"].value_counts())
+
+                # STEP 11: SAVE CSV
+                if resolution == DEFAULT_RESOLUTION:
+                    csv_path = "zones_classified_fixed.csv"
+                    zones.to_csv(csv_path, index=False)
+                    print(f"\n✅ CSV saved: {csv_path}")
+
+                # STEP 12: QUEUE MAPS
+                map_zones = zones[MAP_COLUMNS]
+                single = resolutions == [DEFAULT_RESOLUTION] and not args.split_by_type
+                jobs.append((map_zones, map_path(resolution, single=single), args.mode))
+                if args.split_by_type:
+                    for zone_type in ZONE_TYPES:
+                        subset = map_zones[map_zones["zone_type"] == zone_type]
+                        if len(subset):
+                            jobs.append((subset, map_path(resolution, zone_type), args.mode))
+
+            # Workers never touch the database; don't hand them open connections
+            db.engine.dispose()
+
+        # STEP 13: RENDER MAPS (in parallel worker processes)
+        workers = max(1, min(args.workers, len(jobs)))
+        if workers == 1:
+            results = list(map(render_map, jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(render_map, jobs))
+
+        for path, count, size, seconds in results:
+            print(f"✅ Map saved: {path} ({count} zones, {size / 1e6:.2f} MB, {seconds:.2f}s)")
+
+        print("\n✅ DONE")
+
+    except Exception as e:
+        print(f"❌ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
-
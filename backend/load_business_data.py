@@ -2,12 +2,14 @@
 Script to load business data from Overpass API into the database.
 Run this script to populate the businesses table.
 Only calls API if database is empty (unless --force flag is used).
+--force reloads from the cached Overpass response while it is fresh;
+--refresh downloads again (and implies --force).
 """
 import sys
 import argparse
 from app import create_app, db
-from utils.overpass_client import fetch_overpass_data
-from utils.overpass_parser import insert_business_nodes
+from utils.overpass_client import fetch_overpass_data, stream_overpass_elements, fetch_overpass_tiled, response_cache
+from utils.overpass_parser import insert_business_nodes, ingest_business_elements
 from app.models import Business
 
 # Overpass query for Karnataka businesses
@@ -24,7 +26,21 @@ area["name"="Karnataka"]["boundary"="administrative"]["admin_level"="4"]->.searc
 out center;
 """
 
-def load_data(force=False):
+# Same query split into bounding-box tiles ({bbox} is filled per tile)
+QUERY_TILED = """
+[out:json][timeout:90];
+area["name"="Karnataka"]["boundary"="administrative"]["admin_level"="4"]->.searchArea;
+(
+  nwr["office"~"company|it|software|research"](area.searchArea)({bbox});
+  nwr["shop"~"supermarket|mall|convenience"](area.searchArea)({bbox});
+  nwr["amenity"~"restaurant|cafe|fast_food"](area.searchArea)({bbox});
+  nwr["amenity"~"clinic|hospital"](area.searchArea)({bbox});
+  nwr["amenity"~"school|college"](area.searchArea)({bbox});
+);
+out center;
+"""
+
+def load_data(force=False, stream=False, tiled=False, refresh=False):
     """Load business data into the database"""
     print("=" * 50)
     print("Loading Business Data")
@@ -38,6 +54,7 @@ def load_data(force=False):
             # Check if data already exists
             existing_count = Business.query.count()
             
+            force = force or refresh
             if existing_count > 0 and not force:
                 print(f"[SKIP] Data already exists in database!")
                 print(f"   Found {existing_count} businesses in database")
@@ -52,15 +69,28 @@ def load_data(force=False):
             print("[API] Fetching data from Overpass API...")
             print("   This may take a moment (up to 2 minutes)...")
             
-            # Fetch data from Overpass API
-            data = fetch_overpass_data(QUERY)
-            
-            element_count = len(data.get("elements", []))
-            print(f"[OK] Received {element_count} elements from Overpass API")
-            
-            # Insert data into database
-            print("[DB] Inserting data into database...")
-            inserted, skipped, updated = insert_business_nodes(data)
+            if tiled:
+                # Fetch all of Karnataka as concurrent bounding-box tiles
+                data = fetch_overpass_tiled(QUERY_TILED, refresh=refresh)
+
+                print("[DB] Inserting data into database...")
+                inserted, skipped, updated = insert_business_nodes(data)
+            elif stream:
+                # Decode and insert elements chunk by chunk (bounded memory)
+                print("[DB] Streaming elements into database...")
+                inserted, skipped, updated = ingest_business_elements(
+                    stream_overpass_elements(QUERY, refresh=refresh)
+                )
+            else:
+                # Fetch data from Overpass API
+                data = fetch_overpass_data(QUERY, refresh=refresh)
+
+                element_count = len(data.get("elements", []))
+                print(f"[OK] Received {element_count} elements from Overpass API")
+
+                # Insert data into database
+                print("[DB] Inserting data into database...")
+                inserted, skipped, updated = insert_business_nodes(data)
             
             # Count total records
             total_businesses = Business.query.count()
@@ -86,9 +116,21 @@ def load_data(force=False):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Load business data from Overpass API')
     parser.add_argument('--force', action='store_true', 
-                       help='Force reload even if data already exists')
+                       help='Force reload even if data already exists (from the cached Overpass response if fresh)')
+    parser.add_argument('--refresh', action='store_true',
+                       help='Bypass the Overpass response cache and download again (implies --force)')
+    parser.add_argument('--stream', action='store_true',
+                       help='Stream elements into the database in bounded-memory chunks')
+    parser.add_argument('--tiled', action='store_true',
+                       help='Fetch all of Karnataka as concurrent bounding-box tiles')
+    parser.add_argument('--offline', action='store_true',
+                       help='Replay cached Overpass responses only, never hit the network')
     args = parser.parse_args()
     
-    success = load_data(force=args.force)
+    if args.offline:
+        response_cache.mode = "replay"
+    
+    success = load_data(force=args.force, stream=args.stream, tiled=args.tiled,
+                        refresh=args.refresh)
     sys.exit(0 if success else 1)
 
@@ -0,0 +1,41 @@
+"""
+Script to rebuild the zone_aggregates table from scratch.
+Ingestion keeps the table current incrementally; run this to repair it
+(e.g. after rows were deleted or edited outside the loaders).
+"""
+import sys
+from app import create_app, db
+from app.services.data_version import bump_data_version
+from app.services.zone_aggregate_service import rebuild_zone_aggregates
+
+
+def rebuild():
+    """Rebuild zone aggregates"""
+    print("=" * 50)
+    print("Rebuilding Zone Aggregates")
+    print("=" * 50)
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            cells = rebuild_zone_aggregates()
+
+            # Invalidate cached zones in running servers
+            bump_data_version("businesses")
+            bump_data_version("transit_nodes")
+            db.session.commit()
+
+            print(f"[OK] Rebuilt {cells} zone cells")
+            print("=" * 50)
+            return True
+        except Exception as e:
+            print(f"[ERROR] Error rebuilding zone aggregates: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+
+if __name__ == "__main__":
+    success = rebuild()
+    sys.exit(0 if success else 1)
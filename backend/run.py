@@ -1,6 +1,27 @@
+import os
+
 from app import create_app
+from app.services.zone_service import warm_zone_cache
+from app.services.point_index_service import warm_point_index
+from app.services.transit_cluster_service import warm_transit_clusters
+
+DEBUG = True
+
+
+def main():
+    # Everything with side effects stays under the __main__ guard: process
+    # pools started with "spawn" (see centre_service) re-import this module
+    # in every worker, where it must not create the app (schema upgrades)
+    # or start the warm-up threads again
+    app = create_app()
+    # In debug mode the reloader runs main() in a watcher process and again
+    # in the child that serves requests; warm up only in the serving one
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warm_zone_cache(app)
+        warm_point_index(app)
+        warm_transit_clusters(app)
+    app.run(debug=DEBUG)
 
-app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    main()
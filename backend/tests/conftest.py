@@ -0,0 +1,92 @@
+"""
+Shared fixtures. The services are tested without a database: data
+versions come from an in-memory counter instead of the data_versions table,
+and point sets from small in-memory frames instead of the point tables.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import (
+    data_version, http_cache, point_index_service, site_scoring_service,
+    transit_access_service
+)
+from app.services.data_version import VersionedCache
+from app.services.point_store import PointSet
+from app.services.spatial import EARTH_RADIUS_M
+
+
+class DataVersions:
+    """Stand-in for the data_versions table."""
+
+    def __init__(self):
+        self.versions = {}
+
+    def get(self, datasets=data_version.DATASETS) -> tuple:
+        return tuple(self.versions.get(name, 1) for name in datasets)
+
+    def bump(self, dataset: str):
+        self.versions[dataset] = self.versions.get(dataset, 1) + 1
+
+
+@pytest.fixture
+def data_versions(monkeypatch):
+    versions = DataVersions()
+    for module in (data_version, http_cache, point_index_service):
+        monkeypatch.setattr(module, "get_data_version", versions.get)
+    return versions
+
+
+class PointStore:
+    """Stand-in for point_store: a PointSet per dataset from in-memory coordinates."""
+
+    def __init__(self, versions: DataVersions):
+        self.versions = versions
+        self.frames = {
+            name: pd.DataFrame(columns=["id", "osm_id", "name", "category", "latitude", "longitude"])
+            for name in data_version.DATASETS
+        }
+
+    def load(self, dataset: str, lat, lon, categories):
+        """Replace a dataset's points and bump its data version, as an import would."""
+        n = len(lat)
+        self.frames[dataset] = pd.DataFrame({
+            "id": [str(i + 1) for i in range(n)],
+            "osm_id": np.arange(n) + 1000,
+            "name": [f"{dataset} {i + 1}" for i in range(n)],
+            "category": list(categories),
+            "latitude": np.asarray(lat, dtype=np.float64),
+            "longitude": np.asarray(lon, dtype=np.float64),
+        })
+        self.versions.bump(dataset)
+
+    def get_points(self, dataset: str) -> PointSet:
+        return PointSet(self.frames[dataset])
+
+
+@pytest.fixture
+def point_store(monkeypatch, data_versions):
+    """Serve get_points from a PointStore, with every cache over the points empty."""
+    store = PointStore(data_versions)
+    for module in (transit_access_service, point_index_service):
+        monkeypatch.setattr(module, "get_points", store.get_points)
+    monkeypatch.setattr(transit_access_service, "_index_cache",
+                        VersionedCache(datasets=("transit_nodes",)))
+    monkeypatch.setattr(transit_access_service, "_access_cache", VersionedCache())
+    manager = point_index_service.PointIndexManager()
+    for module in (point_index_service, site_scoring_service):
+        monkeypatch.setattr(module, "point_index", manager)
+    return store
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (broadcasts over arrays)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture
+def haversine():
+    return haversine_m
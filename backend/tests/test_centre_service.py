@@ -0,0 +1,77 @@
+"""
+Partitioned weighted DBSCAN against clustering all points at once.
+"""
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+
+from app.services import centre_service
+from app.services.centre_service import cluster_partition, detect_clusters, partition_points
+
+EPS_M = 300
+MIN_WEIGHT = 20
+# Small tiles so clusters straddle many tile borders
+TILE_DEG = 0.02
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(3)
+    centres = rng.uniform((12.85, 77.45), (13.10, 77.75), size=(40, 2))
+    blobs = [rng.normal(c, rng.uniform(0.002, 0.01), size=(rng.integers(50, 400), 2))
+             for c in centres]
+    noise = rng.uniform((12.8, 77.4), (13.15, 77.8), size=(3000, 2))
+    lat, lon = np.vstack(blobs + [noise]).T
+    weight = rng.choice([0.5, 1.0, 1.5, 3.0, 5.0], size=len(lat))
+    order = np.argsort(lon, kind="stable")
+    return lat[order], lon[order], weight[order]
+
+
+def assert_same_clustering(labels, lat, lon, weight):
+    """
+    Equal to one global DBSCAN: the same noise points and the same
+    partition of core points. A border point reachable from two clusters
+    may join either (DBSCAN itself assigns it by visiting order), so it
+    only has to share its label with a core point within eps.
+    """
+    expected, core = cluster_partition(lat, lon, weight, EPS_M, MIN_WEIGHT)
+
+    assert np.array_equal(labels < 0, expected < 0)
+    pairs = set(zip(labels[core].tolist(), expected[core].tolist()))
+    assert len(pairs) == len(set(labels[core].tolist())) == len(set(expected[core].tolist()))
+
+    # Unit vectors: chord distance is monotonic in great-circle distance
+    la, lo = np.radians(lat), np.radians(lon)
+    xyz = np.column_stack((np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)))
+    chord = 2 * np.sin(EPS_M / centre_service.EARTH_RADIUS_M / 2)
+    tree = cKDTree(xyz)
+    for i in np.flatnonzero(~core & (labels >= 0)):
+        neighbours = np.asarray(tree.query_ball_point(xyz[i], chord * (1 + 1e-9)))
+        assert labels[i] in set(labels[neighbours[core[neighbours]]].tolist())
+
+
+def test_partitions_own_every_point_once(points):
+    lat, lon, _ = points
+    partitions = partition_points(lat, lon, EPS_M, TILE_DEG)
+
+    owned = np.concatenate([indices[mask] for indices, mask in partitions])
+    assert len(partitions) > 50
+    assert np.array_equal(np.sort(owned), np.arange(len(lat)))
+
+
+def test_partitioned_result_equals_global_dbscan(points):
+    lat, lon, weight = points
+    labels = detect_clusters(lat, lon, weight, EPS_M, MIN_WEIGHT, tile_deg=TILE_DEG, max_workers=1)
+
+    assert labels.max() >= 10
+    assert_same_clustering(labels, lat, lon, weight)
+
+
+def test_process_pool_gives_the_same_result(points, monkeypatch):
+    lat, lon, weight = points
+    monkeypatch.setattr(centre_service, "PARALLEL_MIN_POINTS", 0)
+
+    serial = detect_clusters(lat, lon, weight, EPS_M, MIN_WEIGHT, tile_deg=TILE_DEG, max_workers=1)
+    pooled = detect_clusters(lat, lon, weight, EPS_M, MIN_WEIGHT, tile_deg=TILE_DEG, max_workers=2)
+
+    assert np.array_equal(serial, pooled)
@@ -0,0 +1,33 @@
+"""
+Tag column naming for business exports.
+"""
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.services.export_service import _business_source, tag_column, tag_columns
+
+
+def test_tag_column_names():
+    assert tag_column("addr:city") == "tag_addr_city"
+    assert tag_column("Opening_Hours") == "tag_opening_hours"
+
+
+def test_repeated_keys_are_exported_once():
+    assert tag_columns(["shop", "brand", "shop"]) == {"shop": "tag_shop", "brand": "tag_brand"}
+
+    _, params, schema = _business_source(["shop", "brand", "shop"])
+
+    assert schema.names[-2:] == ["tag_shop", "tag_brand"]
+    assert params == {"tag_0": "shop", "tag_1": "brand"}
+
+
+@pytest.mark.parametrize("tags", [["addr:city", "addr_city"], ["name:en", "NAME_EN"], ["::"]])
+def test_colliding_or_empty_column_names_are_rejected(tags):
+    with pytest.raises(ValueError):
+        tag_columns(tags)
+
+
+def test_point_exports_are_not_sorted():
+    sql, _, _ = _business_source(["shop"])
+    assert "ORDER BY" not in sql
@@ -0,0 +1,126 @@
+"""
+Conditional GET, per-encoding ETags and streamed bodies.
+"""
+import gzip
+
+import pytest
+from flask import Flask
+
+from app.services import http_cache
+from app.services.http_cache import BodyCache, cached_response, streamed_response
+
+BODY = b'{"rows":[' + b",".join(b'{"id":%d}' % i for i in range(500)) + b"]}"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(http_cache, "get_data_version", lambda datasets: 1)
+    monkeypatch.setattr(http_cache, "_body_cache", BodyCache(max_bytes=1 << 20))
+    calls = {"build": 0, "stream": 0}
+
+    def build():
+        calls["build"] += 1
+        return BODY
+
+    def stream():
+        calls["stream"] += 1
+        return (BODY[i:i + 100] for i in range(0, len(BODY), 100))
+
+    app = Flask(__name__)
+    app.add_url_rule("/cached", "cached", lambda: cached_response(("businesses",), build))
+    app.add_url_rule("/streamed", "streamed", lambda: streamed_response(("businesses",), stream))
+    test_client = app.test_client()
+    test_client.calls = calls
+    return test_client
+
+
+def get(client, path, encoding, etag=None):
+    """GET with the body read (and a streamed response closed) before returning."""
+    headers = {"Accept-Encoding": encoding}
+    if etag:
+        headers["If-None-Match"] = etag
+    response = client.get(path, headers=headers)
+    response.get_data()
+    response.close()
+    return response
+
+
+@pytest.mark.parametrize("path", ["/cached", "/streamed"])
+def test_each_encoding_has_its_own_etag(client, path):
+    plain = get(client, path, "identity")
+    gzipped = get(client, path, "gzip")
+
+    assert plain.data == BODY and "Content-Encoding" not in plain.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gzipped.data) == BODY
+    assert plain.headers["ETag"] != gzipped.headers["ETag"]
+    assert not gzipped.headers["ETag"].startswith("W/")
+    for response in (plain, gzipped):
+        assert "Accept-Encoding" in response.headers["Vary"]
+
+
+@pytest.mark.parametrize("path", ["/cached", "/streamed"])
+def test_not_modified_only_for_the_same_encoding(client, path):
+    etag = get(client, path, "gzip").headers["ETag"]
+
+    same = get(client, path, "gzip", etag)
+    other = get(client, path, "identity", etag)
+
+    assert same.status_code == 304 and same.data == b""
+    assert other.status_code == 200 and other.data == BODY
+
+
+def test_cached_body_is_built_once(client):
+    for encoding in ("gzip", "identity", "gzip"):
+        get(client, "/cached", encoding)
+
+    assert client.calls["build"] == 1
+
+
+def test_only_requested_encodings_are_compressed(client):
+    get(client, "/cached", "gzip")
+
+    key = ("/cached", ())
+    assert http_cache._body_cache.get(key, 1, "gzip") is not None
+    assert http_cache._body_cache.get(key, 1, "br") is None
+    assert http_cache._body_cache.get(key, 1, None) == BODY
+
+
+@pytest.mark.parametrize("query", ["?bbox=77,12,78,13", "?after=abc"])
+def test_viewport_and_cursor_requests_are_not_cached(client, query):
+    response = get(client, "/cached" + query, "gzip")
+
+    assert gzip.decompress(response.data) == BODY
+    assert len(http_cache._body_cache) == 0
+
+
+def test_large_bodies_are_not_cached(client, monkeypatch):
+    monkeypatch.setattr(http_cache, "MAX_CACHED_BODY_BYTES", len(BODY) - 1)
+
+    for _ in range(2):
+        assert gzip.decompress(get(client, "/cached", "gzip").data) == BODY
+
+    assert client.calls["build"] == 2
+    assert len(http_cache._body_cache) == 0
+
+
+def test_body_cache_is_bounded_by_bytes():
+    cache = BodyCache(max_bytes=250)
+    for i in range(5):
+        cache.put(("key", i), 1, None, b"x" * 100)
+
+    assert cache.size <= 250 and len(cache) == 2
+    assert cache.get(("key", 4), 1, None) is not None
+    assert cache.get(("key", 0), 1, None) is None
+
+    cache.put(("key", 4), 2, None, b"y" * 10)
+    assert cache.get(("key", 4), 1, None) is None
+    assert cache.size == 110
+
+
+def test_streamed_body_is_never_cached(client):
+    for encoding in ("gzip", "identity", "gzip"):
+        get(client, "/streamed", encoding)
+
+    assert client.calls["stream"] == 3
+    assert len(http_cache._body_cache) == 0
@@ -0,0 +1,69 @@
+"""
+Round trip of the vector tile encoder through an independent decoder.
+"""
+import pytest
+
+from app.services.mvt import (
+    GEOM_POINT, GEOM_POLYGON, LayerBuilder, encode_tile, point_geometry, polygon_geometry,
+)
+
+mapbox_vector_tile = pytest.importorskip("mapbox_vector_tile")
+
+
+def decode(tile: bytes) -> dict:
+    # Keep raw tile coordinates (y down) so they compare with the input
+    return mapbox_vector_tile.decode(tile, default_options={"y_coord_down": True})
+
+
+def test_point_layer_round_trip():
+    layer = LayerBuilder("businesses")
+    layer.add_feature(GEOM_POINT, point_geometry(10, 4000),
+                      {"name": "Café", "category": "cafe", "count": 3}, feature_id=42)
+    layer.add_feature(GEOM_POINT, point_geometry(2048, 17),
+                      {"name": "Stop", "category": "bus_stop", "count": 3}, feature_id=43)
+
+    decoded = decode(encode_tile([layer]))["businesses"]
+
+    assert decoded["extent"] == 4096 and decoded["version"] == 2
+    features = decoded["features"]
+    assert [f["id"] for f in features] == [42, 43]
+    assert [f["geometry"] for f in features] == [
+        {"type": "Point", "coordinates": [10, 4000]},
+        {"type": "Point", "coordinates": [2048, 17]},
+    ]
+    assert features[0]["properties"] == {"name": "Café", "category": "cafe", "count": 3}
+    assert features[1]["properties"] == {"name": "Stop", "category": "bus_stop", "count": 3}
+
+
+def test_polygon_layer_round_trip():
+    layer = LayerBuilder("zones")
+    ring = [(0, 0), (512, 0), (512, 512), (0, 512)]
+    layer.add_feature(GEOM_POLYGON, polygon_geometry(ring),
+                      {"cell_id": "0.05:259_1551", "score": 0.75, "dense": True, "note": None})
+
+    feature = decode(encode_tile([layer]))["zones"]["features"][0]
+
+    assert feature["geometry"] == {
+        "type": "Polygon",
+        "coordinates": [[[0, 0], [512, 0], [512, 512], [0, 512], [0, 0]]],
+    }
+    # None-valued properties are omitted
+    assert feature["properties"] == {"cell_id": "0.05:259_1551", "score": 0.75, "dense": True}
+
+
+def test_equal_values_of_different_types_stay_apart():
+    layer = LayerBuilder("values")
+    layer.add_feature(GEOM_POINT, point_geometry(1, 1), {"a": 1, "b": 1.0, "c": True})
+
+    properties = decode(encode_tile([layer]))["values"]["features"][0]["properties"]
+
+    assert properties == {"a": 1, "b": 1.0, "c": True}
+    assert [type(properties[k]) for k in "abc"] == [int, float, bool]
+
+
+def test_empty_layers_are_omitted():
+    points = LayerBuilder("points")
+    points.add_feature(GEOM_POINT, point_geometry(0, 0), {})
+
+    assert set(decode(encode_tile([points, LayerBuilder("empty")]))) == {"points"}
+    assert encode_tile([LayerBuilder("empty")]) == b""
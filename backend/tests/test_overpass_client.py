@@ -0,0 +1,235 @@
+"""
+Hedged Overpass requests against local stub mirrors.
+"""
+import json
+import select
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import overpass_client
+from utils.overpass_client import MirrorStats, OverpassCache, fetch_overpass_data
+
+QUERY = "[out:json];node(1);out;"
+
+
+class StubMirror:
+    """
+    Local Overpass stand-in. Waits `delay` seconds before sending headers
+    (like Overpass while a query runs) and records when requests arrive
+    and when a waiting client disconnects.
+    """
+
+    def __init__(self, delay=0.0, status=200, elements=None):
+        self.delay = delay
+        self.status = status
+        self.body = json.dumps({"elements": elements or [{"type": "node", "id": 1}]}).encode()
+        self.requests = []
+        self.disconnects = []
+        mirror = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                mirror.requests.append(time.monotonic())
+                deadline = time.monotonic() + mirror.delay
+                while time.monotonic() < deadline:
+                    readable, _, _ = select.select([self.connection], [], [], 0.05)
+                    if readable and not self.connection.recv(1):
+                        mirror.disconnects.append(time.monotonic())
+                        return
+                self.send_response(mirror.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(mirror.body)))
+                self.end_headers()
+                self.wfile.write(mirror.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/interpreter"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def mirrors(monkeypatch):
+    monkeypatch.setattr(overpass_client, "mirror_stats", MirrorStats())
+    monkeypatch.setattr(overpass_client, "response_cache", OverpassCache(mode="off"))
+    monkeypatch.setattr(overpass_client, "HEDGE_DEFAULT_DELAY", 0.3)
+    started = []
+
+    def start(**kwargs):
+        mirror = StubMirror(**kwargs)
+        started.append(mirror)
+        return mirror
+
+    yield start
+    for mirror in started:
+        mirror.close()
+
+
+def test_backup_is_sent_after_hedge_delay(mirrors):
+    slow, fast = mirrors(delay=5), mirrors(elements=[{"type": "node", "id": 2}])
+
+    started = time.monotonic()
+    data = fetch_overpass_data(QUERY, timeout=10, urls=[slow.url, fast.url])
+
+    assert data["elements"] == [{"type": "node", "id": 2}]
+    assert time.monotonic() - started < 2
+    assert fast.requests[0] - slow.requests[0] >= 0.25
+
+
+def test_no_backup_before_hedge_delay(mirrors):
+    primary, backup = mirrors(delay=0.05), mirrors()
+
+    fetch_overpass_data(QUERY, timeout=10, urls=[primary.url, backup.url])
+
+    assert backup.requests == []
+
+
+def test_failed_mirror_fails_over_immediately(mirrors, monkeypatch):
+    monkeypatch.setattr(overpass_client, "HEDGE_DEFAULT_DELAY", 30)
+    failing, healthy = mirrors(status=500), mirrors()
+
+    started = time.monotonic()
+    data = fetch_overpass_data(QUERY, timeout=10, urls=[failing.url, healthy.url])
+
+    assert data["elements"] == [{"type": "node", "id": 1}]
+    assert time.monotonic() - started < 2
+    assert overpass_client.mirror_stats.errors[failing.url] == 1.0
+
+
+def test_losing_attempt_is_disconnected(mirrors):
+    slow, fast = mirrors(delay=10), mirrors()
+
+    fetch_overpass_data(QUERY, timeout=30, urls=[slow.url, fast.url])
+    finished = time.monotonic()
+
+    # The loser is still waiting for headers; it must be cut off, not orphaned
+    deadline = finished + 2
+    while not slow.disconnects and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert slow.disconnects and slow.disconnects[0] - finished < 1
+
+
+def test_without_hedging_only_failures_move_on(mirrors):
+    slow, backup = mirrors(delay=1), mirrors()
+
+    data = fetch_overpass_data(QUERY, timeout=10, urls=[slow.url, backup.url], hedge=False)
+
+    assert data["elements"] == [{"type": "node", "id": 1}]
+    assert backup.requests == []
+
+
+def test_all_mirrors_failing_raises(mirrors):
+    first, second = mirrors(status=500), mirrors(status=503)
+
+    with pytest.raises(Exception):
+        fetch_overpass_data(QUERY, timeout=10, urls=[first.url, second.url])
+
+
+def test_refresh_bypasses_cached_response(mirrors, monkeypatch, tmp_path):
+    monkeypatch.setattr(overpass_client, "response_cache", OverpassCache(directory=str(tmp_path), mode="on"))
+    mirror = mirrors()
+
+    fetch_overpass_data(QUERY, timeout=10, urls=[mirror.url])
+    fetch_overpass_data(QUERY, timeout=10, urls=[mirror.url])
+    assert len(mirror.requests) == 1
+
+    fetch_overpass_data(QUERY, timeout=10, urls=[mirror.url], refresh=True)
+    assert len(mirror.requests) == 2
+
+
+
+def test_tiled_fetch_stops_queued_tiles_after_a_failure(mirrors, monkeypatch):
+    failing = mirrors(status=500)
+    monkeypatch.setattr(overpass_client, "OVERPASS_URLS", [failing.url])
+
+    with pytest.raises(Exception, match="max depth"):
+        overpass_client.fetch_overpass_tiled(
+            "[out:json];node({bbox});out;", bbox=(0.0, 0.0, 4.0, 4.0),
+            tile_size=1.0, max_workers=1, max_depth=0, timeout=10
+        )
+
+    # 16 tiles were queued; the ones behind the failed tile are not fetched
+    time.sleep(0.3)
+    assert len(failing.requests) <= 2
+
+# -------------------------------------------------
+# Streaming parser
+# -------------------------------------------------
+ELEMENTS = [
+    {"type": "node", "id": 1, "lat": 12.97, "lon": 77.59, "tags": {"name": "Café ☕", "note": "a, [b] {c}"}},
+    {"type": "way", "id": 2, "center": {"lat": 12.9, "lon": 77.5}, "tags": {"name": "\"quoted\" ]"}},
+    {"type": "node", "id": 3, "lat": -1.5, "lon": 0.0},
+]
+
+
+def body(elements, remark=None):
+    document = {"version": 0.6, "generator": "stub", "osm3s": {"copyright": "test"},
+                "elements": elements}
+    if remark:
+        document["remark"] = remark
+    return json.dumps(document, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+def parse(raw: bytes, chunk_size: int):
+    """Run the streaming parser over raw split into chunk_size byte chunks."""
+    pieces = (raw[i:i + chunk_size] for i in range(0, len(raw), chunk_size))
+    chunks = overpass_client._decode_chunks(pieces)
+    buffer, pos = overpass_client._find_elements_start(chunks)
+    items = overpass_client._iter_array_items(buffer, pos, chunks)
+    elements = []
+    while True:
+        try:
+            elements.append(next(items))
+        except StopIteration as stop:
+            return elements, stop.value
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+def test_streaming_parser_matches_json_loads(chunk_size):
+    elements, remark = parse(body(ELEMENTS), chunk_size)
+
+    assert elements == ELEMENTS
+    assert remark is None
+
+
+def test_streaming_parser_returns_trailing_remark():
+    remark = "runtime error: Query timed out in \"query\" at line 3 after 91 seconds."
+
+    elements, parsed_remark = parse(body(ELEMENTS[:1], remark=remark), 5)
+
+    assert elements == ELEMENTS[:1]
+    assert parsed_remark == remark
+
+
+def test_streaming_parser_handles_empty_array():
+    assert parse(body([]), 3) == ([], None)
+
+
+def test_streaming_parser_rejects_truncated_body():
+    raw = body(ELEMENTS)
+    with pytest.raises(ValueError):
+        parse(raw[:raw.rindex(b'"id": 3')], 16)
+
+
+def test_streaming_parser_rejects_body_without_elements():
+    with pytest.raises(ValueError):
+        parse(b'{"remark": "runtime error: out of memory"}', 8)
+
+
+def test_stream_overpass_elements_from_mirror(mirrors, monkeypatch):
+    mirror = mirrors(elements=ELEMENTS)
+    monkeypatch.setattr(overpass_client, "OVERPASS_URLS", [mirror.url])
+    monkeypatch.setattr(overpass_client, "STREAM_CHUNK_SIZE", 16)
+
+    assert list(overpass_client.stream_overpass_elements(QUERY, timeout=10)) == ELEMENTS
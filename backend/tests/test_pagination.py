@@ -0,0 +1,51 @@
+"""
+Cursor encoding and page-size parsing.
+"""
+import uuid
+
+import pytest
+
+from app.services.pagination import (
+    MAX_PAGE_SIZE, decode_cursor, decode_uuid_cursor, encode_cursor, parse_limit,
+    parse_page_size,
+)
+
+
+def test_cursor_round_trip():
+    for value in (42, "abc", [1, "x"]):
+        assert decode_cursor(encode_cursor(value)) == value
+
+
+def test_uuid_cursor_round_trip():
+    value = uuid.uuid4()
+    assert decode_uuid_cursor(encode_cursor(str(value))) == value
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor("not-a-uuid"), encode_cursor(7)])
+def test_malformed_uuid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_uuid_cursor(cursor)
+
+
+def test_page_size_is_capped():
+    assert parse_page_size(None) == 100
+    assert parse_page_size("1") == 1
+    assert parse_page_size(str(MAX_PAGE_SIZE + 1)) == MAX_PAGE_SIZE
+
+
+@pytest.mark.parametrize("value", ["0", "-5", "ten", "1.5"])
+def test_invalid_page_size_is_rejected(value):
+    with pytest.raises(ValueError):
+        parse_page_size(value)
+
+
+def test_limit_is_optional_and_positive():
+    assert parse_limit(None) is None
+    assert parse_limit("") is None
+    assert parse_limit("25") == 25
+
+
+@pytest.mark.parametrize("value", ["0", "-5", "ten", "1.5"])
+def test_invalid_limit_is_rejected(value):
+    with pytest.raises(ValueError):
+        parse_limit(value)
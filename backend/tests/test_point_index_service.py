@@ -0,0 +1,159 @@
+"""
+Radius and nearest-neighbour lookups on the point index, and its
+background rebuild when the data version moves.
+"""
+import threading
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from app.services import point_index_service
+from app.services.point_index_service import PointIndex, find_nearby, find_nearest
+
+SITE = (-33.92, 18.42)
+CATEGORIES = np.array(["cafe", "restaurant", "pharmacy"])
+
+
+def scatter(n, seed, spread=0.05):
+    rng = np.random.default_rng(seed)
+    return SITE[0] + rng.uniform(-spread, spread, n), SITE[1] + rng.uniform(-spread, spread, n)
+
+
+@pytest.fixture
+def businesses(point_store):
+    lat, lon = scatter(2000, seed=4)
+    point_store.load("businesses", lat, lon, CATEGORIES[np.arange(2000) % 3])
+    return point_store.get_points("businesses")
+
+
+@pytest.fixture
+def transit(point_store):
+    lat, lon = scatter(300, seed=5)
+    point_store.load("transit_nodes", lat, lon, ["bus_stop"] * 300)
+    return point_store.get_points("transit_nodes")
+
+
+def brute_force(points, lat, lon, haversine, category=None):
+    """Indices and distances of all points, nearest first."""
+    distances = haversine(lat, lon, points.lat, points.lon)
+    indices = np.arange(len(points))
+    if category is not None:
+        keep = points.category_codes == points.category_code(category)
+        indices, distances = indices[keep], distances[keep]
+    order = np.argsort(distances, kind="stable")
+    return indices[order], distances[order]
+
+
+@pytest.mark.parametrize("category", [None, "pharmacy", "bakery"])
+@pytest.mark.parametrize("radius", [50, 800, 3000])
+def test_within_matches_haversine(businesses, haversine, category, radius):
+    index = PointIndex("businesses", businesses)
+
+    found, distances = index.within(*SITE, radius, category)
+
+    expected, expected_distances = brute_force(businesses, *SITE, haversine, category)
+    inside = expected_distances <= radius
+    assert found.tolist() == expected[inside].tolist()
+    assert np.allclose(distances, expected_distances[inside], rtol=1e-9, atol=1e-4)
+    assert np.all(np.diff(distances) >= 0)
+
+
+def test_count_within_matches_haversine(businesses, haversine):
+    index = PointIndex("businesses", businesses)
+    lat, lon = scatter(40, seed=6, spread=0.06)
+
+    counts = index.count_within(lat, lon, 600, category="cafe")
+
+    cafe = businesses.category_codes == businesses.category_code("cafe")
+    expected = (haversine(lat[:, None], lon[:, None], businesses.lat[None, cafe],
+                          businesses.lon[None, cafe]) <= 600).sum(axis=1)
+    assert counts.tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("category", [None, "restaurant"])
+def test_nearest_matches_haversine(businesses, haversine, category):
+    index = PointIndex("businesses", businesses)
+
+    found, distances = index.nearest(*SITE, 25, category)
+
+    expected, expected_distances = brute_force(businesses, *SITE, haversine, category)
+    assert found.tolist() == expected[:25].tolist()
+    assert np.allclose(distances, expected_distances[:25], rtol=1e-9, atol=1e-4)
+
+
+def test_nearest_returns_whole_dataset_when_smaller_than_k(point_store):
+    point_store.load("transit_nodes", [SITE[0], SITE[0] + 0.01], [SITE[1]] * 2, ["bus_stop"] * 2)
+    index = PointIndex("transit_nodes", point_store.get_points("transit_nodes"))
+
+    found, distances = index.nearest(*SITE, 10)
+
+    assert len(found) == 2
+    assert distances[0] == pytest.approx(0.0, abs=1e-6)
+    assert [r["id"] for r in index.records(found, distances)] == [1, 2]
+
+
+def test_find_nearby_merges_datasets_nearest_first(businesses, transit, haversine):
+    result = find_nearby(*SITE, radius_m=1500, limit=30)
+
+    by_dataset = {"businesses": businesses, "transit_nodes": transit}
+    all_distances = np.sort(np.concatenate([
+        haversine(*SITE, points.lat, points.lon) for points in by_dataset.values()
+    ]))
+    assert result["count"] == int((all_distances <= 1500).sum())
+    assert result["truncated"] == (result["count"] > 30)
+    assert [r["distance_m"] for r in result["results"]] == \
+        pytest.approx(all_distances[:30], abs=0.01)
+    for record in result["results"]:
+        assert record["distance_m"] == pytest.approx(
+            haversine(*SITE, record["latitude"], record["longitude"]), abs=0.01)
+
+
+def test_find_nearest_ranks_across_datasets(businesses, transit, haversine):
+    results = find_nearest(*SITE, k=12, category=None, dataset="businesses,transit_nodes")
+
+    distances = [r["distance_m"] for r in results]
+    assert distances == sorted(distances)
+    closest = np.sort(np.concatenate([haversine(*SITE, businesses.lat, businesses.lon),
+                                      haversine(*SITE, transit.lat, transit.lon)]))[:12]
+    assert distances == pytest.approx(closest, abs=0.01)
+
+
+def test_invalid_arguments_are_rejected(businesses, transit):
+    for call in (lambda: find_nearby(91, 0), lambda: find_nearby(*SITE, radius_m=0),
+                 lambda: find_nearby(*SITE, limit=0), lambda: find_nearby(*SITE, dataset="roads"),
+                 lambda: find_nearest(*SITE, k=0)):
+        with pytest.raises(ValueError):
+            call()
+
+
+def test_data_version_change_rebuilds_in_background(point_store, businesses, transit, monkeypatch):
+    manager = point_index_service.point_index
+    first = manager.get()
+    assert len(first["businesses"]) == 2000
+
+    # Hold the rebuild until the stale index has been served
+    release = threading.Event()
+    build_indexes = point_index_service.build_indexes
+
+    def held_build(datasets):
+        assert release.wait(10)
+        return build_indexes(datasets)
+
+    monkeypatch.setattr(point_index_service, "build_indexes", held_build)
+    monkeypatch.setattr(point_index_service, "VERSION_CHECK_SECONDS", 0.0)
+    point_store.load("businesses", *scatter(10, seed=7), ["cafe"] * 10)
+
+    with Flask(__name__).app_context():
+        assert manager.get() is first
+        assert manager.refresh() is None  # one rebuild at a time
+    [rebuild] = [t for t in threading.enumerate() if t.name == "point-index-rebuild"]
+    release.set()
+    rebuild.join(10)
+
+    current = manager.get()
+    assert current is not first
+    assert len(current["businesses"]) == 10
+    assert len(current["transit_nodes"]) == 300
+    with Flask(__name__).app_context():
+        assert manager.refresh() is None  # up to date
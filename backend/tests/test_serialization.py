@@ -0,0 +1,36 @@
+"""
+JSON encoding with and without orjson.
+"""
+import json
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services import serialization
+from app.services.serialization import dumps
+
+VALUE = {
+    "ids": np.arange(3, dtype=np.int64),
+    "labels": np.array([0, 1, 1], dtype=np.int32),
+    "score": np.float32(0.5),
+    "count": np.int64(7),
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+}
+EXPECTED = {
+    "ids": [0, 1, 2],
+    "labels": [0, 1, 1],
+    "score": 0.5,
+    "count": 7,
+    "id": "12345678-1234-5678-1234-567812345678",
+}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_numpy_values_encode_as_json_values(monkeypatch, use_orjson):
+    if use_orjson and serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+
+    assert json.loads(dumps(VALUE)) == EXPECTED
@@ -0,0 +1,124 @@
+"""
+Batch scoring of candidate sites on stubbed zones and points.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import site_scoring_service
+from app.services.site_scoring_service import (
+    get_site_scores_json, parse_sites, score_sites, site_cell_ids
+)
+
+# Sites deliberately not in longitude order: results must keep input order
+SITES = [
+    {"lat": -33.93, "lon": 18.47},
+    [-33.97, 18.41],
+    {"lat": -33.91, "lon": 18.43},
+    [-33.98, 18.52],   # outside every stubbed zone
+    {"lat": -33.94, "lon": 18.40},
+]
+
+
+@pytest.fixture
+def scored_zones(monkeypatch):
+    zones = pd.DataFrame({
+        "cell_id": ["0.05:-679_369", "0.05:-680_368", "0.05:-679_368"],
+        "zone_type": ["Commercial Zone", "Opportunity Zone", "Balanced Zone"],
+        "adjusted_zone_score": [0.9, 0.2, 0.5],
+        "base_zone_score": [0.8, 0.3, 0.5],
+        "biz_score": [0.9, 0.1, 0.4],
+        "trans_score": [0.7, 0.2, 0.6],
+        "pop_score": [0.8, 0.4, 0.5],
+        "business_count": [120, 3, 40],
+        "transport_count": [9, 1, 4],
+        "zone_lat": [-33.95, -34.0, -33.95],
+    })
+    monkeypatch.setattr(site_scoring_service, "get_zones_classified", lambda resolution: zones)
+    return zones.set_index("cell_id")
+
+
+@pytest.fixture
+def points(point_store):
+    rng = np.random.default_rng(8)
+    lat, lon = -33.95 + rng.uniform(-0.05, 0.05, 1500), 18.45 + rng.uniform(-0.08, 0.08, 1500)
+    point_store.load("businesses", lat, lon, np.where(np.arange(1500) % 4 == 0, "cafe", "shop"))
+    stop_lat, stop_lon = -33.95 + rng.uniform(-0.05, 0.05, 80), 18.45 + rng.uniform(-0.08, 0.08, 80)
+    point_store.load("transit_nodes", stop_lat, stop_lon,
+                     np.where(np.arange(80) % 5 == 0, "railway_station", "bus_stop"))
+    return point_store.frames
+
+
+def test_sites_keep_input_order_with_their_zones(scored_zones, points):
+    lat, lon = parse_sites(SITES)
+
+    sites = score_sites(lat, lon, "cafe")
+
+    assert sites["latitude"].tolist() == lat.tolist()
+    assert sites["longitude"].tolist() == lon.tolist()
+    assert sites["cell_id"].tolist() == site_cell_ids(lat, lon).tolist()
+    assert sites["cell_id"].tolist() == [
+        "0.05:-679_369", "0.05:-680_368", "0.05:-679_368", "0.05:-680_370", "0.05:-679_368"
+    ]
+    for row in sites.itertuples():
+        if row.cell_id in scored_zones.index:
+            zone = scored_zones.loc[row.cell_id]
+            assert (row.zone_type, row.adjusted_zone_score, row.business_count) == \
+                (zone["zone_type"], zone["adjusted_zone_score"], zone["business_count"])
+        else:
+            assert pd.isna(row.zone_type)
+            assert row.business_count is None
+
+
+def test_distances_and_competitors_match_haversine(scored_zones, points, haversine):
+    lat, lon = parse_sites(SITES)
+
+    sites = score_sites(lat, lon, "cafe", radius_m=1200)
+
+    stops, businesses = points["transit_nodes"], points["businesses"]
+    for transit_type in ("bus_stop", "railway_station"):
+        typed = stops[stops["category"] == transit_type]
+        expected = haversine(lat[:, None], lon[:, None], typed["latitude"].to_numpy()[None],
+                             typed["longitude"].to_numpy()[None]).min(axis=1)
+        assert np.allclose(sites[f"nearest_{transit_type}_m"], expected, rtol=1e-9, atol=1e-4)
+    assert sites["nearest_subway_entrance_m"].isna().all()
+    assert np.allclose(sites["nearest_transit_m"],
+                       sites[["nearest_bus_stop_m", "nearest_railway_station_m"]].min(axis=1))
+
+    cafes = businesses[businesses["category"] == "cafe"]
+    expected = (haversine(lat[:, None], lon[:, None], cafes["latitude"].to_numpy()[None],
+                          cafes["longitude"].to_numpy()[None]) <= 1200).sum(axis=1)
+    assert sites["competitors_within_radius"].tolist() == expected.tolist()
+
+
+def test_site_ranking_by_zone_score(scored_zones, points):
+    lat, lon = parse_sites(SITES)
+
+    sites = score_sites(lat, lon, "shop")
+    ranked = sites.sort_values("adjusted_zone_score", ascending=False, na_position="last")
+
+    # Commercial, Balanced twice (input order kept on ties), Opportunity, no zone
+    assert ranked.index.tolist() == [0, 2, 4, 1, 3]
+
+
+def test_json_layouts_carry_the_same_sites(scored_zones, points):
+    records, count = get_site_scores_json(SITES, "cafe", layout="records")
+    columns, _ = get_site_scores_json(SITES, "cafe", layout="columns")
+
+    records, columns = json.loads(records), json.loads(columns)
+    assert count == len(SITES) == len(records)
+    assert [r["cell_id"] for r in records] == columns["cell_id"]
+    assert records[3]["zone_type"] is None and records[3]["business_count"] is None
+    assert records[0]["business_count"] == 120
+
+
+def test_invalid_requests_are_rejected(scored_zones, points):
+    lat, lon = parse_sites(SITES)
+    for call in (lambda: parse_sites([]), lambda: parse_sites([{"lat": 1}]),
+                 lambda: parse_sites([[91, 0]]), lambda: score_sites(lat, lon, "bakery"),
+                 lambda: score_sites(lat, lon, "cafe", radius_m=0),
+                 lambda: get_site_scores_json(SITES, "cafe", layout="csv")):
+        with pytest.raises(ValueError):
+            call()
@@ -0,0 +1,87 @@
+"""
+Nearest-transit distances on the unit sphere against haversine.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.transit_access_service import (
+    ACCESS_RADIUS_M, TRANSIT_TYPES, add_zone_accessibility, chord_to_meters,
+    get_business_access, meters_to_chord, nearest_transit_distances, unit_vectors
+)
+
+
+def scatter(n, seed, centre=(-33.9, 18.6), spread=0.1):
+    rng = np.random.default_rng(seed)
+    return centre[0] + rng.uniform(-spread, spread, n), centre[1] + rng.uniform(-spread, spread, n)
+
+
+def test_chord_distance_is_haversine(haversine):
+    rng = np.random.default_rng(0)
+    lat1, lon1 = rng.uniform(-90, 90, 500), rng.uniform(-180, 180, 500)
+    # Neighbours a few meters to a few kilometers away, and arbitrary pairs
+    lat2 = np.concatenate([np.clip(lat1[:250] + rng.normal(0, 0.01, 250), -90, 90),
+                           rng.uniform(-90, 90, 250)])
+    lon2 = np.concatenate([lon1[:250] + rng.normal(0, 0.01, 250), rng.uniform(-180, 180, 250)])
+
+    a, b = unit_vectors(lat1, lon1), unit_vectors(lat2, lon2)
+    meters = chord_to_meters(np.linalg.norm(a - b, axis=1))
+
+    assert np.allclose(np.linalg.norm(a, axis=1), 1.0)
+    assert np.allclose(meters, haversine(lat1, lon1, lat2, lon2), rtol=1e-9, atol=1e-4)
+    for radius in (1.0, 500.0, 10_000.0, 5_000_000.0):
+        assert chord_to_meters(meters_to_chord(radius)) == pytest.approx(radius, rel=1e-9)
+
+
+def test_nearest_distances_match_brute_force(point_store, haversine):
+    stop_lat, stop_lon = scatter(300, seed=1)
+    # No railway stations: that type has no nodes at all
+    point_store.load("transit_nodes", stop_lat, stop_lon,
+                     np.where(np.arange(300) % 3 == 0, "subway_entrance", "bus_stop"))
+    site_lat, site_lon = scatter(200, seed=2, spread=0.15)
+
+    distances = nearest_transit_distances(site_lat, site_lon)
+
+    assert set(distances) == set(TRANSIT_TYPES)
+    assert np.isinf(distances["railway_station"]).all()
+    frame = point_store.frames["transit_nodes"]
+    for transit_type in ("bus_stop", "subway_entrance"):
+        stops = frame[frame["category"] == transit_type]
+        brute = haversine(site_lat[:, None], site_lon[:, None],
+                          stops["latitude"].to_numpy()[None, :],
+                          stops["longitude"].to_numpy()[None, :]).min(axis=1)
+        assert np.allclose(distances[transit_type], brute, rtol=1e-9, atol=1e-4)
+
+
+def test_business_access_follows_transit_version(point_store, haversine):
+    biz_lat, biz_lon = scatter(50, seed=3)
+    point_store.load("businesses", biz_lat, biz_lon, ["cafe"] * 50)
+    point_store.load("transit_nodes", [-33.9], [18.6], ["bus_stop"])
+
+    before = get_business_access()
+    assert before is get_business_access()  # cached while nothing changes
+
+    point_store.load("transit_nodes", [-33.85], [18.65], ["railway_station"])
+    after = get_business_access()
+
+    assert after["nearest_bus_stop_m"].isna().all()
+    assert np.allclose(after["nearest_transit_m"],
+                       haversine(after["latitude"], after["longitude"], -33.85, 18.65))
+    assert not np.allclose(before["nearest_transit_m"], after["nearest_transit_m"])
+
+
+def test_zone_access_score_is_share_within_radius(point_store, haversine):
+    # Cell 0.05:-680_370 holds the first four businesses, 0.05:-680_371 the rest
+    biz_lat = np.array([-33.988, -33.982, -33.96, -33.96, -33.99, -33.97, -33.972])
+    biz_lon = np.array([18.512, 18.518, 18.54, 18.549, 18.56, 18.58, 18.578])
+    stop_lat, stop_lon = np.array([-33.985, -33.97]), np.array([18.515, 18.575])
+    point_store.load("businesses", biz_lat, biz_lon, ["shop"] * 7)
+    point_store.load("transit_nodes", stop_lat, stop_lon, ["bus_stop"] * 2)
+    zones = pd.DataFrame({"cell_id": ["0.05:-680_370", "0.05:-680_371", "0.05:-679_371"]})
+
+    zones = add_zone_accessibility(zones, resolution=0.05)
+
+    near = haversine(biz_lat[:, None], biz_lon[:, None],
+                     stop_lat[None, :], stop_lon[None, :]).min(axis=1) <= ACCESS_RADIUS_M
+    assert near.tolist() == [True, True, False, False, False, True, True]
+    assert zones["access_score"].tolist() == pytest.approx([0.5, 2 / 3, 0.0])
@@ -0,0 +1,31 @@
+"""
+Choice of k for transit node clustering.
+"""
+import numpy as np
+
+from app.services.transit_cluster_service import select_k
+
+
+def blobs(centres, per_blob=400, spread=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.vstack([rng.normal(c, spread, size=(per_blob, 2)) for c in centres])
+
+
+def test_select_k_finds_separated_clusters():
+    xy = blobs([(0, 0), (20, 0), (0, 20), (20, 20)])
+
+    model, scores = select_k(xy, candidates=range(2, 8))
+
+    assert model.n_clusters == 4
+    assert sorted(scores) == list(range(2, 8))
+    assert max(scores, key=scores.get) == 4
+
+
+def test_select_k_is_deterministic_and_independent_of_workers():
+    xy = blobs([(0, 0), (10, 5), (3, 12)], seed=1)
+
+    sequential = select_k(xy, candidates=range(2, 6), max_workers=1)
+    concurrent = select_k(xy, candidates=range(2, 6), max_workers=3)
+
+    assert sequential[1] == concurrent[1]
+    assert np.array_equal(sequential[0].labels_, concurrent[0].labels_)
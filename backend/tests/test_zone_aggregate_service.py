@@ -0,0 +1,77 @@
+"""
+Incremental zone pyramid maintenance against a full rebuild.
+"""
+import random
+from collections import Counter
+
+from app.services.zone_aggregate_service import RESOLUTIONS, base_cell_of, cell_deltas
+
+KEY_COLUMNS = ["osm_type", "osm_id"]
+
+
+def rebuild(points: dict) -> Counter:
+    """
+    Pyramid as build_zone_pyramid computes it: base cells counted from the
+    points, each coarser level rolled up from the next finer one.
+    """
+    scales = sorted(RESOLUTIONS.values())
+    levels = {scales[0]: Counter(base_cell_of(lat, lon) for lat, lon in points.values())}
+    for finer, scale in zip(scales, scales[1:]):
+        ratio = scale // finer
+        level = Counter()
+        for (lat, lon), count in levels[finer].items():
+            level[(lat // ratio, lon // ratio)] += count
+        levels[scale] = level
+    return Counter({
+        (scale, lat, lon): count
+        for scale, level in levels.items() for (lat, lon), count in level.items()
+    })
+
+
+def apply(counts: Counter, deltas: dict) -> Counter:
+    """apply_zone_deltas on an in-memory table: add, then drop decreased cells left empty."""
+    updated = Counter(counts)
+    for cell, delta in deltas.items():
+        updated[cell] += delta
+        if delta < 0 and updated[cell] == 0:
+            del updated[cell]
+    return updated
+
+
+def random_point(rng):
+    return rng.uniform(11.5, 13.5), rng.uniform(76.5, 78.5)
+
+
+def test_incremental_deltas_match_rebuild():
+    rng = random.Random(7)
+    points = {("node", i): random_point(rng) for i in range(2000)}
+    counts = rebuild(points)
+
+    for _ in range(5):
+        # An upsert batch of moved, unchanged and new rows
+        keys = rng.sample(sorted(points), 300)
+        rows = []
+        for i, key in enumerate(keys):
+            lat, lon = points[key] if i % 3 == 0 else random_point(rng)
+            rows.append({"osm_type": key[0], "osm_id": key[1], "latitude": lat, "longitude": lon})
+        for _ in range(100):
+            osm_id = len(points) + len(rows)
+            lat, lon = random_point(rng)
+            rows.append({"osm_type": "way", "osm_id": osm_id, "latitude": lat, "longitude": lon})
+
+        existing = {
+            (row["osm_type"], row["osm_id"]): base_cell_of(*points[(row["osm_type"], row["osm_id"])])
+            for row in rows if (row["osm_type"], row["osm_id"]) in points
+        }
+        counts = apply(counts, cell_deltas(existing, rows, KEY_COLUMNS))
+        for row in rows:
+            points[(row["osm_type"], row["osm_id"])] = (row["latitude"], row["longitude"])
+
+        assert counts == rebuild(points)
+
+
+def test_row_staying_in_its_cell_has_no_delta():
+    row = {"osm_type": "node", "osm_id": 1, "latitude": 12.9716, "longitude": 77.5946}
+    existing = {("node", 1): base_cell_of(12.97161, 77.59461)}
+
+    assert cell_deltas(existing, [row], KEY_COLUMNS) == {}
@@ -0,0 +1,98 @@
+"""
+What-if scoring against the scoring used for /zones/all.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import zone_scoring_service
+from app.services.data_version import VersionedCache
+from app.services.zone_scoring_service import score_configurations
+from app.services.zone_service import DEFAULT_SCORING, score_zones
+
+RESOLUTION = 0.05
+
+
+@pytest.fixture
+def zones():
+    rng = np.random.default_rng(11)
+    n = 600
+    cells = rng.choice(400 * 400, size=n, replace=False)
+    cell_lat, cell_lon = 240 + cells // 400, 1520 + cells % 400
+    frame = pd.DataFrame({
+        "cell_id": [f"{RESOLUTION}:{a}_{b}" for a, b in zip(cell_lat, cell_lon)],
+        "zone_lat": cell_lat * RESOLUTION,
+        "zone_lon": cell_lon * RESOLUTION,
+        # Heavy-tailed counts, like real cells
+        "business_count": rng.zipf(1.6, n).clip(max=5000),
+        "transport_count": rng.zipf(2.0, n).clip(max=300),
+        "access_score": rng.uniform(0, 1, n),
+    })
+    return frame.sort_values(["zone_lat", "zone_lon"], ignore_index=True)
+
+
+@pytest.fixture
+def scoring(monkeypatch, data_versions, zones):
+    """Serve score_zones(zones) as the classified zones of RESOLUTION."""
+    monkeypatch.setattr(zone_scoring_service, "_components_cache", VersionedCache())
+    monkeypatch.setattr(zone_scoring_service, "get_zones_classified",
+                        lambda resolution: score_zones(zones))
+
+
+def expected_summary(zones, top):
+    """Cutoffs, class counts and top zones as score_zones computes them."""
+    scored = score_zones(zones)
+    adjusted = scored["adjusted_zone_score"].to_numpy()
+    high, mid = np.nanquantile(adjusted, [DEFAULT_SCORING["high_quantile"],
+                                          DEFAULT_SCORING["mid_quantile"]])
+    by_type = scored["zone_type"].value_counts().to_dict()
+    best = scored.sort_values("adjusted_zone_score", ascending=False, kind="stable").head(top)
+    return scored, (high, mid), by_type, best
+
+
+def assert_matches(result, zones, top):
+    scored, (high, mid), by_type, best = expected_summary(zones, top)
+
+    assert result["cutoffs"]["high"] == pytest.approx(high, abs=1e-12)
+    assert result["cutoffs"]["mid"] == pytest.approx(mid, abs=1e-12)
+    assert result["by_type"] == {t: by_type.get(t, 0) for t in zone_scoring_service.ZONE_TYPES}
+    assert result["mean_score"] == pytest.approx(scored["adjusted_zone_score"].mean())
+
+    # Ties may be ordered differently; scores and each zone's own score must agree
+    top_scores = [z["adjusted_zone_score"] for z in result["top_zones"]]
+    assert top_scores == pytest.approx(best["adjusted_zone_score"].tolist(), abs=1e-12)
+    score_of = scored.set_index("cell_id")["adjusted_zone_score"]
+    for zone in result["top_zones"]:
+        assert zone["adjusted_zone_score"] == pytest.approx(score_of[zone["cell_id"]], abs=1e-12)
+
+
+@pytest.mark.parametrize("access_weight", [0.0, 0.15])
+def test_default_config_reproduces_zone_scoring(scoring, zones, monkeypatch, access_weight):
+    monkeypatch.setitem(DEFAULT_SCORING, "access_weight", access_weight)
+
+    [result] = score_configurations([{}], RESOLUTION, top=15)
+
+    assert result["config"] == DEFAULT_SCORING
+    assert_matches(result, zones, 15)
+
+
+def test_each_config_matches_zone_scoring_with_those_weights(scoring, zones, monkeypatch):
+    configs = [
+        {"high_quantile": 0.5, "mid_quantile": 0.2},
+        {"biz_weight": 0.8, "pop_weight": 0.1, "saturation_penalty": 0.0},
+        {"opportunity_boost": 0.6, "high_quantile": 0.99, "mid_quantile": 0.99},
+    ]
+    results = score_configurations(configs, RESOLUTION, top=5)
+
+    for config, result in zip(configs, results):
+        with monkeypatch.context() as patch:
+            for key, value in config.items():
+                patch.setitem(DEFAULT_SCORING, key, value)
+            assert_matches(result, zones, 5)
+
+
+def test_invalid_configs_are_rejected(scoring):
+    for configs in ([], [{"unknown": 1}], [{"biz_weight": "high"}],
+                    [{"high_quantile": 0.5, "mid_quantile": 0.6}]):
+        with pytest.raises(ValueError):
+            score_configurations(configs, RESOLUTION)
@@ -0,0 +1,41 @@
+"""
+Viewport filtering of classified zones.
+"""
+import pandas as pd
+import pytest
+
+from app.services.zone_service import filter_zones
+
+RESOLUTION = 0.05
+
+
+@pytest.fixture
+def zones():
+    cells = [(lat, lon) for lat in range(250, 256) for lon in range(1540, 1546)]
+    return pd.DataFrame({
+        "cell_id": [f"{RESOLUTION}:{lat}_{lon}" for lat, lon in cells],
+        "zone_lat": [lat * RESOLUTION for lat, _ in cells],
+        "zone_lon": [lon * RESOLUTION for _, lon in cells],
+    })
+
+
+def test_bbox_keeps_overlapping_cells(zones):
+    # Covers parts of cells 251..252 (lat) and 1541..1542 (lon)
+    filtered, truncated = filter_zones(zones, RESOLUTION, bbox=(77.06, 12.56, 77.12, 12.62))
+
+    assert not truncated
+    assert sorted(filtered["cell_id"]) == [
+        f"{RESOLUTION}:{lat}_{lon}" for lat in (251, 252) for lon in (1541, 1542)
+    ]
+
+
+def test_limit_truncates(zones):
+    filtered, truncated = filter_zones(zones, RESOLUTION, limit=5)
+
+    assert truncated and len(filtered) == 5
+
+
+@pytest.mark.parametrize("limit", [0, -3])
+def test_non_positive_limit_is_rejected(zones, limit):
+    with pytest.raises(ValueError):
+        filter_zones(zones, RESOLUTION, limit=limit)
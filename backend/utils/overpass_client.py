@@ -1,6 +1,17 @@
 import requests
+import codecs
+import gzip
+import hashlib
+import json
+import os
+import re
+import socket
+import threading
 import time
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Iterator, Iterable, List, Optional, Tuple
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 # Multiple Overpass API endpoints to try
 OVERPASS_URLS = [
@@ -9,13 +20,420 @@ OVERPASS_URLS = [
     "https://overpass.openstreetmap.ru/api/interpreter",
 ]
 
-def fetch_overpass_data(query: str, timeout: int = 180) -> Dict[str, Any]:
+STREAM_CHUNK_SIZE = 64 * 1024
+
+REQUEST_HEADERS = {
+    "User-Agent": "Polycentric-EL/1.0 (transit data loader)",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Accept-Encoding": "gzip, deflate"
+}
+
+# Hedging: a backup request to the next mirror is launched once the primary
+# has been running for HEDGE_LATENCY_FACTOR x its typical latency
+HEDGE_LATENCY_FACTOR = 1.5
+HEDGE_MIN_DELAY = 2.0
+HEDGE_DEFAULT_DELAY = 15.0
+
+# Mirror ranking uses exponentially weighted moving averages
+EWMA_ALPHA = 0.3
+ERROR_PENALTY = 4.0
+
+
+class MirrorStats:
+    """
+    Per-mirror latency and error-rate EWMAs, used to order mirrors and to
+    pick the hedge delay. Thread-safe; one instance is shared per process.
     """
-    Fetch data from Overpass API with retry logic and better error handling.
+
+    def __init__(self, alpha: float = EWMA_ALPHA):
+        self.alpha = alpha
+        self.latency = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def _ewma(self, table: Dict[str, float], url: str, sample: float):
+        previous = table.get(url)
+        table[url] = sample if previous is None else (
+            self.alpha * sample + (1 - self.alpha) * previous
+        )
+
+    def record_success(self, url: str, seconds: float):
+        with self._lock:
+            self._ewma(self.latency, url, seconds)
+            self._ewma(self.errors, url, 0.0)
+
+    def record_error(self, url: str):
+        with self._lock:
+            self._ewma(self.errors, url, 1.0)
+
+    def score(self, url: str) -> float:
+        """Expected cost of a request; lower is better. Unknown mirrors get the default."""
+        with self._lock:
+            latency = self.latency.get(url, HEDGE_DEFAULT_DELAY)
+            return latency * (1 + ERROR_PENALTY * self.errors.get(url, 0.0))
+
+    def ranked(self, urls: List[str]) -> List[str]:
+        # sorted() is stable, so ties keep the configured order
+        return sorted(urls, key=self.score)
+
+    def hedge_delay(self, url: str) -> float:
+        with self._lock:
+            latency = self.latency.get(url)
+        if latency is None:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, HEDGE_LATENCY_FACTOR * latency)
+
+    def reset(self):
+        with self._lock:
+            self.latency.clear()
+            self.errors.clear()
+
+
+mirror_stats = MirrorStats()
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# The hedged attempt running on the current thread, if any
+_current_attempt = threading.local()
+
+
+class _Attempt:
+    """
+    One hedged request. cancel() shuts down the attempt's connection, so a
+    losing request stops even while it is still waiting for response
+    headers (Overpass sends nothing until the query has finished), and the
+    mirror sees the disconnect.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def track(self, conn):
+        with self._lock:
+            if not self.cancelled.is_set():
+                self._connections.add(conn)
+                return
+        _shutdown(conn)
+
+    def release(self):
+        with self._lock:
+            self._connections.clear()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled.set()
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            _shutdown(conn)
+
+
+def _shutdown(conn):
+    sock = getattr(conn, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _TrackedConnectionMixin:
+    """Registers the connection with the current thread's attempt while in use."""
+
+    def getresponse(self, *args, **kwargs):
+        attempt = getattr(_current_attempt, "value", None)
+        if attempt is not None:
+            attempt.track(self)
+        return super().getresponse(*args, **kwargs)
+
+
+class _TrackedHTTPConnection(_TrackedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TrackedHTTPSConnection(_TrackedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TrackedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TrackedHTTPConnection
+
+
+class _TrackedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TrackedHTTPSConnection
+
+
+class _CancellableAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter whose connections can be shut down by a cancelled _Attempt."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TrackedHTTPConnectionPool,
+            "https": _TrackedHTTPSConnectionPool,
+        }
+
+
+def _session_for(url: str) -> requests.Session:
+    """Pooled keep-alive session per mirror."""
+    with _sessions_lock:
+        session = _sessions.get(url)
+        if session is None:
+            session = requests.Session()
+            adapter = _CancellableAdapter(pool_connections=1, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(REQUEST_HEADERS)
+            _sessions[url] = session
+        return session
+
+
+class _Cancelled(Exception):
+    """Raised inside a hedged attempt that lost the race."""
+
+
+def _post_to_mirror(url: str, query: str, timeout: int, attempt: _Attempt) -> Dict[str, Any]:
+    """
+    POST a query to one mirror and decode the JSON body.
+    Stops (and closes the connection) as soon as attempt is cancelled
+    because another attempt has won, whether or not headers have arrived.
+    """
+    _current_attempt.value = attempt
+    try:
+        if attempt.cancelled.is_set():
+            raise _Cancelled()
+        response = _session_for(url).post(
+            url, data={"data": query}, timeout=timeout, stream=True
+        )
+        try:
+            response.raise_for_status()
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if attempt.cancelled.is_set():
+                    raise _Cancelled()
+                body.extend(chunk)
+        finally:
+            response.close()
+    except requests.exceptions.RequestException:
+        if attempt.cancelled.is_set():
+            raise _Cancelled()
+        raise
+    finally:
+        _current_attempt.value = None
+        attempt.release()
+
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}. Response text (first 200 chars): "
+                         f"{bytes(body[:200]).decode('utf-8', 'replace')}")
+
+
+def _describe_error(e: Exception, timeout: int) -> str:
+    if isinstance(e, requests.exceptions.Timeout):
+        return f"Request timeout after {timeout} seconds"
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return f"Connection error: {e}"
+    if isinstance(e, requests.exceptions.HTTPError):
+        status = e.response.status_code if e.response is not None else "?"
+        return f"HTTP {status}: {e}"
+    return str(e)
+
+
+# -------------------------------------------------
+# Response cache
+# -------------------------------------------------
+# OVERPASS_CACHE: "on" (default), "off", or "replay" (offline, never hit the network)
+CACHE_DIR = os.getenv("OVERPASS_CACHE_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".overpass_cache"
+))
+CACHE_TTL = int(os.getenv("OVERPASS_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_BYTES = int(os.getenv("OVERPASS_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+_TIMEOUT_SETTING = re.compile(r"\[timeout:\d+\]")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for cache keying: the [timeout:N] setting does not
+    change the result and whitespace is insignificant in Overpass QL.
+    """
+    return " ".join(_TIMEOUT_SETTING.sub("", query).split())
+
+
+def _is_runtime_error(remark: Optional[str]) -> bool:
+    """True if an Overpass remark reports that the query was cut short."""
+    return bool(remark) and ("runtime error" in remark or "timed out" in remark)
+
+
+class OverpassCache:
+    """
+    Content-addressed, gzip-compressed on-disk cache of raw Overpass
+    responses, keyed by the SHA-256 of the normalized query.
+
+    File mtime is the write time (used for the TTL) and atime is the last
+    read (used for LRU eviction once the cache exceeds max_bytes).
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, ttl: int = CACHE_TTL,
+                 max_bytes: int = CACHE_MAX_BYTES,
+                 mode: str = os.getenv("OVERPASS_CACHE", "on")):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def replay_only(self) -> bool:
+        return self.mode == "replay"
+
+    def path_for(self, query: str) -> str:
+        digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json.gz")
+
+    def lookup(self, query: str, refresh: bool = False) -> Optional[str]:
+        """
+        Return the path of a fresh cache entry (marking it used), or None.
+        With refresh, the entry is ignored (and later overwritten) unless
+        in replay mode, where the network is never used.
+        """
+        if not self.enabled or (refresh and not self.replay_only):
+            return None
+        path = self.path_for(query)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        # Expired entries are still replayed in offline mode
+        if not self.replay_only and time.time() - mtime > self.ttl:
+            return None
+        os.utime(path, (time.time(), mtime))
+        return path
+
+    def iter_chunks(self, path: str) -> Iterator[bytes]:
+        with gzip.open(path, "rb") as f:
+            while True:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    def load(self, path: str) -> Dict[str, Any]:
+        with gzip.open(path, "rb") as f:
+            return json.load(f)
+
+    def store(self, query: str, data: Dict[str, Any]):
+        if not self.enabled or _is_runtime_error(data.get("remark")):
+            return
+        with self._writer(query) as f:
+            f.write(json.dumps(data).encode("utf-8"))
+
+    def tee(self, query: str, chunks: Iterable[bytes]) -> "_CacheTee":
+        """Pass raw response chunks through while writing them to the cache."""
+        return _CacheTee(self, query, chunks)
+
+    def _writer(self, query: str) -> "_CacheWriter":
+        return _CacheWriter(self, self.path_for(query))
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json.gz")]
+        except FileNotFoundError:
+            return
+        stats = [(e.path, e.stat()) for e in entries]
+        total = sum(st.st_size for _, st in stats)
+        for path, st in sorted(stats, key=lambda item: item[1].st_atime):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= st.st_size
+            except FileNotFoundError:
+                pass
+
+
+class _CacheWriter:
+    """Write a compressed entry to a temp file and publish it atomically."""
+
+    def __init__(self, cache: OverpassCache, path: str):
+        self.cache = cache
+        self.path = path
+        os.makedirs(cache.directory, exist_ok=True)
+        self.tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.file = gzip.open(self.tmp_path, "wb", compresslevel=5)
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        self.cache.evict()
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+
+class _CacheTee:
+    def __init__(self, cache: OverpassCache, query: str, chunks: Iterable[bytes]):
+        self.writer = cache._writer(query)
+        self.chunks = chunks
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self.chunks:
+            self.writer.write(chunk)
+            yield chunk
+
+    def commit(self):
+        self.writer.commit()
+
+    def discard(self):
+        self.writer.discard()
+
+
+response_cache = OverpassCache()
+
+
+def fetch_overpass_data(query: str, timeout: int = 180,
+                        urls: Optional[List[str]] = None,
+                        hedge: bool = True, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Fetch data from Overpass API using hedged requests across mirrors.
+
+    The query goes to the preferred mirror first. If it has not answered
+    within an adaptive delay (based on that mirror's latency EWMA), a backup
+    request is sent to the next mirror, and so on. A failure launches the
+    next mirror immediately. The first valid response wins and the other
+    attempts are cancelled (their connections are closed).
     
     Args:
         query: Overpass QL query string
         timeout: Request timeout in seconds (default 180 for large queries)
+        urls: Endpoints in preference order (default OVERPASS_URLS ranked
+              by observed latency and error rate)
+        hedge: Send backup requests to slow mirrors. With False, the next
+               mirror is only tried after a failure (plain failover).
+        refresh: Bypass the response cache (the fresh response is stored)
     
     Returns:
         JSON response from Overpass API
@@ -23,77 +441,401 @@ def fetch_overpass_data(query: str, timeout: int = 180) -> Dict[str, Any]:
     Raises:
         Exception: If all API endpoints fail
     """
+    cached = response_cache.lookup(query, refresh=refresh)
+    if cached:
+        data = response_cache.load(cached)
+        print(f"   [CACHE] Loaded {len(data.get('elements', []))} elements from {cached}")
+        return data
+    if response_cache.replay_only:
+        raise Exception("Offline replay mode: no cached Overpass response for this query")
+
+    urls = list(urls) if urls else mirror_stats.ranked(OVERPASS_URLS)
     last_error = None
-    
-    for url in OVERPASS_URLS:
-        try:
-            print(f"   Trying Overpass API: {url}")
-            
-            # Make request with timeout
-            response = requests.post(
-                url,
-                data={"data": query},
-                timeout=timeout,
-                headers={
-                    "User-Agent": "Polycentric-EL/1.0 (transit data loader)",
-                    "Content-Type": "application/x-www-form-urlencoded"
-                }
-            )
-            
-            # Check for HTTP errors
-            response.raise_for_status()
-            
-            # Check if response is valid JSON
-            try:
-                data = response.json()
-                
+    executor = ThreadPoolExecutor(max_workers=len(urls))
+    attempts = {}
+    launched = []
+    next_index = 0
+
+    def launch():
+        nonlocal next_index
+        url = urls[next_index]
+        next_index += 1
+        print(f"   Trying Overpass API: {url}")
+        attempt = _Attempt()
+        launched.append(attempt)
+        future = executor.submit(_post_to_mirror, url, query, timeout, attempt)
+        attempts[future] = (url, time.time())
+
+    try:
+        launch()
+        while attempts:
+            hedge_delay = None
+            if hedge and next_index < len(urls):
+                hedge_delay = mirror_stats.hedge_delay(urls[next_index - 1])
+
+            done, _ = wait(attempts, timeout=hedge_delay, return_when=FIRST_COMPLETED)
+
+            if not done:
+                print(f"   [HEDGE] No response after {hedge_delay:.1f}s, "
+                      f"sending backup request")
+                launch()
+                continue
+
+            for future in done:
+                url, started = attempts.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    mirror_stats.record_error(url)
+                    last_error = _describe_error(e, timeout)
+                    print(f"   [ERROR] {url}: {last_error}")
+                    if next_index < len(urls):
+                        launch()
+                    continue
+
+                mirror_stats.record_success(url, time.time() - started)
+                for attempt in launched:
+                    attempt.cancel()
+
                 # Check for Overpass API errors in response
                 if "remark" in data:
                     print(f"   [WARNING] API remark: {data['remark']}")
-                
+
                 if "elements" in data:
-                    print(f"   [OK] Success! Received {len(data['elements'])} elements")
-                    return data
+                    print(f"   [OK] Success from {url}! Received "
+                          f"{len(data['elements'])} elements")
                 else:
-                    print(f"   [WARNING] Response missing 'elements' key")
                     # Still return the data, parser will handle empty elements
-                    return data
-                    
-            except ValueError as e:
-                print(f"   [ERROR] Invalid JSON response: {e}")
-                print(f"   Response text (first 200 chars): {response.text[:200]}")
-                last_error = f"Invalid JSON: {e}"
-                continue
-                
-        except requests.exceptions.Timeout:
-            print(f"   [ERROR] Timeout after {timeout} seconds")
-            last_error = f"Request timeout after {timeout} seconds"
-            continue
-            
-        except requests.exceptions.ConnectionError as e:
-            print(f"   [ERROR] Connection error: {e}")
-            last_error = f"Connection error: {e}"
-            continue
-            
-        except requests.exceptions.HTTPError as e:
-            print(f"   [ERROR] HTTP error: {e}")
-            if hasattr(e.response, 'text'):
-                print(f"   Response: {e.response.text[:200]}")
-            last_error = f"HTTP {e.response.status_code}: {e}"
-            continue
-            
-        except Exception as e:
-            print(f"   [ERROR] Unexpected error: {e}")
-            last_error = str(e)
-            continue
-    
+                    print(f"   [WARNING] Response missing 'elements' key")
+
+                response_cache.store(query, data)
+                return data
+    finally:
+        for attempt in launched:
+            attempt.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
     # If we get here, all endpoints failed
     raise Exception(
         f"All Overpass API endpoints failed. Last error: {last_error}\n"
-        f"Tried endpoints: {', '.join(OVERPASS_URLS)}\n"
+        f"Tried endpoints: {', '.join(urls)}\n"
         f"Possible issues:\n"
         f"1. No internet connection\n"
         f"2. Overpass API servers are down\n"
         f"3. Query is too large (try reducing area or timeout)\n"
         f"4. Rate limiting (wait a few minutes and try again)"
     )
+
+
+# -------------------------------------------------
+# Streaming mode
+# -------------------------------------------------
+_ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+_REMARK = re.compile(r'"remark"\s*:\s*')
+_decoder = json.JSONDecoder()
+
+
+def _decode_chunks(byte_chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode a byte stream as UTF-8 without splitting multi-byte characters."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _find_elements_start(chunks: Iterator[str]):
+    """
+    Read the response header up to the opening bracket of "elements".
+
+    Returns:
+        (buffer, position just after the "[")
+
+    Raises:
+        ValueError: If the body has no "elements" array
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        match = _ELEMENTS_START.search(buffer)
+        if match:
+            return buffer, match.end()
+    raise ValueError(f"Response has no 'elements' array: {buffer[:200]}")
+
+
+def _iter_array_items(buffer: str, pos: int, chunks: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Decode JSON array items one at a time, starting just inside the "[".
+    Only the current (partial) item is ever held in memory.
+
+    Returns:
+        The trailing Overpass "remark", if any
+    """
+    exhausted = False
+
+    while True:
+        # Skip whitespace and separators between items
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == "]":
+            break
+
+        if pos < len(buffer):
+            try:
+                item, pos = _decoder.raw_decode(buffer, pos)
+                yield item
+                continue
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+
+        if exhausted:
+            raise ValueError("Response ended inside the 'elements' array")
+
+        # Item is incomplete: drop what was consumed and read more
+        buffer = buffer[pos:]
+        pos = 0
+        try:
+            buffer += next(chunks)
+        except StopIteration:
+            exhausted = True
+
+    # Overpass reports runtime errors (e.g. timeouts) in a "remark" after the array
+    trailer = buffer[pos + 1:] + "".join(chunks)
+    match = _REMARK.search(trailer)
+    if match:
+        try:
+            remark, _ = _decoder.raw_decode(trailer, match.end())
+            print(f"   [WARNING] API remark: {remark}")
+            return remark
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def stream_overpass_elements(query: str, timeout: int = 180,
+                             refresh: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Stream elements from the Overpass API one at a time without loading
+    the whole response into memory.
+
+    Endpoints are tried in ranked order until one returns the start of an
+    "elements" array. Once elements are being yielded, errors are raised
+    to the caller instead of failing over (elements already consumed
+    cannot be taken back).
+
+    Args:
+        query: Overpass QL query string
+        timeout: Request timeout in seconds (default 180 for large queries)
+        refresh: Bypass the response cache (the fresh response is stored)
+
+    Yields:
+        Overpass element dicts
+
+    Raises:
+        Exception: If all API endpoints fail
+    """
+    cached = response_cache.lookup(query, refresh=refresh)
+    if cached:
+        print(f"   [CACHE] Streaming elements from {cached}")
+        chunks = _decode_chunks(response_cache.iter_chunks(cached))
+        buffer, pos = _find_elements_start(chunks)
+        yield from _iter_array_items(buffer, pos, chunks)
+        return
+    if response_cache.replay_only:
+        raise Exception("Offline replay mode: no cached Overpass response for this query")
+
+    last_error = None
+    urls = mirror_stats.ranked(OVERPASS_URLS)
+
+    for url in urls:
+        tee = None
+        try:
+            print(f"   Trying Overpass API (streaming): {url}")
+
+            response = _session_for(url).post(
+                url,
+                data={"data": query},
+                timeout=timeout,
+                stream=True
+            )
+            response.raise_for_status()
+
+            raw_chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            if response_cache.enabled:
+                tee = raw_chunks = response_cache.tee(query, raw_chunks)
+            chunks = _decode_chunks(iter(raw_chunks))
+            buffer, pos = _find_elements_start(chunks)
+
+        except requests.exceptions.RequestException as e:
+            mirror_stats.record_error(url)
+            if tee:
+                tee.discard()
+            print(f"   [ERROR] Request failed: {e}")
+            last_error = str(e)
+            continue
+
+        except ValueError as e:
+            mirror_stats.record_error(url)
+            if tee:
+                tee.discard()
+            print(f"   [ERROR] Invalid response: {e}")
+            last_error = f"Invalid response: {e}"
+            continue
+
+        print("   [OK] Streaming elements...")
+        complete = False
+        try:
+            remark = yield from _iter_array_items(buffer, pos, chunks)
+            complete = not _is_runtime_error(remark)
+        finally:
+            response.close()
+            if tee:
+                if complete:
+                    tee.commit()
+                else:
+                    tee.discard()
+        return
+
+    raise Exception(
+        f"All Overpass API endpoints failed. Last error: {last_error}\n"
+        f"Tried endpoints: {', '.join(urls)}"
+    )
+
+
+# -------------------------------------------------
+# Tiled mode
+# -------------------------------------------------
+# (south, west, north, east)
+KARNATAKA_BBOX = (11.5, 74.0, 18.5, 78.6)
+
+BBox = Tuple[float, float, float, float]
+
+
+def split_bbox(bbox: BBox, tile_size: float) -> List[BBox]:
+    """Split a (south, west, north, east) box into tiles of at most tile_size degrees."""
+    south, west, north, east = bbox
+    tiles = []
+    lat = south
+    while lat < north:
+        lon = west
+        top = min(lat + tile_size, north)
+        while lon < east:
+            right = min(lon + tile_size, east)
+            tiles.append((lat, lon, top, right))
+            lon = right
+        lat = top
+    return tiles
+
+
+def _quarter_bbox(bbox: BBox) -> List[BBox]:
+    south, west, north, east = bbox
+    mid_lat = (south + north) / 2
+    mid_lon = (west + east) / 2
+    return [
+        (south, west, mid_lat, mid_lon),
+        (south, mid_lon, mid_lat, east),
+        (mid_lat, west, north, mid_lon),
+        (mid_lat, mid_lon, north, east),
+    ]
+
+
+def _is_truncated(data: Dict[str, Any], element_limit: Optional[int]) -> bool:
+    """True if Overpass cut the result short (runtime error or element cap)."""
+    if _is_runtime_error(data.get("remark")):
+        return True
+    return element_limit is not None and len(data.get("elements", [])) >= element_limit
+
+
+def fetch_overpass_tiled(query_template: str, bbox: BBox = KARNATAKA_BBOX,
+                         tile_size: float = 1.0, max_workers: int = 4,
+                         max_depth: int = 3, timeout: int = 90,
+                         element_limit: Optional[int] = None,
+                         refresh: bool = False) -> Dict[str, Any]:
+    """
+    Fetch a large region as concurrent bounding-box tiles.
+
+    The template must contain "{bbox}", which is replaced by each tile's
+    "south,west,north,east" (use it as a filter, e.g. "node[...](area.a)({bbox})").
+    A tile that fails, times out or returns element_limit elements is split
+    into four quarters and retried, up to max_depth times. Tiles start on
+    different mirrors so the load is spread across OVERPASS_URLS. Tiles
+    are not hedged (a mirror is only retried elsewhere after a failure),
+    so at most max_workers requests are in flight and per-IP rate limits
+    are respected.
+
+    Args:
+        query_template: Overpass QL query with a {bbox} placeholder
+        bbox: Region as (south, west, north, east)
+        tile_size: Initial tile edge in degrees
+        max_workers: Number of tiles fetched concurrently
+        max_depth: Maximum number of times a tile is subdivided
+        timeout: Request timeout per tile in seconds
+        element_limit: Element cap in the query ("out N"), if any
+        refresh: Bypass the response cache for every tile
+
+    Returns:
+        Dict with merged "elements" deduplicated by (type, id)
+
+    Raises:
+        Exception: If a tile still fails at max_depth
+    """
+    started = time.time()
+    merged = {}
+    tile_count = 0
+
+    def fetch_tile(tile: BBox, index: int) -> Dict[str, Any]:
+        query = query_template.replace("{bbox}", ",".join(f"{c:.6f}" for c in tile))
+        shift = index % len(OVERPASS_URLS)
+        urls = OVERPASS_URLS[shift:] + OVERPASS_URLS[:shift]
+        return fetch_overpass_data(query, timeout=timeout, urls=urls, hedge=False,
+                                   refresh=refresh)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {}
+
+        def submit(tile: BBox, depth: int):
+            nonlocal tile_count
+            future = executor.submit(fetch_tile, tile, tile_count)
+            pending[future] = (tile, depth)
+            tile_count += 1
+
+        for tile in split_bbox(bbox, tile_size):
+            submit(tile, 0)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                tile, depth = pending.pop(future)
+                try:
+                    data = future.result()
+                    truncated = _is_truncated(data, element_limit)
+                    error = "result truncated"
+                except Exception as e:
+                    data = None
+                    truncated = True
+                    error = str(e).splitlines()[0]
+
+                if truncated:
+                    if depth >= max_depth:
+                        raise Exception(f"Tile {tile} failed at max depth: {error}")
+                    print(f"   [TILE] {tile} {error}, splitting")
+                    for quarter in _quarter_bbox(tile):
+                        submit(quarter, depth + 1)
+                    continue
+
+                for el in data.get("elements", []):
+                    merged[(el.get("type"), el.get("id"))] = el
+    finally:
+        # A tile that failed at max depth must not wait for the queued tiles
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"   [OK] {tile_count} tiles, {len(merged)} unique elements "
+          f"in {time.time() - started:.1f}s")
+
+    return {"elements": list(merged.values())}
@@ -1,227 +1,350 @@
 from app.models import TransitNode, Business
 from app import db
-import json
+from app.services.data_version import bump_data_version
+from app.services.zone_aggregate_service import (
+    fetch_existing_cells, cell_deltas, apply_zone_deltas
+)
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import time
+import uuid
 
-def insert_transit_nodes(overpass_json):
+# Rows per INSERT ... ON CONFLICT statement (one database round trip each)
+BULK_BATCH_SIZE = 5000
+
+
+def parse_transit_element(el):
     """
-    Insert transit nodes from Overpass API JSON into the database.
-    Requires Flask app context to be active.
+    Parse a single Overpass element into a transit node row.
+
+    Returns:
+        Dict of TransitNode column values, or None if the element
+        is not a usable transit node
     """
-    elements = overpass_json.get("elements", [])
-    inserted_count = 0
-    skipped_count = 0
-    updated_count = 0
+    if el.get("type") != "node":
+        return None
 
-    for el in elements:
-        if el["type"] != "node":
-            continue
+    lat = el.get("lat")
+    lon = el.get("lon")
+    tags = el.get("tags", {})
+
+    # Determine transit type
+    transit_type = None
+    if "highway" in tags and tags["highway"] == "bus_stop":
+        transit_type = "bus_stop"
+    elif "railway" in tags and tags["railway"] == "station":
+        transit_type = "railway_station"
+    elif "railway" in tags and tags["railway"] == "subway_entrance":
+        transit_type = "subway_entrance"
+
+    # Skip unknown types or missing coordinates
+    if not transit_type or lat is None or lon is None:
+        return None
+
+    # Extract name from tags (prefer name:en, then name, then ref, then loc_name)
+    name = (
+        tags.get("name:en") or
+        tags.get("name") or
+        tags.get("ref") or
+        tags.get("loc_name") or
+        None
+    )
+
+    return {
+        "osm_id": str(el["id"]),
+        "type": transit_type,
+        "name": name,
+        "latitude": lat,
+        "longitude": lon
+    }
 
-        node_id = str(el["id"])
+
+def parse_business_element(el):
+    """
+    Parse a single Overpass element into a business row.
+
+    Returns:
+        Dict of Business column values, or None if the element
+        has no id or coordinates
+    """
+    # Handle both nodes and ways/relations (which have center coordinates)
+    if el.get("type") == "node":
+        osm_id = el.get("id")
         lat = el.get("lat")
         lon = el.get("lon")
-        tags = el.get("tags", {})
-
-        # Determine transit type
-        transit_type = None
-        if "highway" in tags and tags["highway"] == "bus_stop":
-            transit_type = "bus_stop"
-        elif "railway" in tags and tags["railway"] == "station":
-            transit_type = "railway_station"
-        elif "railway" in tags and tags["railway"] == "subway_entrance":
-            transit_type = "subway_entrance"
-
-        # Skip unknown types or missing coordinates
-        if not transit_type or lat is None or lon is None:
-            skipped_count += 1
-            continue
+    elif el.get("type") in ["way", "relation"]:
+        osm_id = el.get("id")
+        # Ways and relations have center coordinates
+        center = el.get("center", {})
+        lat = center.get("lat")
+        lon = center.get("lon")
+    else:
+        return None
 
-        # Extract name from tags (prefer name:en, then name, then ref, then loc_name)
-        name = (
-            tags.get("name:en") or 
-            tags.get("name") or 
-            tags.get("ref") or 
-            tags.get("loc_name") or 
-            None
-        )
-
-        # Check if node already exists
-        existing_node = TransitNode.query.filter_by(osm_id=node_id).first()
-        
-        if existing_node:
-            # Update existing node
-            existing_node.type = transit_type
-            existing_node.name = name
-            existing_node.latitude = lat
-            existing_node.longitude = lon
-            updated_count += 1
-        else:
-            # Create new node
-            node = TransitNode(
-                osm_id=node_id,
-                type=transit_type,
-                name=name,
-                latitude=lat,
-                longitude=lon
-            )
-            db.session.add(node)
-            inserted_count += 1
-
-    # Commit all changes to database
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        raise e
-    
-    return inserted_count, skipped_count, updated_count
+    # Skip if missing coordinates or ID
+    if lat is None or lon is None or osm_id is None:
+        return None
+
+    tags = el.get("tags", {})
+
+    # Determine category
+    category = "other"
+    if "amenity" in tags:
+        category = "amenity"
+    elif "shop" in tags:
+        category = "shop"
+    elif "office" in tags:
+        category = "office"
+
+    # Extract name
+    name = (
+        tags.get("name:en") or
+        tags.get("name") or
+        tags.get("ref") or
+        None
+    )
+
+    return {
+        "osm_id": osm_id,
+        "osm_type": el["type"],
+        "name": name,
+        "category": category,
+        "latitude": lat,
+        "longitude": lon,
+        "raw_tags": tags
+    }
 
 
 def parse_business_elements(elements):
     """
     Parse Overpass API elements and convert them to Business objects.
-    
+
     Args:
         elements: List of elements from Overpass API response
-        
+
     Returns:
         List of Business objects ready to be inserted
     """
     business_objects = []
-    
+
     for el in elements:
-        # Handle both nodes and ways/relations (which have center coordinates)
-        if el["type"] == "node":
-            osm_id = el.get("id")
-            lat = el.get("lat")
-            lon = el.get("lon")
-        elif el["type"] in ["way", "relation"]:
-            osm_id = el.get("id")
-            # Ways and relations have center coordinates
-            center = el.get("center", {})
-            lat = center.get("lat")
-            lon = center.get("lon")
-        else:
-            continue
-        
-        # Skip if missing coordinates or ID
-        if lat is None or lon is None or osm_id is None:
-            continue
-        
-        tags = el.get("tags", {})
-        
-        # Determine category
-        category = "other"
-        if "amenity" in tags:
-            category = "amenity"
-        elif "shop" in tags:
-            category = "shop"
-        elif "office" in tags:
-            category = "office"
-        
-        # Extract name
-        name = (
-            tags.get("name:en") or 
-            tags.get("name") or 
-            tags.get("ref") or 
-            None
-        )
-        
-        business_objects.append({
-            "osm_id": osm_id,
-            "name": name,
-            "category": category,
-            "latitude": lat,
-            "longitude": lon,
-            "raw_tags": tags
-        })
-    
+        row = parse_business_element(el)
+        if row is not None:
+            business_objects.append(row)
+
     return business_objects
 
 
-def insert_business_nodes(overpass_json):
+def _dedupe_rows(rows, key_columns):
     """
-    Insert business nodes from Overpass API JSON into the database.
-    Requires Flask app context to be active.
-    
-    Args:
-        overpass_json: JSON response from Overpass API
-        
+    Keep the last row for each key. A single ON CONFLICT statement cannot
+    touch the same row twice, so duplicates must be removed up front.
+
+    Returns:
+        (unique_rows, duplicate_count)
+    """
+    unique = {}
+    for row in rows:
+        unique[tuple(row[c] for c in key_columns)] = row
+    return list(unique.values()), len(rows) - len(unique)
+
+
+def _bulk_upsert(model, rows, key_columns, update_columns, count_column,
+                 batch_size=BULK_BATCH_SIZE):
+    """
+    Upsert rows with INSERT ... ON CONFLICT DO UPDATE in batches.
+
+    Uses the Postgres `xmax = 0` trick in RETURNING to tell freshly
+    inserted rows apart from updated ones. The zone_aggregates count_column
+    is adjusted for every cell whose rows were inserted or moved.
+
+    Returns:
+        (inserted_count, updated_count, round_trips)
+    """
+    inserted_count = 0
+    updated_count = 0
+    round_trips = 0
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        existing_cells = fetch_existing_cells(model, key_columns, batch)
+        round_trips += 1
+
+        stmt = pg_insert(model).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: stmt.excluded[c] for c in update_columns}
+        ).returning(literal_column("(xmax = 0)").label("inserted"))
+
+        results = db.session.execute(stmt).scalars().all()
+        round_trips += 1
+
+        batch_inserted = sum(1 for r in results if r)
+        inserted_count += batch_inserted
+        updated_count += len(results) - batch_inserted
+
+        deltas = cell_deltas(existing_cells, batch, key_columns)
+        round_trips += apply_zone_deltas(count_column, deltas)
+
+    return inserted_count, updated_count, round_trips
+
+
+def upsert_transit_rows(rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Upsert already-parsed transit rows. Does not commit.
+
+    Returns:
+        (inserted_count, updated_count, round_trips)
+    """
+    rows, duplicates = _dedupe_rows(rows, ["osm_id"])
+    inserted, updated, round_trips = _bulk_upsert(
+        TransitNode, rows,
+        key_columns=["osm_id"],
+        update_columns=["type", "name", "latitude", "longitude"],
+        count_column="transport_count",
+        batch_size=batch_size
+    )
+    # Later duplicates overwrite earlier ones, which counts as an update
+    return inserted, updated + duplicates, round_trips
+
+
+def upsert_business_rows(rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Upsert already-parsed business rows. Does not commit.
+
+    Returns:
+        (inserted_count, updated_count, round_trips)
+    """
+    rows, duplicates = _dedupe_rows(rows, ["osm_type", "osm_id"])
+    for row in rows:
+        row.setdefault("id", uuid.uuid4())
+    inserted, updated, round_trips = _bulk_upsert(
+        Business, rows,
+        key_columns=["osm_type", "osm_id"],
+        update_columns=["name", "category", "latitude", "longitude", "raw_tags"],
+        count_column="business_count",
+        batch_size=batch_size
+    )
+    return inserted, updated + duplicates, round_trips
+
+
+def _ingest_elements(elements, parse, upsert, dataset, label, chunk_size, progress=None):
+    """
+    Parse elements one at a time and upsert them in fixed-size chunks,
+    committing after every chunk. Memory stays bounded by chunk_size and a
+    failure only loses the chunk in progress. Each chunk bumps the
+    dataset's data version in the same transaction.
+
+    If given, progress(inserted, skipped, updated) is called after every
+    committed chunk.
+
     Returns:
         Tuple of (inserted_count, skipped_count, updated_count)
     """
-    elements = overpass_json.get("elements", [])
+    started = time.perf_counter()
     inserted_count = 0
     skipped_count = 0
     updated_count = 0
-    
+    round_trips = 0
+    row_count = 0
+    rows = []
+
+    def flush():
+        nonlocal inserted_count, updated_count, round_trips
+        try:
+            inserted, updated, trips = upsert(rows)
+            bump_data_version(dataset)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise e
+        inserted_count += inserted
+        updated_count += updated
+        round_trips += trips + 1
+        rows.clear()
+        if progress:
+            progress(inserted_count, skipped_count, updated_count)
+
     for el in elements:
-        # Handle both nodes and ways/relations
-        if el["type"] == "node":
-            osm_id = el.get("id")
-            lat = el.get("lat")
-            lon = el.get("lon")
-        elif el["type"] in ["way", "relation"]:
-            osm_id = el.get("id")
-            center = el.get("center", {})
-            lat = center.get("lat")
-            lon = center.get("lon")
-        else:
-            skipped_count += 1
-            continue
-        
-        # Skip if missing coordinates or ID
-        if lat is None or lon is None or osm_id is None:
+        row = parse(el)
+        if row is None:
             skipped_count += 1
             continue
-        
-        tags = el.get("tags", {})
-        
-        # Determine category
-        category = "other"
-        if "amenity" in tags:
-            category = "amenity"
-        elif "shop" in tags:
-            category = "shop"
-        elif "office" in tags:
-            category = "office"
-        
-        # Extract name
-        name = (
-            tags.get("name:en") or 
-            tags.get("name") or 
-            tags.get("ref") or 
-            None
-        )
-        
-        # Check if business already exists
-        existing_business = Business.query.filter_by(osm_id=osm_id).first()
-        
-        if existing_business:
-            # Update existing business
-            existing_business.name = name
-            existing_business.category = category
-            existing_business.latitude = lat
-            existing_business.longitude = lon
-            existing_business.raw_tags = tags
-            updated_count += 1
-        else:
-            # Create new business
-            business = Business(
-                osm_id=osm_id,
-                name=name,
-                category=category,
-                latitude=lat,
-                longitude=lon,
-                raw_tags=tags
-            )
-            db.session.add(business)
-            inserted_count += 1
-    
-    # Commit all changes to database
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        raise e
-    
+        rows.append(row)
+        row_count += 1
+        if len(rows) >= chunk_size:
+            flush()
+            print(f"   [DB] {row_count} {label} committed...")
+
+    if rows:
+        flush()
+
+    print(f"   [DB] Upserted {row_count} {label} in {round_trips} "
+          f"round trips ({time.perf_counter() - started:.2f}s)")
+
     return inserted_count, skipped_count, updated_count
+
+
+def _transit_nodes_only(elements):
+    # Ways/relations (e.g. from "out skel") were never counted as skipped
+    return (el for el in elements if el.get("type") == "node")
+
+
+def ingest_transit_elements(elements, chunk_size=BULK_BATCH_SIZE, progress=None):
+    """
+    Insert transit nodes from any iterable of Overpass elements (for example
+    a stream from stream_overpass_elements), committing every chunk_size rows.
+    Requires Flask app context to be active.
+
+    Args:
+        progress: Optional callback(inserted, skipped, updated) per chunk
+
+    Returns:
+        Tuple of (inserted_count, skipped_count, updated_count)
+    """
+    return _ingest_elements(
+        _transit_nodes_only(elements), parse_transit_element,
+        lambda rows: upsert_transit_rows(rows, batch_size=chunk_size),
+        "transit_nodes", "transit nodes", chunk_size, progress
+    )
+
+
+def ingest_business_elements(elements, chunk_size=BULK_BATCH_SIZE, progress=None):
+    """
+    Insert businesses from any iterable of Overpass elements (for example
+    a stream from stream_overpass_elements), committing every chunk_size rows.
+    Requires Flask app context to be active.
+
+    Args:
+        progress: Optional callback(inserted, skipped, updated) per chunk
+
+    Returns:
+        Tuple of (inserted_count, skipped_count, updated_count)
+    """
+    return _ingest_elements(
+        elements, parse_business_element,
+        lambda rows: upsert_business_rows(rows, batch_size=chunk_size),
+        "businesses", "businesses", chunk_size, progress
+    )
+
+
+def insert_transit_nodes(overpass_json, progress=None):
+    """
+    Insert transit nodes from Overpass API JSON into the database.
+    Requires Flask app context to be active.
+    """
+    return ingest_transit_elements(overpass_json.get("elements", []), progress=progress)
+
+
+def insert_business_nodes(overpass_json, progress=None):
+    """
+    Insert business nodes from Overpass API JSON into the database.
+    Requires Flask app context to be active.
+
+    Args:
+        overpass_json: JSON response from Overpass API
+
+    Returns:
+        Tuple of (inserted_count, skipped_count, updated_count)
+    """
+    return ingest_business_elements(overpass_json.get("elements", []), progress=progress)